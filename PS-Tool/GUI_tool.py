@@ -1,19 +1,3792 @@
 import os
+import sys
 import shutil
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, PanedWindow, Toplevel, Label, Button
-from PIL import Image, ImageTk
+from PIL import Image, ImageTk, ExifTags
+# NumPy is imported inside the functions that use it: it is most of this
+# module's import time and nothing on the way to the first frame needs it
 import csv
 import json
 import traceback
+import threading
+import queue
+import time
+import io
+import math
+import sqlite3
+import re
+import bisect
+import weakref
+import hashlib
+import contextlib
+import socket
+import mmap
+import struct
+import tarfile
+import zipfile
+import zlib
+import argparse
+import tempfile
+import platform
+import logging
+import logging.handlers
+import urllib.parse
+import multiprocessing
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+# Images inside zip/tar archives are addressed as "<archive>::<member>"; the
+# archive itself behaves like a folder whose path ends in the separator.
+ARCHIVE_SEP = "::"
+ARCHIVE_EXTENSIONS = ('.zip', '.tar')
+# Objects in S3-compatible storage are browsed as s3://bucket/prefix/name.jpg
+REMOTE_PREFIX = "s3://"
+
+
+def is_remote(path):
+    return path.startswith(REMOTE_PREFIX)
+
+
+def split_remote(path):
+    bucket, _, key = path[len(REMOTE_PREFIX):].partition("/")
+    return bucket, key
+
+
+def is_virtual(path):
+    # Anything that is not a plain local path: archive members and remote objects
+    return ARCHIVE_SEP in path or is_remote(path)
+
+
+def split_virtual(path):
+    archive, _, member = path.partition(ARCHIVE_SEP)
+    return archive, member
+
+
+def is_archive(path):
+    return os.path.splitext(path)[1].lower() in ARCHIVE_EXTENSIONS and os.path.isfile(path)
+
+
+def join_path(folder, name):
+    if is_remote(folder):
+        return (folder if folder.endswith("/") else folder + "/") + name
+    if is_virtual(folder):
+        archive, member = split_virtual(folder)
+        return archive + ARCHIVE_SEP + (member + "/" + name if member else name)
+    path = os.path.join(folder, name)
+    return path + ARCHIVE_SEP if is_archive(path) else path
+
+
+def parent_path(path):
+    if is_remote(path):
+        # A bucket's parent is the s3:// root, which lists the buckets
+        bucket, key = split_remote(path.rstrip("/"))
+        if not key:
+            return REMOTE_PREFIX
+        return REMOTE_PREFIX + bucket + ("/" + key.rpartition("/")[0] if "/" in key else "")
+    if not is_virtual(path):
+        return os.path.dirname(path)
+    archive, member = split_virtual(path)
+    if not member:
+        return os.path.dirname(archive)
+    return archive + ARCHIVE_SEP + member.rpartition("/")[0]
+
+
+def folder_name(folder):
+    if is_remote(folder):
+        return folder.rstrip("/").rpartition("/")[2] if split_remote(folder)[0] else REMOTE_PREFIX
+    archive, member = split_virtual(folder)
+    if member:
+        return member.rpartition("/")[2]
+    return os.path.splitext(os.path.basename(archive))[0] if is_virtual(folder) else os.path.basename(folder)
+
+
+def is_folder(path):
+    # Virtual paths only ever reach the navigator as archive folders
+    return is_virtual(path) or os.path.isdir(path)
+
+
+def storage_for(path):
+    return remote_storage() if is_remote(path) else archive_storage()
+
+
+def path_stat(path):
+    # (mtime_ns, size) for local files, archive members and remote objects alike
+    if is_virtual(path):
+        return storage_for(path).stat(path)
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def open_file(path):
+    if is_remote(path):
+        return io.BytesIO(remote_storage().get(path))
+    if is_virtual(path):
+        return archive_storage().open(path)
+    return open(path, 'rb')
+
+
+def open_image(path):
+    # Remote objects open lazily, so reading only the header costs one range request
+    return Image.open(storage_for(path).open(path) if is_virtual(path) else path)
+
+
+class ArchiveStorage:
+    # Random access into uncompressed tar and zip archives. The first open
+    # records every member's data offset in a SQLite index; after that a member
+    # is a slice of a memory-mapped archive, so nothing is ever extracted.
+    # Only the MAX_MAPS most recently read archives stay mapped: every mapping
+    # holds a descriptor, and on Windows a lock on the archive.
+    STORED, DEFLATED, OTHER = 0, 8, -1
+    MAX_MAPS = 4
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(default_cache_dir(), "archives.db")
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS archives (path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER);"
+            "CREATE TABLE IF NOT EXISTS members ("
+            "archive TEXT, name TEXT, offset INTEGER, size INTEGER, csize INTEGER, method INTEGER, "
+            "mtime INTEGER, PRIMARY KEY (archive, name)) WITHOUT ROWID;"
+        )
+        self.conn.commit()
+        self.loaded = {}
+        self.maps = OrderedDict()  # archive -> ((mtime_ns, size), mmap)
+
+    def members(self, archive):
+        # {name: (offset, size, csize, method, mtime_ns)}, rebuilt if the archive changed
+        st = os.stat(archive)
+        key = (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            cached = self.loaded.get(archive)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            row = self.conn.execute("SELECT mtime, size FROM archives WHERE path = ?", (archive,)).fetchone()
+            members = None
+            if row is not None and tuple(row) == key:
+                members = {
+                    name: tuple(entry) for name, *entry in self.conn.execute(
+                        "SELECT name, offset, size, csize, method, mtime FROM members WHERE archive = ?",
+                        (archive,)
+                    )
+                }
+
+        if members is None:
+            members = self._build(archive)
+            with self.lock:
+                self.conn.execute("DELETE FROM members WHERE archive = ?", (archive,))
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO members VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((archive, name) + entry for name, entry in members.items())
+                )
+                self.conn.execute("INSERT OR REPLACE INTO archives VALUES (?, ?, ?)", (archive,) + key)
+                self.conn.commit()
+
+        with self.lock:
+            self.loaded[archive] = (key, members)
+        return members
+
+    def _build(self, archive):
+        members = {}
+        if archive.lower().endswith(".zip"):
+            with open(archive, 'rb') as f, zipfile.ZipFile(f) as zf:
+                for info in zf.infolist():
+                    if info.is_dir():
+                        continue
+                    # Data starts after the local header, whose extra field can differ from the central one
+                    f.seek(info.header_offset)
+                    header = struct.unpack("<IHHHHHIIIHH", f.read(30))
+                    offset = info.header_offset + 30 + header[9] + header[10]
+                    method = info.compress_type if info.compress_type in (self.STORED, self.DEFLATED) else self.OTHER
+                    mtime = int(time.mktime(info.date_time + (0, 0, -1)) * 1e9)
+                    members[info.filename.lstrip("/")] = (offset, info.file_size, info.compress_size, method, mtime)
+        else:
+            with tarfile.open(archive, "r:") as tf:
+                for info in tf:
+                    if info.isreg() and not info.issparse():
+                        name = info.name[2:] if info.name.startswith("./") else info.name.lstrip("/")
+                        members[name] = (info.offset_data, info.size, info.size, self.STORED, int(info.mtime * 1e9))
+        return members
+
+    def listing(self, folder):
+        archive, member = split_virtual(folder)
+        prefix = member + "/" if member else ""
+        dirs, images = set(), []
+        for name in self.members(archive):
+            if not name.startswith(prefix):
+                continue
+            rest = name[len(prefix):]
+            if "/" in rest:
+                dirs.add(rest.split("/", 1)[0])
+            elif os.path.splitext(rest)[1].lower() in SUPPORTED_EXTENSIONS:
+                images.append(rest)
+        images.sort()
+        return DirectoryListing(os.stat(archive).st_mtime_ns, sorted(dirs), images)
+
+    def stat(self, path):
+        archive, member = split_virtual(path)
+        entry = self.members(archive).get(member)
+        if entry is None:
+            raise FileNotFoundError(path)
+        return entry[4], entry[1]
+
+    def _slice(self, archive, start, end):
+        # Copy bytes out under the lock, so no other thread closes the mapping mid-read
+        key = self.loaded[archive][0]
+        with self.lock:
+            cached = self.maps.pop(archive, None)
+            if cached is not None and cached[0] != key:
+                cached[1].close()  # the archive was replaced since it was mapped
+                cached = None
+            if cached is None:
+                with open(archive, 'rb') as f:
+                    cached = (key, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            self.maps[archive] = cached
+            while len(self.maps) > self.MAX_MAPS:
+                self.maps.popitem(last=False)[1][1].close()
+            return cached[1][start:end]
+
+    def close(self):
+        with self.lock:
+            for _, mapped in self.maps.values():
+                mapped.close()
+            self.maps.clear()
+
+    def read(self, path):
+        archive, member = split_virtual(path)
+        entry = self.members(archive).get(member)
+        if entry is None:
+            raise FileNotFoundError(path)
+        offset, size, csize, method, _ = entry
+        if method == self.OTHER:
+            with zipfile.ZipFile(archive) as zf:
+                return zf.read(member)
+        data = self._slice(archive, offset, offset + csize)
+        return zlib.decompress(data, -15) if method == self.DEFLATED else data
+
+    def open(self, path):
+        return io.BytesIO(self.read(path))
+
+
+_archive_storage = None
+_archive_storage_lock = threading.Lock()
+
+
+def archive_storage():
+    # One index per process; forked pool workers open their own (see _forget_storage)
+    global _archive_storage
+    with _archive_storage_lock:
+        if _archive_storage is None:
+            _archive_storage = ArchiveStorage()
+        return _archive_storage
+
+
+class RemoteFile(io.RawIOBase):
+    # Seekable view of one object. Reads inside the first HEADER_BYTES come
+    # from a single range request, so header/EXIF parsing never downloads the
+    # image; the first read past them fetches the rest of the object once.
+    def __init__(self, storage, path):
+        self.storage = storage
+        self.path = path
+        self.pos = 0
+        self.head = None
+        self.data = None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += self.storage.stat(self.path)[1]
+        self.pos = max(0, offset)
+        return self.pos
+
+    def readinto(self, buffer):
+        end = self.pos + len(buffer)
+        if self.data is None and end <= self.storage.HEADER_BYTES:
+            if self.head is None:
+                self.head = self.storage.read(self.path, 0, self.storage.HEADER_BYTES)
+            chunk = self.head[self.pos:end]
+        else:
+            if self.data is None:
+                self.data = self.storage.get(self.path, head=self.head)
+            chunk = self.data[self.pos:end]
+        buffer[:len(chunk)] = chunk
+        self.pos += len(chunk)
+        return len(chunk)
+
+
+class S3Storage:
+    # Buckets on S3 or any S3-compatible server (MinIO, moto) browsed as
+    # folders. One boto3 client per process; its HTTP connection pool is shared
+    # by every thread. Listings are paginated and cached for LISTING_TTL
+    # seconds, upcoming objects are downloaded concurrently into a byte-bounded
+    # cache, and copies between prefixes are done server-side.
+    LISTING_TTL = 30
+    HEADER_BYTES = 64 * 1024
+
+    def __init__(self, endpoint_url=None, pool_size=16, cache_bytes=256 * 1024 * 1024):
+        try:
+            import boto3
+            from botocore.config import Config
+            from botocore.exceptions import BotoCoreError, ClientError
+        except ImportError:
+            raise OSError("s3:// paths need boto3 (pip install boto3)")
+        self.client = boto3.client(
+            "s3", endpoint_url=endpoint_url or os.environ.get("PSTOOL_S3_ENDPOINT") or None,
+            config=Config(max_pool_connections=pool_size, retries={"max_attempts": 5, "mode": "adaptive"})
+        )
+        self.errors = (BotoCoreError, ClientError)
+        self.lock = threading.Lock()
+        self.listings = {}  # folder -> (fetched at, DirectoryListing, {name: (mtime_ns, size)})
+        self.blobs = OrderedDict()
+        self.blob_bytes = 0
+        self.cache_bytes = cache_bytes
+        self.in_flight = {}
+        self.executor = ThreadPoolExecutor(max_workers=max(1, pool_size // 2), thread_name_prefix="s3-fetch")
+
+    def _error(self, e, path):
+        code = str(getattr(e, "response", {}).get("Error", {}).get("Code", ""))
+        if code in ("404", "NoSuchKey", "NoSuchBucket"):
+            return FileNotFoundError(path)
+        return OSError(f"{path}: {e}")
+
+    def listing(self, folder, on_page=None):
+        # One Delimiter listing per page; on_page(dirs, images) streams pages as they land
+        with self.lock:
+            cached = self.listings.get(folder)
+        if cached is not None and time.monotonic() - cached[0] < self.LISTING_TTL:
+            return cached[1]
+
+        bucket, key = split_remote(folder)
+        prefix = key.strip("/") + "/" if key.strip("/") else ""
+        dirs, images, stats = [], [], {}
+        try:
+            if not bucket:
+                dirs = [b["Name"] for b in self.client.list_buckets().get("Buckets", [])]
+            else:
+                paginator = self.client.get_paginator("list_objects_v2")
+                for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter="/"):
+                    page_dirs = [p["Prefix"][len(prefix):].rstrip("/") for p in page.get("CommonPrefixes", [])]
+                    page_images = []
+                    for obj in page.get("Contents", []):
+                        name = obj["Key"][len(prefix):]
+                        if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                            page_images.append(name)
+                            stats[name] = (int(obj["LastModified"].timestamp() * 1e9), obj["Size"])
+                    dirs.extend(page_dirs)
+                    images.extend(page_images)
+                    if on_page is not None and (page_dirs or page_images):
+                        on_page(page_dirs, page_images)
+        except self.errors as e:
+            raise self._error(e, folder)
+        dirs.sort()
+        images.sort()
+        listing = DirectoryListing(time.time_ns(), dirs, images)
+        with self.lock:
+            self.listings[folder] = (time.monotonic(), listing, stats)
+        return listing
+
+    def listing_mtime(self, folder):
+        # The cached listing's version while it is within the TTL, else None
+        with self.lock:
+            cached = self.listings.get(folder)
+        if cached is None or time.monotonic() - cached[0] >= self.LISTING_TTL:
+            return None
+        return cached[1].mtime
+
+    def invalidate(self, folder):
+        with self.lock:
+            self.listings.pop(folder, None)
+
+    def walk_folders(self, base):
+        # Every prefix below base, relative to it, from one flat paginated listing
+        bucket, key = split_remote(base)
+        prefix = key.strip("/") + "/" if key.strip("/") else ""
+        found = set()
+        try:
+            for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+                for obj in page.get("Contents", []):
+                    parts = obj["Key"][len(prefix):].split("/")[:-1]
+                    for depth in range(1, len(parts) + 1):
+                        found.add("/".join(parts[:depth]))
+        except self.errors as e:
+            raise self._error(e, base)
+        return sorted(found)
+
+    def stat(self, path):
+        folder, _, name = path.rpartition("/")
+        with self.lock:
+            cached = self.listings.get(folder)
+        if cached is not None and name in cached[2]:
+            return cached[2][name]
+        bucket, key = split_remote(path)
+        try:
+            head = self.client.head_object(Bucket=bucket, Key=key)
+        except self.errors as e:
+            raise self._error(e, path)
+        return int(head["LastModified"].timestamp() * 1e9), head["ContentLength"]
+
+    def read(self, path, start=0, end=None):
+        # Bytes [start, end) of one object through a range request
+        bucket, key = split_remote(path)
+        options = {}
+        if start or end is not None:
+            options["Range"] = f"bytes={start}-{'' if end is None else end - 1}"
+        try:
+            body = self.client.get_object(Bucket=bucket, Key=key, **options)["Body"]
+            try:
+                return body.read()
+            finally:
+                body.close()
+        except self.errors as e:
+            raise self._error(e, path)
+
+    def get(self, path, head=None):
+        # Whole object, from the cache, an in-flight prefetch, or a fresh download
+        with self.lock:
+            data = self.blobs.get(path)
+            if data is not None:
+                self.blobs.move_to_end(path)
+                return data
+            future = self.in_flight.get(path)
+        if future is not None:
+            return future.result()
+        if head is not None and len(head) < self.HEADER_BYTES:
+            data = head  # the header read already returned the whole object
+        elif head is not None:
+            data = head + self.read(path, len(head))
+        else:
+            data = self.read(path)
+        self._store(path, data)
+        return data
+
+    def _store(self, path, data):
+        with self.lock:
+            if path in self.blobs:
+                return
+            self.blobs[path] = data
+            self.blob_bytes += len(data)
+            while self.blob_bytes > self.cache_bytes and len(self.blobs) > 1:
+                _, old = self.blobs.popitem(last=False)
+                self.blob_bytes -= len(old)
+
+    def _fetch(self, path):
+        try:
+            data = self.read(path)
+            self._store(path, data)
+            return data
+        finally:
+            with self.lock:
+                self.in_flight.pop(path, None)
+
+    def prefetch(self, paths):
+        # Download the upcoming objects concurrently over the pooled connections
+        with self.lock:
+            for path in paths:
+                if path not in self.blobs and path not in self.in_flight:
+                    self.in_flight[path] = self.executor.submit(self._fetch, path)
+
+    def open(self, path):
+        with self.lock:
+            data = self.blobs.get(path)
+        if data is not None:
+            return io.BytesIO(data)
+        return io.BufferedReader(RemoteFile(self, path), buffer_size=16 * 1024)
+
+    def write(self, path, data):
+        bucket, key = split_remote(path)
+        try:
+            self.client.put_object(Bucket=bucket, Key=key, Body=data)
+        except self.errors as e:
+            raise self._error(e, path)
+        self.invalidate(parent_path(path))
+
+    def copy(self, src, dst):
+        # Server-side when both ends are in the store; local files are uploaded
+        bucket, key = split_remote(dst)
+        try:
+            if is_remote(src):
+                src_bucket, src_key = split_remote(src)
+                self.client.copy_object(Bucket=bucket, Key=key, CopySource={"Bucket": src_bucket, "Key": src_key})
+            else:
+                with open_file(src) as f:
+                    self.client.upload_fileobj(f, bucket, key)
+        except self.errors as e:
+            raise self._error(e, dst)
+        self.invalidate(parent_path(dst))
+
+    def exists(self, path):
+        try:
+            self.stat(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def delete(self, path):
+        bucket, key = split_remote(path)
+        try:
+            self.client.delete_object(Bucket=bucket, Key=key)
+        except self.errors as e:
+            raise self._error(e, path)
+        with self.lock:
+            data = self.blobs.pop(path, None)
+            if data is not None:
+                self.blob_bytes -= len(data)
+        self.invalidate(parent_path(path))
+
+
+_remote_storage = None
+_remote_storage_lock = threading.Lock()
+
+
+def remote_storage():
+    # Like archive_storage(): one client per process (see _forget_storage)
+    global _remote_storage
+    with _remote_storage_lock:
+        if _remote_storage is None:
+            _remote_storage = S3Storage()
+        return _remote_storage
+
+
+def _forget_storage():
+    # A forked pool worker must not reuse the parent's SQLite connection, boto3
+    # client or in-flight prefetches (nor a lock another thread held at fork
+    # time); it builds its own storage on first use
+    global _archive_storage, _archive_storage_lock, _remote_storage, _remote_storage_lock
+    _archive_storage = _remote_storage = None
+    _archive_storage_lock = threading.Lock()
+    _remote_storage_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_storage)
+
+
+class StageStats:
+    # Rolling latency samples per named stage (the last `window` of each) and a
+    # bounded ring of trace events for Chrome's trace viewer. Recording is a
+    # perf_counter pair and two deque appends, cheap enough to leave on.
+    def __init__(self, window=512, trace_events=50000):
+        self.window = window
+        self.samples = {}
+        self.trace = deque(maxlen=trace_events)
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter())
+
+    def record(self, name, start, end=None):
+        end = time.perf_counter() if end is None else end
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.window)
+            samples.append(end - start)
+            self.trace.append((name, start, end - start, threading.get_ident()))
+
+    def percentiles(self):
+        # {stage: (count, p50, p95, p99)} in milliseconds
+        import numpy as np
+        with self.lock:
+            snapshot = {name: list(samples) for name, samples in self.samples.items()}
+        result = {}
+        for name, values in snapshot.items():
+            if values:
+                p50, p95, p99 = np.percentile(np.array(values) * 1000.0, [50, 95, 99])
+                result[name] = (len(values), p50, p95, p99)
+        return result
+
+    def export_trace(self, path):
+        with self.lock:
+            events = list(self.trace)
+        pid = os.getpid()
+        trace = {"traceEvents": [
+            {"name": name, "cat": name.split(".")[0], "ph": "X", "pid": pid, "tid": tid,
+             "ts": round((start - self.origin) * 1e6, 1), "dur": round(duration * 1e6, 1)}
+            for name, start, duration, tid in events
+        ], "displayTimeUnit": "ms"}
+        with open(path, 'w') as f:
+            json.dump(trace, f)
+        return len(events)
+
+
+def decode_image(path, stats=None, fit_size=None):
+    # (RGB image, full image size). With fit_size (the canvas), JPEGs decode in
+    # draft mode at the smallest 1/2, 1/4 or 1/8 scale that still covers the
+    # image fitted to it; other formats always decode in full.
+    if stats is None:
+        with open_image(path) as img:
+            return draft_decode(img, fit_size)
+    # Reading the bytes first separates storage time from decode time
+    with stats.stage("image.read"):
+        with open_file(path) as f:
+            data = f.read()
+    with stats.stage("image.decode"):
+        with Image.open(io.BytesIO(data)) as img:
+            return draft_decode(img, fit_size)
+
+
+def draft_decode(img, fit_size=None):
+    size = img.size
+    if fit_size is not None:
+        scale = min(fit_size[0] / size[0], fit_size[1] / size[1])
+        if scale < 1:
+            img.draft("RGB", (max(1, math.ceil(size[0] * scale)), max(1, math.ceil(size[1] * scale))))
+    return img.convert("RGB"), size
+
+
+def exif_thumbnail(path):
+    # The JPEG preview most cameras embed in EXIF IFD1, or None. Only the
+    # header is parsed; the main image is never decoded.
+    try:
+        with open_image(path) as img:
+            raw = img.info.get("exif")
+            if not raw:
+                return None
+            ifd1 = img.getexif().get_ifd(ExifTags.IFD.IFD1)
+        offset, length = ifd1.get(0x0201), ifd1.get(0x0202)
+        if not offset or not length:
+            return None
+        start = offset + (6 if raw.startswith(b"Exif\x00\x00") else 0)
+        thumb = Image.open(io.BytesIO(raw[start:start + length]))
+        thumb.load()
+        return thumb.convert("RGB")
+    except Exception:
+        return None
+
+
+def stored_thumbnail(store, path):
+    # Thumbnail from the SQLite cache, else the EXIF preview; for s3:// paths
+    # either may be a network read, so callers keep this off the Tk thread
+    data = store.get_many([path]).get(path)
+    if data is None:
+        return exif_thumbnail(path)
+    thumb = Image.open(io.BytesIO(data))
+    thumb.load()
+    return thumb
+
+
+def image_nbytes(img):
+    return img.width * img.height * len(img.getbands())
+
+
+class ImagePyramid:
+    # Decoded image plus successively halved copies, so zoomed-out renders
+    # resample from a level close to the target size. The base may itself be
+    # a reduced decode: size is always the full image size and base_scale
+    # says how much of it the base holds.
+    def __init__(self, image, min_side=256, full_size=None):
+        self.size = full_size or image.size
+        scale = image.width / self.size[0]
+        self.levels = [(scale, image)]
+        while min(image.size) // 2 >= min_side:
+            image = image.reduce(2)
+            scale /= 2
+            self.levels.append((scale, image))
+
+    @property
+    def base(self):
+        return self.levels[0][1]
+
+    @property
+    def base_scale(self):
+        return self.levels[0][0]
+
+    @property
+    def nbytes(self):
+        return sum(image_nbytes(img) for _, img in self.levels)
+
+    def level_for(self, scale):
+        # Smallest level that is still at least as large as the requested scale
+        for level_scale, img in reversed(self.levels):
+            if level_scale >= scale:
+                return level_scale, img
+        return self.levels[0]
+
+
+class RenderCache:
+    # Finished PhotoImages keyed by (path, canvas size, zoom). Tk objects, so
+    # only touched from the main thread.
+    def __init__(self, max_pixels=64 * 1024 * 1024):
+        self.max_pixels = max_pixels
+        self.entries = OrderedDict()
+        self.pixels = 0
+
+    def get(self, key):
+        photo = self.entries.get(key)
+        if photo is not None:
+            self.entries.move_to_end(key)
+        return photo
+
+    def put(self, key, photo):
+        if key in self.entries:
+            old = self.entries.pop(key)
+            self.pixels -= old.width() * old.height()
+        self.entries[key] = photo
+        self.pixels += photo.width() * photo.height()
+        while self.pixels > self.max_pixels and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.pixels -= evicted.width() * evicted.height()
+
+    def discard(self, path):
+        for key in [k for k in self.entries if k[0] == path]:
+            evicted = self.entries.pop(key)
+            self.pixels -= evicted.width() * evicted.height()
+
+
+class ImagePrefetcher:
+    # Decodes neighbours of the current image (and builds their pyramids) on
+    # worker threads into a memory-bounded LRU cache so that next/previous is
+    # usually a cache hit. With fit_size set, JPEGs are cached at the reduced
+    # scale that size needs; get_full swaps in full resolution on demand.
+    def __init__(self, ahead=3, behind=1, memory_budget=1536 * 1024 * 1024, workers=2, on_decoded=None,
+                 stats=None, fit_size=None):
+        self.ahead = ahead
+        self.fit_size = fit_size
+        self.on_decoded = on_decoded
+        self.stats = stats
+        self.behind = behind
+        self.memory_budget = memory_budget
+        self.cache = OrderedDict()
+        self.cache_bytes = 0
+        self.in_flight = {}
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.tasks = queue.Queue()
+
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def get(self, path):
+        with self.lock:
+            if path in self.cache:
+                self.cache.move_to_end(path)
+                return self.cache[path]
+            pending = self.in_flight.get(path)
+
+        # A worker is already decoding this one: wait for it instead of decoding twice
+        if pending is not None:
+            pending.wait()
+            with self.lock:
+                if path in self.cache:
+                    self.cache.move_to_end(path)
+                    return self.cache[path]
+
+        pyramid = self._load(path)
+        self._store(path, pyramid)
+        return pyramid
+
+    def get_full(self, path):
+        pyramid = self.peek(path)
+        if pyramid is not None and pyramid.base_scale >= 1.0:
+            return pyramid
+        pyramid = self._load(path, full=True)
+        self._store(path, pyramid)
+        return pyramid
+
+    def _load(self, path, full=False):
+        image, size = decode_image(path, self.stats, None if full else self.fit_size)
+        if self.stats is None:
+            return ImagePyramid(image, full_size=size)
+        with self.stats.stage("image.pyramid"):
+            return ImagePyramid(image, full_size=size)
+
+    def peek(self, path):
+        with self.lock:
+            return self.cache.get(path)
+
+    def discard(self, path):
+        with self.lock:
+            pyramid = self.cache.pop(path, None)
+            if pyramid is not None:
+                self.cache_bytes -= pyramid.nbytes
+
+    def schedule(self, paths, index, direction=1):
+        # direction=-1 when the user is moving backwards; stepping by direction
+        # already points "ahead" the way they are going
+        ahead, behind = self.ahead, self.behind
+        order = []
+        for step in range(1, max(ahead, behind) + 1):
+            if step <= ahead and 0 <= index + step * direction < len(paths):
+                order.append(paths[index + step * direction])
+            if step <= behind and 0 <= index - step * direction < len(paths):
+                order.append(paths[index - step * direction])
+        remote = [path for path in order if is_remote(path) and path not in self.cache]
+        if remote:
+            try:
+                remote_storage().prefetch(remote)
+            except OSError:
+                pass  # no client; the decode reports the error
+
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+            self._drain()
+            for path in order:
+                if path not in self.cache and path not in self.in_flight:
+                    self.tasks.put((generation, path))
+
+    def cancel(self):
+        with self.lock:
+            self.generation += 1
+            self._drain()
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self._drain()
+            self.cache.clear()
+            self.cache_bytes = 0
+
+    def _drain(self):
+        try:
+            while True:
+                self.tasks.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _store(self, path, pyramid):
+        size = pyramid.nbytes
+        if size > self.memory_budget:
+            return
+        with self.lock:
+            if path in self.cache:
+                if self.cache[path].base_scale > pyramid.base_scale:
+                    return  # never swap a full-resolution entry for a reduced one
+                self.cache_bytes -= self.cache.pop(path).nbytes
+            self.cache[path] = pyramid
+            self.cache_bytes += size
+            while self.cache_bytes > self.memory_budget and len(self.cache) > 1:
+                _, evicted = self.cache.popitem(last=False)
+                self.cache_bytes -= evicted.nbytes
+
+    def _worker(self):
+        while True:
+            generation, path = self.tasks.get()
+            with self.lock:
+                if generation != self.generation or path in self.cache or path in self.in_flight:
+                    continue
+                done = threading.Event()
+                self.in_flight[path] = done
+
+            try:
+                pyramid = self._load(path)
+            except Exception:
+                pyramid = None  # show_image retries on the main thread and reports the error
+
+            with self.lock:
+                self.in_flight.pop(path, None)
+                stale = generation != self.generation
+
+            # Results for a folder we already left would only evict useful entries
+            if pyramid is not None and not stale:
+                self._store(path, pyramid)
+            done.set()
+            if pyramid is not None and not stale and self.on_decoded is not None:
+                self.on_decoded(path)
+
+
+class RenderScheduler:
+    # Coalesces render requests into a single render per idle cycle. While the
+    # user is interacting a cheap preview is drawn; the LANCZOS pass follows
+    # once input has been quiet for settle_ms.
+    def __init__(self, root, render, settle_ms=180):
+        self.root = root
+        self.render = render
+        self.settle_ms = settle_ms
+        self.idle_job = None
+        self.settle_job = None
+        self.full = False
+        self.settle_full = False
+        self.interacting = False
+
+    def request(self, full=True, interactive=False):
+        self.full = self.full or full
+        if interactive:
+            self.interacting = True
+            if self.settle_job is not None:
+                self.root.after_cancel(self.settle_job)
+            self.settle_job = self.root.after(self.settle_ms, self._settle)
+        if self.interacting:
+            self.settle_full = self.settle_full or full
+        if self.idle_job is None:
+            self.idle_job = self.root.after_idle(self._flush)
+
+    def cancel(self):
+        for job in (self.idle_job, self.settle_job):
+            if job is not None:
+                self.root.after_cancel(job)
+        self.idle_job = self.settle_job = None
+        self.full = self.settle_full = self.interacting = False
+
+    def _flush(self):
+        self.idle_job = None
+        full, self.full = self.full, False
+        self.render(full=full, preview=self.interacting)
+
+    def _settle(self):
+        self.settle_job = None
+        self.interacting = False
+        full, self.settle_full = self.settle_full, False
+        self.render(full=full, preview=False)
+
+
+def fit_geometry(image_size, canvas_size, zoom=1.0, offset=(0, 0)):
+    # Fit-to-canvas scale times zoom, the scaled size, and where the scaled
+    # image's top-left corner lands on the canvas after panning
+    width, height = image_size
+    canvas_width, canvas_height = canvas_size
+    final_scale = min(canvas_width / width, canvas_height / height) * zoom
+    new_width = max(1, int(width * final_scale))
+    new_height = max(1, int(height * final_scale))
+    left = canvas_width // 2 + offset[0] - new_width // 2
+    top = canvas_height // 2 + offset[1] - new_height // 2
+    return final_scale, new_width, new_height, left, top
+
+
+def render_region(pyramid, final_scale, new_size, box, preview=False):
+    # Pixels of the display-space box (x0, y0, x1, y1) of the image scaled to
+    # new_size, resampled from the smallest pyramid level with enough detail
+    new_width, new_height = new_size
+    _, source = pyramid.level_for(final_scale)
+    resample = Image.Resampling.BILINEAR if preview else Image.Resampling.LANCZOS
+    x0, y0, x1, y1 = box
+    if box == (0, 0, new_width, new_height):
+        return source.resize((new_width, new_height), resample)
+    fx = source.width / new_width
+    fy = source.height / new_height
+    return source.resize((x1 - x0, y1 - y0), resample, box=(x0 * fx, y0 * fy, x1 * fx, y1 * fy))
+
+
+THUMBNAIL_SIZE = 192
+
+
+def default_cache_dir():
+    return os.path.join(os.path.expanduser("~"), ".cache", "pstool")
+
+
+class SharedProcessPool(ProcessPoolExecutor):
+    # Remembers its queued futures so shutdown can drop them; shutdown() only
+    # takes cancel_futures from Python 3.9 on
+    def __init__(self, max_workers=None):
+        super().__init__(max_workers=max_workers)
+        self.futures = weakref.WeakSet()
+        self.futures_lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        # Executor.map goes through here too
+        future = super().submit(fn, *args, **kwargs)
+        with self.futures_lock:
+            self.futures.add(future)
+        return future
+
+    def cancel_pending(self):
+        # Work a worker has already picked up still runs to the end
+        with self.futures_lock:
+            futures = list(self.futures)
+        for future in futures:
+            future.cancel()
+
+
+# One process pool shared by the thumbnail and quality-score builders, so
+# the two background jobs never oversubscribe the CPU between them
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def shared_process_pool():
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = SharedProcessPool(max_workers=max(1, (os.cpu_count() or 2) - 1))
+        return _process_pool
+
+
+def shutdown_process_pool():
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.cancel_pending()
+        pool.shutdown(wait=True)
+
+
+def make_thumbnail(path, size=THUMBNAIL_SIZE):
+    # Runs in the thumbnail process pool, so it has to stay a module-level function
+    try:
+        mtime, file_size = path_stat(path)
+        with open_image(path) as img:
+            img.draft("RGB", (size, size))
+            img = img.convert("RGB")
+            img.thumbnail((size, size))
+            buf = io.BytesIO()
+            img.save(buf, "JPEG", quality=80)
+        return path, mtime, file_size, buf.getvalue()
+    except Exception:
+        return None
+
+
+class ThumbnailStore:
+    # All thumbnails live as JPEG blobs in one SQLite file, validated against
+    # the source file's mtime and size on read.
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(default_cache_dir(), "thumbnails.db")
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS thumbnails ("
+            "path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, data BLOB)"
+        )
+        self.conn.commit()
+
+    def _rows(self, paths):
+        rows = {}
+        with self.lock:
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                for path, mtime, size, data in self.conn.execute(
+                    f"SELECT path, mtime, size, data FROM thumbnails WHERE path IN ({marks})", chunk
+                ):
+                    rows[path] = (mtime, size, data)
+        return rows
+
+    def get_many(self, paths):
+        result = {}
+        for path, (mtime, size, data) in self._rows(list(paths)).items():
+            try:
+                current = path_stat(path)
+            except OSError:
+                continue
+            if current == (mtime, size):
+                result[path] = data
+        return result
+
+    def missing(self, paths):
+        have = self.get_many(paths)
+        return [p for p in paths if p not in have]
+
+    def put_many(self, rows):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO thumbnails (path, mtime, size, data) VALUES (?, ?, ?, ?)", rows
+            )
+            self.conn.commit()
+
+
+class ThumbnailBuilder:
+    # Background thread feeding missing thumbnails through a process pool.
+    # Paths the filmstrip is currently showing jump the queue.
+    def __init__(self, store, chunk_size=64):
+        self.store = store
+        self.chunk_size = chunk_size
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.urgent = deque()
+        self.wakeup = threading.Event()
+        self.notify = False
+        self.built = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def build(self, paths):
+        with self.lock:
+            self.pending = deque(paths)
+            self.urgent.clear()
+        self.wakeup.set()
+
+    def prioritize(self, paths):
+        with self.lock:
+            self.urgent.extend(paths)
+        self.wakeup.set()
+
+    def shutdown(self):
+        with self.lock:
+            self.pending.clear()
+            self.urgent.clear()
+
+    def _next_chunk(self):
+        with self.lock:
+            source = self.urgent if self.urgent else self.pending
+            return [source.popleft() for _ in range(min(self.chunk_size, len(source)))]
+
+    def _run(self):
+        while True:
+            chunk = self._next_chunk()
+            if not chunk:
+                self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+
+            missing = self.store.missing(chunk)
+            if not missing:
+                continue
+            try:
+                rows = [r for r in shared_process_pool().map(make_thumbnail, missing, chunksize=4) if r]
+            except Exception:
+                continue  # pool shut down on quit
+            self.store.put_many(rows)
+            if self.notify:
+                for row in rows:
+                    self.built.put(row[0])
+
+
+class FilmstripView:
+    # Scrollable thumbnail grid over the current folder. Only the rows in view
+    # get canvas items and thumbnails loaded.
+    def __init__(self, gui):
+        self.gui = gui
+        self.store = gui.thumbnail_store
+        self.builder = gui.thumbnail_builder
+        self.cell = THUMBNAIL_SIZE + 24
+        self.columns = 1
+        self.paths = []
+        self.index_of = {}
+        self.marked = set()
+        self.last_clicked = None
+        self.cells = {}
+
+        self.window = Toplevel(gui.root)
+        self.window.title("🎞️ Filmstrip")
+        self.window.geometry("1100x700")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        toolbar = tk.Frame(self.window)
+        toolbar.pack(fill=tk.X)
+        tk.Button(toolbar, text="✅ Select marked", command=self.select_marked).pack(side=tk.LEFT, padx=5, pady=3)
+        tk.Button(toolbar, text="🏷️ Set scene for marked", command=self.scene_marked).pack(side=tk.LEFT, padx=5, pady=3)
+        tk.Button(toolbar, text="🧹 Clear marks", command=self.clear_marks).pack(side=tk.LEFT, padx=5, pady=3)
+        self.status = tk.Label(toolbar, text="")
+        self.status.pack(side=tk.LEFT, padx=10)
+
+        self.canvas = tk.Canvas(self.window, bg="black")
+        scrollbar = tk.Scrollbar(self.window, command=self.on_scroll)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+
+        self.canvas.bind("<Configure>", lambda e: self.layout())
+        self.canvas.bind("<MouseWheel>", lambda e: self.on_scroll("scroll", int(-1 * (e.delta / 120)), "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.on_scroll("scroll", -1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.on_scroll("scroll", 1, "units"))
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<Shift-Button-1>", self.on_shift_click)
+        self.canvas.bind("<Double-Button-1>", self.on_double_click)
+
+        self.builder.notify = True
+        self.poll_job = self.window.after(250, self.poll_built)
+        self.set_paths(gui.image_paths)
+
+    def set_paths(self, paths):
+        self.paths = list(paths)
+        self.index_of = {p: i for i, p in enumerate(self.paths)}
+        self.marked.clear()
+        self.last_clicked = None
+        self.canvas.yview_moveto(0)
+        self.layout()
+
+    def update_paths(self, paths):
+        # Same folder with frames added, removed or reordered: marks follow
+        # their frames and the view stays where it was
+        marked = {self.paths[i] for i in self.marked}
+        last = self.paths[self.last_clicked] if self.last_clicked is not None else None
+        top = self.canvas.canvasy(0)
+        self.paths = list(paths)
+        self.index_of = {p: i for i, p in enumerate(self.paths)}
+        self.marked = {self.index_of[p] for p in marked if p in self.index_of}
+        self.last_clicked = self.index_of.get(last)
+        self.layout()
+        rows = math.ceil(len(self.paths) / self.columns)
+        if rows:
+            self.canvas.yview_moveto(top / (rows * self.cell))
+            self.refresh()
+
+    def layout(self):
+        self.columns = max(1, self.canvas.winfo_width() // self.cell)
+        rows = math.ceil(len(self.paths) / self.columns)
+        self.canvas.configure(scrollregion=(0, 0, self.columns * self.cell, rows * self.cell))
+        self.canvas.configure(yscrollincrement=self.cell // 4)
+        self.canvas.delete("all")
+        self.cells = {}
+        self.refresh()
+
+    def on_scroll(self, *args):
+        self.canvas.yview(*args)
+        self.refresh()
+
+    def refresh(self):
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        first = int(top // self.cell) * self.columns
+        last = min(len(self.paths), (int(bottom // self.cell) + 1) * self.columns)
+        visible = range(first, last)
+
+        for index in [i for i in self.cells if not first <= i < last]:
+            for item in self.cells.pop(index)[0]:
+                self.canvas.delete(item)
+
+        need = [i for i in visible if i not in self.cells]
+        thumbs = self.store.get_many([self.paths[i] for i in need])
+        missing = []
+        for index in need:
+            data = thumbs.get(self.paths[index])
+            photo = None
+            if data is not None:
+                try:
+                    photo = ImageTk.PhotoImage(Image.open(io.BytesIO(data)))
+                except Exception:
+                    photo = None
+            if photo is None:
+                missing.append(self.paths[index])
+            self.draw_cell(index, photo)
+
+        if missing:
+            self.builder.prioritize(missing)
+        self.status.config(text=f"{len(self.paths)} images · {len(self.marked)} marked")
+
+    def draw_cell(self, index, photo):
+        x = (index % self.columns) * self.cell
+        y = (index // self.columns) * self.cell
+        if index in self.marked:
+            outline = "#4caf50"
+        elif index == self.gui.current_index:
+            outline = "#ffd54f"
+        else:
+            outline = "#444444"
+        items = [self.canvas.create_rectangle(x + 2, y + 2, x + self.cell - 2, y + self.cell - 2, outline=outline, width=3)]
+        if photo is not None:
+            items.append(self.canvas.create_image(x + self.cell // 2, y + (self.cell - 14) // 2, image=photo))
+        else:
+            items.append(self.canvas.create_text(x + self.cell // 2, y + self.cell // 2, text="⏳", fill="white"))
+        items.append(self.canvas.create_text(
+            x + self.cell // 2, y + self.cell - 10,
+            text=os.path.basename(self.paths[index])[:28], fill="white", font=("Arial", 8)
+        ))
+        self.cells[index] = (items, photo)
+
+    def redraw_cell(self, index):
+        if index in self.cells:
+            items, photo = self.cells.pop(index)
+            for item in items:
+                self.canvas.delete(item)
+            self.draw_cell(index, photo)
+
+    def index_at(self, event):
+        column = int(self.canvas.canvasx(event.x) // self.cell)
+        row = int(self.canvas.canvasy(event.y) // self.cell)
+        index = row * self.columns + column
+        if column >= self.columns or index >= len(self.paths):
+            return None
+        return index
+
+    def on_click(self, event):
+        index = self.index_at(event)
+        if index is None:
+            return
+        self.marked.symmetric_difference_update({index})
+        self.last_clicked = index
+        self.redraw_cell(index)
+        self.status.config(text=f"{len(self.paths)} images · {len(self.marked)} marked")
+
+    def on_shift_click(self, event):
+        index = self.index_at(event)
+        if index is None:
+            return
+        start = self.last_clicked if self.last_clicked is not None else index
+        for i in range(min(start, index), max(start, index) + 1):
+            self.marked.add(i)
+            self.redraw_cell(i)
+        self.last_clicked = index
+        self.status.config(text=f"{len(self.paths)} images · {len(self.marked)} marked")
+
+    def on_double_click(self, event):
+        index = self.index_at(event)
+        if index is not None:
+            self.gui.jump_to(index)
+            self.refresh_current()
+
+    def refresh_current(self):
+        for index in list(self.cells):
+            self.redraw_cell(index)
+
+    def clear_marks(self):
+        marked, self.marked = self.marked, set()
+        for index in marked:
+            self.redraw_cell(index)
+        self.status.config(text=f"{len(self.paths)} images · 0 marked")
+
+    def select_marked(self):
+        paths = [self.paths[i] for i in sorted(self.marked)]
+        if paths and self.gui.select_paths(paths):
+            self.clear_marks()
+
+    def scene_marked(self):
+        paths = [self.paths[i] for i in sorted(self.marked)]
+        if paths and self.gui.apply_scene(paths):
+            self.clear_marks()
+
+    def poll_built(self):
+        landed = False
+        try:
+            while True:
+                index = self.index_of.get(self.builder.built.get_nowait())
+                if index is not None and index in self.cells and self.cells[index][1] is None:
+                    items, _ = self.cells.pop(index)
+                    for item in items:
+                        self.canvas.delete(item)
+                    landed = True
+        except queue.Empty:
+            pass
+        if landed:
+            self.refresh()
+        self.poll_job = self.window.after(250, self.poll_built)
+
+    def close(self):
+        self.builder.notify = False
+        self.window.after_cancel(self.poll_job)
+        self.window.destroy()
+        self.gui.filmstrip = None
+
+
+# Frames are scored on a downsampled grayscale copy; these metrics are all
+# cheap NumPy reductions, so a whole folder scores in the time it takes to decode.
+QUALITY_SIZE = 512
+QualityScore = namedtuple("QualityScore", "sharpness brightness dark clipped entropy flat cloud")
+QUALITY_LIMITS = {
+    "min_sharpness": 60.0,   # Laplacian variance below this reads as blurred
+    "max_dark": 0.6,         # fraction of pixels crushed to black
+    "max_clipped": 0.5,      # fraction of pixels blown out
+    "max_flat": 0.8,         # fraction of 16px blocks with no texture
+    "max_cloud": 0.5,        # fraction of bright, textureless blocks
+}
+QUALITY_ORDERS = ("name", "sharpness", "exposure", "entropy")
+
+
+def quality_metrics(gray):
+    import numpy as np
+    gray = gray.astype(np.float32)
+    lap = (gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]) - 4 * gray[1:-1, 1:-1]
+    hist = np.bincount(gray.astype(np.uint8).ravel(), minlength=256) / gray.size
+    nonzero = hist[hist > 0]
+
+    h, w = gray.shape
+    b = 16
+    blocks = gray[:h // b * b, :w // b * b].reshape(h // b, b, w // b, b)
+    block_std = blocks.std(axis=(1, 3))
+    block_mean = blocks.mean(axis=(1, 3))
+    flat = block_std < 4
+    return QualityScore(
+        sharpness=float(lap.var()),
+        brightness=float(gray.mean() / 255),
+        dark=float(hist[:16].sum()),
+        clipped=float(hist[240:].sum()),
+        entropy=float((nonzero * np.log2(1 / nonzero)).sum()),
+        flat=float(flat.mean()) if flat.size else 0.0,
+        cloud=float((flat & (block_mean > 200)).mean()) if flat.size else 0.0,
+    )
+
+
+def score_batch(paths, size=QUALITY_SIZE):
+    # Runs in the shared process pool, one batch of paths per task
+    import numpy as np
+    rows = []
+    for path in paths:
+        try:
+            mtime, file_size = path_stat(path)
+            with open_image(path) as img:
+                img.draft("L", (size, size))
+                img = img.convert("L")
+                img.thumbnail((size, size))
+                score = quality_metrics(np.asarray(img))
+            rows.append((path, mtime, file_size) + tuple(score))
+        except Exception:
+            continue
+    return rows
+
+
+def quality_problem(score):
+    if score is None:
+        return ""
+    if score.dark > QUALITY_LIMITS["max_dark"]:
+        return "underexposed"
+    if score.clipped > QUALITY_LIMITS["max_clipped"]:
+        return "overexposed"
+    if score.cloud > QUALITY_LIMITS["max_cloud"]:
+        return "cloud"
+    if score.sharpness < QUALITY_LIMITS["min_sharpness"]:
+        return "blurry"
+    if score.flat > QUALITY_LIMITS["max_flat"]:
+        return "low texture"
+    return ""
+
+
+def quality_order(paths, scores, order):
+    # Unscored frames keep their listing order after the scored ones
+    if order == "name":
+        return list(paths)
+    if order == "sharpness":
+        key = lambda s: -s.sharpness
+    elif order == "exposure":
+        key = lambda s: abs(s.brightness - 0.5) + s.dark + s.clipped
+    else:
+        key = lambda s: -s.entropy
+    scored = [p for p in paths if p in scores]
+    scored.sort(key=lambda p: key(scores[p]))
+    return scored + [p for p in paths if p not in scores]
+
+
+class QualityScoreStore:
+    # Scores cached next to the thumbnails, validated by mtime and size
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(default_cache_dir(), "quality.db")
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            "path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, sharpness REAL, brightness REAL, "
+            "dark REAL, clipped REAL, entropy REAL, flat REAL, cloud REAL)"
+        )
+        self.conn.commit()
+
+    def get_many(self, paths):
+        paths = list(paths)
+        result = {}
+        with self.lock:
+            rows = []
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows.extend(self.conn.execute(f"SELECT * FROM scores WHERE path IN ({marks})", chunk))
+        for path, mtime, size, *metrics in rows:
+            try:
+                current = path_stat(path)
+            except OSError:
+                continue
+            if current == (mtime, size):
+                result[path] = QualityScore(*metrics)
+        return result
+
+    def put_many(self, rows):
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.commit()
+
+
+class QualityScorer:
+    # Scores one folder at a time in the background: cached rows come back
+    # first, the rest go through the process pool in batches. Results are
+    # posted to `scored` as (generation, {path: score}); None marks the end.
+    def __init__(self, store, batch_size=32):
+        self.store = store
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.job = None
+        self.wakeup = threading.Event()
+        self.scored = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def score(self, paths):
+        with self.lock:
+            self.generation += 1
+            self.job = (self.generation, list(paths))
+        self.wakeup.set()
+        return self.generation
+
+    def add(self, paths):
+        # More paths for the folder being scored (frames copied in since), same generation
+        with self.lock:
+            if self.job is not None:
+                self.job[1].extend(paths)
+            else:
+                self.job = (self.generation, list(paths))
+        self.wakeup.set()
+
+    def shutdown(self):
+        with self.lock:
+            self.generation += 1
+            self.job = None
+
+    def _run(self):
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            with self.lock:
+                job, self.job = self.job, None
+            if job is None:
+                continue
+            generation, paths = job
+            for start in range(0, len(paths), 512):
+                if generation != self.generation:
+                    break
+                chunk = paths[start:start + 512]
+                cached = self.store.get_many(chunk)
+                if cached:
+                    self.scored.put((generation, cached))
+                missing = [p for p in chunk if p not in cached]
+                try:
+                    futures = [
+                        shared_process_pool().submit(score_batch, missing[i:i + self.batch_size])
+                        for i in range(0, len(missing), self.batch_size)
+                    ]
+                    for future in futures:
+                        rows = future.result()
+                        if generation != self.generation:
+                            break
+                        self.store.put_many(rows)
+                        self.scored.put((generation, {row[0]: QualityScore(*row[3:]) for row in rows}))
+                except Exception:
+                    break  # pool shut down on quit
+            else:
+                self.scored.put((generation, None))
+
+
+NEAR_DUPLICATE_DISTANCE = 6
+
+
+def to_signed64(value):
+    # SQLite integers are signed; store 64-bit hashes in two's complement
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def dhash_array(images):
+    # 64-bit difference hashes for a batch of PIL images, as a uint64 array
+    import numpy as np
+    if not images:
+        return np.zeros(0, dtype=np.uint64)
+    pixels = np.stack([
+        np.asarray(img.convert("L").resize((9, 8), Image.Resampling.BILINEAR), dtype=np.int16)
+        for img in images
+    ])
+    bits = (pixels[:, :, 1:] > pixels[:, :, :-1]).reshape(len(images), 64)
+    return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def dhash_paths(paths):
+    # {path: hash} for the files that could be decoded; JPEGs decode at 1/8 scale
+    images, ok = [], []
+    for path in paths:
+        try:
+            with open_image(path) as img:
+                img.draft("L", (64, 64))
+                images.append(img.convert("L"))
+                ok.append(path)
+        except Exception:
+            continue
+    return dict(zip(ok, (int(h) for h in dhash_array(images))))
+
+
+def hamming_distances(hashes, value):
+    import numpy as np
+    diff = np.bitwise_xor(hashes, np.uint64(value))
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(diff)
+    return np.unpackbits(diff.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+
+
+class PerceptualIndex:
+    # Perceptual hashes of the selected images in one contiguous uint64 array;
+    # a lookup is a single vectorized XOR + popcount pass over it, which stays
+    # in the tens of milliseconds at a few million entries. The arrays are
+    # allocated on the first add, so an empty index never imports NumPy.
+    # Entries are keyed by source path (same-named frames from different
+    # folders are different entries); the label is what a match reports.
+    def __init__(self):
+        self.hashes = None
+        self.active = None
+        self.keys = []
+        self.labels = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key, value, label=None):
+        import numpy as np
+        if self.hashes is None:
+            self.hashes = np.zeros(1024, dtype=np.uint64)
+            self.active = np.zeros(1024, dtype=bool)
+        elif len(self.keys) == len(self.hashes):
+            self.hashes = np.concatenate([self.hashes, np.zeros_like(self.hashes)])
+            self.active = np.concatenate([self.active, np.zeros_like(self.active)])
+        position = len(self.keys)
+        self.hashes[position] = np.uint64(value & 0xFFFFFFFFFFFFFFFF)
+        self.active[position] = True
+        self.keys.append(key)
+        self.labels.append(key if label is None else label)
+        self.positions.setdefault(key, []).append(position)
+
+    def remove(self, key):
+        for position in self.positions.pop(key, []):
+            self.active[position] = False
+
+    def search(self, value, max_distance=NEAR_DUPLICATE_DISTANCE, limit=5):
+        count = len(self.keys)
+        if not count:
+            return []
+        import numpy as np
+        distances = hamming_distances(self.hashes[:count], value & 0xFFFFFFFFFFFFFFFF)
+        hits = np.nonzero((distances <= max_distance) & self.active[:count])[0]
+        hits = hits[np.argsort(distances[hits], kind="stable")][:limit]
+        return [(int(distances[i]), self.labels[i]) for i in hits]
+
+
+class ContentHashCache:
+    # path -> content hash, revalidated by mtime/size; filled by the prefetch
+    # workers while the file is still in the page cache
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def peek(self, path):
+        # The cached hash if the file is unchanged, else None; never reads the file
+        try:
+            stat = path_stat(path)
+        except OSError:
+            return None
+        with self.lock:
+            entry = self.entries.get(path)
+        return entry[1] if entry is not None and entry[0] == stat else None
+
+    def get(self, path):
+        stat = path_stat(path)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == stat:
+                return entry[1]
+        value = content_hash(path)
+        with self.lock:
+            self.entries[path] = (stat, value)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+    def warm(self, path):
+        try:
+            self.get(path)
+        except OSError:
+            pass
+
+
+def backfill_selection_hashes(db_path, batch_size=256):
+    # Fill in content/perceptual hashes for selections imported from a CSV.
+    # Runs on a worker thread with its own connection.
+    store = SelectionStore(db_path)
+    filled = 0
+    try:
+        while True:
+            rows = store.rows_missing_hashes(batch_size)
+            if not rows:
+                return filled
+            store.backfill_after = rows[-1][0]
+            sources = [source for _, source in rows if os.path.exists(source)]
+            phashes = dhash_paths(sources)
+            updates = []
+            for row_id, source in rows:
+                try:
+                    digest = content_hash(source)
+                except OSError:
+                    digest = None
+                phash = phashes.get(source)
+                updates.append((digest, None if phash is None else to_signed64(phash), row_id))
+            store.set_hashes(updates)
+            filled += len(rows)
+    finally:
+        store.close()
+
+
+CSV_HEADER = ['filename', 'scene_id', 'source_path']
+
+
+class SelectionStore:
+    # Selections live in SQLite (WAL) next to the CSV. Every user action is a
+    # batch recorded in an append-only journal, which gives unlimited
+    # undo/redo without rewriting anything. The CSV is only an import/export
+    # format now.
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is still crash-safe in WAL mode; fsync happens at WAL checkpoints
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS batches (
+                id INTEGER PRIMARY KEY, kind TEXT NOT NULL, ts REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS selections (
+                id INTEGER PRIMARY KEY, batch INTEGER, filename TEXT NOT NULL,
+                scene_id TEXT, source_path TEXT, dst_path TEXT, active INTEGER NOT NULL DEFAULT 1);
+            CREATE TABLE IF NOT EXISTS journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, batch INTEGER NOT NULL,
+                action TEXT NOT NULL, ts REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS selections_filename ON selections(filename, active);
+            CREATE INDEX IF NOT EXISTS selections_source ON selections(source_path);
+            CREATE INDEX IF NOT EXISTS selections_scene ON selections(scene_id);
+            CREATE INDEX IF NOT EXISTS selections_batch ON selections(batch);
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(selections)")}
+        if "content_hash" not in columns:
+            self.conn.execute("ALTER TABLE selections ADD COLUMN content_hash TEXT")
+        if "phash" not in columns:
+            self.conn.execute("ALTER TABLE selections ADD COLUMN phash INTEGER")
+        # Set on rows written by set_scene: the row this one stands in for
+        if "replaces" not in columns:
+            self.conn.execute("ALTER TABLE selections ADD COLUMN replaces INTEGER")
+        # ExportSettings.spec() of a re-encoded export, so redo writes the same file again
+        if "export" not in columns:
+            self.conn.execute("ALTER TABLE selections ADD COLUMN export TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS selections_hash ON selections(content_hash, active)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS selections_dst ON selections(dst_path, active)")
+        self.conn.commit()
+        self.undo_stack = None
+        self.redo_stack = None
+        # on_journal(batch, action, rows[, kind]) mirrors every journal entry, e.g. into a LabelerSession shard
+        self.on_journal = None
+
+    @staticmethod
+    def path_for_csv(csv_file):
+        return os.path.splitext(csv_file)[0] + ".selections.db"
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM selections LIMIT 1").fetchone() is None
+
+    def import_csv(self, csv_file):
+        # Imported rows are the baseline: they are active but not undoable
+        with open(csv_file, 'r', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            rows = [(row[0], row[1] if len(row) > 1 else "", row[2] if len(row) > 2 else "")
+                    for row in reader if row]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO selections (batch, filename, scene_id, source_path) VALUES (NULL, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def export_csv(self, csv_file, upto_id=None):
+        # Own connection so this can run on a worker thread; atomic replace.
+        # upto_id limits the snapshot so rows appended afterwards aren't written twice.
+        conn = sqlite3.connect(self.db_path)
+        try:
+            tmp_file = csv_file + ".tmp"
+            with open(tmp_file, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(CSV_HEADER)
+                writer.writerows(conn.execute(
+                    "SELECT filename, scene_id, source_path FROM selections "
+                    "WHERE active = 1 AND id <= ? ORDER BY id",
+                    (upto_id if upto_id is not None else 2 ** 62,)
+                ))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, csv_file)
+        finally:
+            conn.close()
+
+    def max_id(self):
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM selections").fetchone()[0]
+
+    def selected_keys(self):
+        # (content hashes, source paths) of active selections; legacy rows may lack a hash
+        hashes, sources = set(), set()
+        for content_hash, source_path in self.conn.execute(
+            "SELECT content_hash, source_path FROM selections WHERE active = 1"
+        ):
+            if content_hash:
+                hashes.add(content_hash)
+            if source_path:
+                sources.add(source_path)
+        return hashes, sources
+
+    def has_hash(self, content_hash):
+        return self.conn.execute(
+            "SELECT 1 FROM selections WHERE content_hash = ? AND active = 1 LIMIT 1", (content_hash,)
+        ).fetchone() is not None
+
+    def has_source(self, source_path):
+        return self.conn.execute(
+            "SELECT 1 FROM selections WHERE source_path = ? AND active = 1 LIMIT 1", (source_path,)
+        ).fetchone() is not None
+
+    def dst_owner(self, dst_path):
+        # Content hash of the active selection already written to dst_path, if any
+        row = self.conn.execute(
+            "SELECT content_hash FROM selections WHERE dst_path = ? AND active = 1 LIMIT 1", (dst_path,)
+        ).fetchone()
+        return None if row is None else (row[0] or "")
+
+    def perceptual_hashes(self):
+        # (source_path, filename, phash) of the active selections
+        return self.conn.execute(
+            "SELECT source_path, filename, phash FROM selections WHERE active = 1 AND phash IS NOT NULL"
+        ).fetchall()
+
+    def rows_missing_hashes(self, limit=256):
+        return self.conn.execute(
+            "SELECT id, source_path FROM selections "
+            "WHERE (content_hash IS NULL OR phash IS NULL) AND source_path != '' AND id > ? "
+            "ORDER BY id LIMIT ?", (getattr(self, "backfill_after", 0), limit)
+        ).fetchall()
+
+    def set_hashes(self, rows):
+        # rows: (content_hash, phash, id)
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE selections SET content_hash = COALESCE(?, content_hash), "
+                "phash = COALESCE(?, phash) WHERE id = ?", rows
+            )
+
+    def find_by_source(self, source_path):
+        return self.conn.execute(
+            "SELECT filename, scene_id, source_path, dst_path FROM selections WHERE source_path = ? AND active = 1",
+            (source_path,)
+        ).fetchall()
+
+    def find_by_scene(self, scene_id):
+        return self.conn.execute(
+            "SELECT filename, scene_id, source_path, dst_path FROM selections WHERE scene_id = ? AND active = 1",
+            (scene_id,)
+        ).fetchall()
+
+    def add(self, rows, exports=None):
+        # rows: (filename, scene_id, source_path, dst_path, content_hash, phash); one undoable batch.
+        # exports: an ExportSettings.spec() (or None for a plain copy) per row
+        self._load_history()
+        exports = exports or [None] * len(rows)
+        now = time.time()
+        with self.conn:
+            batch = self.conn.execute("INSERT INTO batches (kind, ts) VALUES ('select', ?)", (now,)).lastrowid
+            self.conn.executemany(
+                "INSERT INTO selections (batch, filename, scene_id, source_path, dst_path, content_hash, phash, "
+                "export) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(batch, *row, export) for row, export in zip(rows, exports)]
+            )
+            self.conn.execute("INSERT INTO journal (batch, action, ts) VALUES (?, 'apply', ?)", (batch, now))
+        self.undo_stack.append(batch)
+        self.redo_stack.clear()
+        if self.on_journal is not None:
+            self.on_journal(batch, "apply", rows)
+        return batch
+
+    def set_scene(self, source_paths, scene_id):
+        # Re-label active selections as one undoable batch. Each row is replaced
+        # by a copy carrying the new scene_id, so undo/redo just swap them.
+        self._load_history()
+        source_paths = list(source_paths)
+        old = []
+        for start in range(0, len(source_paths), 500):
+            chunk = source_paths[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            old.extend(self.conn.execute(
+                "SELECT id, filename, source_path, dst_path, content_hash, phash FROM selections "
+                f"WHERE active = 1 AND scene_id IS NOT ? AND source_path IN ({marks}) ORDER BY id",
+                [scene_id, *chunk]
+            ))
+        if not old:
+            return None, []
+        rows = [(filename, scene_id, source_path, dst_path, digest, phash)
+                for _, filename, source_path, dst_path, digest, phash in old]
+        now = time.time()
+        with self.conn:
+            batch = self.conn.execute("INSERT INTO batches (kind, ts) VALUES ('scene', ?)", (now,)).lastrowid
+            self.conn.executemany(
+                "INSERT INTO selections (batch, filename, scene_id, source_path, dst_path, content_hash, phash, "
+                "replaces) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(batch, *row, old_row[0]) for row, old_row in zip(rows, old)]
+            )
+            self.conn.executemany("UPDATE selections SET active = 0 WHERE id = ?", [(r[0],) for r in old])
+            self.conn.execute("INSERT INTO journal (batch, action, ts) VALUES (?, 'apply', ?)", (batch, now))
+        self.undo_stack.append(batch)
+        self.redo_stack.clear()
+        if self.on_journal is not None:
+            self.on_journal(batch, "apply", rows, "scene")
+        return batch, rows
+
+    def undo(self):
+        self._load_history()
+        if not self.undo_stack:
+            return None
+        batch = self.undo_stack[-1]
+        result = self._set_active(batch, 0, "undo")
+        self.redo_stack.append(self.undo_stack.pop())
+        return result
+
+    def next_redo(self):
+        # Batch id redo() would re-apply, or None
+        self._load_history()
+        return self.redo_stack[-1] if self.redo_stack else None
+
+    def export_specs(self, batch):
+        # Export spec per row of a batch, in the order _set_active returns the rows
+        return [row[0] for row in self.conn.execute(
+            "SELECT export FROM selections WHERE batch = ? ORDER BY id", (batch,)
+        )]
+
+    def redo(self):
+        self._load_history()
+        if not self.redo_stack:
+            return None
+        batch = self.redo_stack[-1]
+        result = self._set_active(batch, 1, "redo")
+        self.undo_stack.append(self.redo_stack.pop())
+        return result
+
+    def _set_active(self, batch, active, action):
+        with self.conn:
+            kind = self.conn.execute("SELECT kind FROM batches WHERE id = ?", (batch,)).fetchone()[0]
+            self.conn.execute("UPDATE selections SET active = ? WHERE batch = ?", (active, batch))
+            self.conn.execute(
+                "UPDATE selections SET active = ? WHERE id IN "
+                "(SELECT replaces FROM selections WHERE batch = ? AND replaces IS NOT NULL)",
+                (1 - active, batch)
+            )
+            self.conn.execute(
+                "INSERT INTO journal (batch, action, ts) VALUES (?, ?, ?)", (batch, action, time.time())
+            )
+        rows = self.conn.execute(
+            "SELECT filename, scene_id, source_path, dst_path, content_hash, phash FROM selections "
+            "WHERE batch = ? ORDER BY id",
+            (batch,)
+        ).fetchall()
+        if self.on_journal is not None:
+            self.on_journal(batch, action, None)
+        return kind, rows
+
+    def active_batches(self):
+        # {batch: rows} of everything currently selected; imported rows are batch 0
+        batches = {}
+        for batch, *row in self.conn.execute(
+            "SELECT COALESCE(batch, 0), filename, scene_id, source_path, dst_path, content_hash, phash "
+            "FROM selections WHERE active = 1 ORDER BY id"
+        ):
+            batches.setdefault(batch, []).append(tuple(row))
+        return batches
+
+    def _load_history(self):
+        # Rebuild the undo/redo stacks by replaying the journal, once per session
+        if self.undo_stack is not None:
+            return
+        undo, redo = [], []
+        for batch, action in self.conn.execute("SELECT batch, action FROM journal ORDER BY seq"):
+            if action == "apply":
+                undo.append(batch)
+                redo.clear()
+            elif action == "undo" and undo:
+                redo.append(undo.pop())
+            elif action == "redo" and redo:
+                undo.append(redo.pop())
+        self.undo_stack, self.redo_stack = undo, redo
+
+    def close(self):
+        self.conn.close()
+
+
+SESSION_DIR_NAME = ".pstool_sessions"
+# A labeler whose heartbeat is older than this is treated as gone
+LEASE_TIMEOUT = 90
+
+
+def read_json(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, value):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(value, f)
+    os.replace(tmp, path)
+
+
+def labeler_alive(session_dir, labeler):
+    lease = read_json(os.path.join(session_dir, f"{labeler}.lease"))
+    return lease is not None and time.time() - lease.get("ts", 0) < LEASE_TIMEOUT
+
+
+class LabelerSession:
+    # One labeler's presence in a shared output folder: an append-only JSONL
+    # shard of selection events, a heartbeat lease and folder claims. Each
+    # shard has exactly one writer, so nothing here needs locks that NFS
+    # might not honour; other sessions only ever read it.
+    def __init__(self, output_dir, labeler):
+        self.labeler = re.sub(r"[^\w.-]", "_", labeler)
+        self.dir = os.path.join(output_dir, SESSION_DIR_NAME)
+        self.shard_path = os.path.join(self.dir, f"{self.labeler}.jsonl")
+        self.lease_path = os.path.join(self.dir, f"{self.labeler}.lease")
+        self.claims_dir = os.path.join(self.dir, "claims")
+        self.owner = {"host": socket.gethostname(), "pid": os.getpid()}
+        self.claimed = set()
+        os.makedirs(self.claims_dir, exist_ok=True)
+
+        lease = read_json(self.lease_path)
+        if lease is not None and labeler_alive(self.dir, self.labeler) \
+                and (lease.get("host"), lease.get("pid")) != (self.owner["host"], self.owner["pid"]):
+            raise RuntimeError(f"Labeler '{self.labeler}' already has a live session on {lease.get('host')}")
+        self.heartbeat()
+        self.fd = os.open(self.shard_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def heartbeat(self):
+        write_json(self.lease_path, dict(self.owner, ts=time.time()))
+
+    def is_empty(self):
+        return os.path.getsize(self.shard_path) == 0
+
+    def record(self, batch, action, rows=None, kind=None):
+        # One os.write per event on an O_APPEND descriptor, so readers never see half a line
+        event = {"batch": batch, "action": action, "ts": time.time()}
+        if rows is not None:
+            event["rows"] = [list(row) for row in rows]
+        if kind is not None:
+            event["kind"] = kind
+        os.write(self.fd, (json.dumps(event) + "\n").encode("utf-8"))
+
+    def snapshot(self, store):
+        # Seed an empty shard with what the local store already holds
+        for batch, rows in store.active_batches().items():
+            self.record(batch, "apply", rows)
+
+    def claim_path(self, folder):
+        name = hashlib.blake2b(folder.encode("utf-8"), digest_size=12).hexdigest()
+        return os.path.join(self.claims_dir, name + ".json")
+
+    def claim(self, folder):
+        # None once this labeler holds the folder, otherwise the live owner's name
+        path = self.claim_path(folder)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                claim = read_json(path) or {}
+                owner = claim.get("labeler")
+                if owner == self.labeler:
+                    self.claimed.add(path)
+                    return None
+                if owner and labeler_alive(self.dir, owner):
+                    return owner
+                try:
+                    os.remove(path)  # stale claim from a session that went away
+                except OSError:
+                    pass
+                continue
+            with os.fdopen(fd, 'w') as f:
+                json.dump({"folder": folder, "labeler": self.labeler, "ts": time.time()}, f)
+            self.claimed.add(path)
+            return None
+        return None
+
+    def release(self, folder):
+        # Hand a folder back once this labeler has moved on from it
+        path = self.claim_path(folder)
+        if path not in self.claimed:
+            return
+        self.claimed.discard(path)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def csv_for(self, csv_file):
+        # Each labeler writes their own CSV; `merge` builds the shared one
+        return f"{os.path.splitext(csv_file)[0]}.{self.labeler}.csv"
+
+    def close(self):
+        for path in self.claimed:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.claimed.clear()
+        os.close(self.fd)
+        try:
+            os.remove(self.lease_path)
+        except OSError:
+            pass
+
+
+class SelectionFeed:
+    # Follows the labelers' shards. Byte offsets are kept per file so a
+    # refresh only parses what was appended since the last one; a shard that
+    # shrank was compacted and is re-read from the start.
+    def __init__(self, session_dir, exclude=None):
+        self.dir = session_dir
+        self.exclude = exclude
+        self.offsets = {}
+        self.batches = {}  # (labeler, batch) -> [rows, active, ts, kind]
+
+    def refresh(self):
+        changed = False
+        try:
+            names = [n for n in os.listdir(self.dir) if n.endswith(".jsonl")]
+        except OSError:
+            return False
+        for name in names:
+            labeler = name[:-len(".jsonl")]
+            if labeler == self.exclude:
+                continue
+            path = os.path.join(self.dir, name)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            offset = self.offsets.get(labeler, 0)
+            if size < offset:
+                self.batches = {k: v for k, v in self.batches.items() if k[0] != labeler}
+                offset = 0
+                changed = True
+            if size == offset:
+                continue
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read(size - offset)
+            end = data.rfind(b"\n") + 1  # a line still being written waits for the next refresh
+            for line in data[:end].splitlines():
+                try:
+                    self.apply(labeler, json.loads(line))
+                except ValueError:
+                    continue
+            self.offsets[labeler] = offset + end
+            changed = changed or end > 0
+        return changed
+
+    def apply(self, labeler, event):
+        key = (labeler, event["batch"])
+        if event["action"] == "apply":
+            self.batches[key] = [[tuple(row) for row in event.get("rows", [])], True, event["ts"], event.get("kind")]
+        elif key in self.batches:
+            self.batches[key][1] = event["action"] == "redo"
+
+    def active_rows(self):
+        # (labeler, row) for every active selection, oldest batch first
+        entries = sorted(
+            ((ts, key[0], rows, kind) for key, (rows, active, ts, kind) in self.batches.items() if active),
+            key=lambda e: e[0]
+        )
+        result = []
+        for _, labeler, rows, kind in entries:
+            if kind == "scene":
+                # A re-label stands in for that labeler's earlier rows of the same files
+                relabeled = {row[2] for row in rows}
+                result = [(owner, row) for owner, row in result if owner != labeler or row[2] not in relabeled]
+            result.extend((labeler, row) for row in rows)
+        return result
+
+
+def merge_sessions(output_dir, csv_file, compact=False, progress=print):
+    # Merge every labeler's shard into one CSV (first selection of a file wins)
+    # and optionally compact shards whose sessions have ended. Returns rows written.
+    session_dir = os.path.join(output_dir, SESSION_DIR_NAME)
+    feed = SelectionFeed(session_dir)
+    feed.refresh()
+
+    seen, rows = set(), []
+    for _, (filename, scene_id, source_path, _, digest, _) in feed.active_rows():
+        key = digest or source_path
+        if key in seen:
+            continue
+        seen.add(key)
+        rows.append((filename, scene_id, source_path))
+
+    tmp_file = f"{csv_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(rows)
+    os.replace(tmp_file, csv_file)
+    labelers = sorted({labeler for labeler, _ in feed.batches})
+    progress(f"✅ Merged {len(rows)} selections from {len(labelers)} labelers into {csv_file}")
+
+    if compact:
+        for labeler in labelers:
+            if labeler_alive(session_dir, labeler):
+                progress(f"⏭️ Not compacting {labeler}: session still live")
+                continue
+            # Batch ids survive so a later undo/redo from that labeler still applies
+            path = os.path.join(session_dir, f"{labeler}.jsonl")
+            tmp = path + ".tmp"
+            with open(tmp, 'w') as f:
+                batches = sorted(feed.batches.items(), key=lambda e: e[1][2])
+                for (owner, batch), (batch_rows, active, ts, kind) in batches:
+                    if owner != labeler:
+                        continue
+                    event = {"batch": batch, "action": "apply", "ts": ts, "rows": [list(r) for r in batch_rows]}
+                    if kind is not None:
+                        event["kind"] = kind
+                    f.write(json.dumps(event) + "\n")
+                    if not active:
+                        f.write(json.dumps({"batch": batch, "action": "undo", "ts": ts}) + "\n")
+            os.replace(tmp, path)
+            progress(f"🗜️ Compacted shard: {labeler}")
+    return len(rows)
+
+
+FICLONE = 0x40049409
+
+
+def reflink_file(src, dst):
+    import fcntl  # POSIX only; callers fall back to a plain copy
+
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+
+def place_file(src, dst, mode="copy"):
+    # Materialise src at dst through a temporary name so dst is never half-written
+    if is_remote(dst):
+        remote_storage().copy(src, dst)  # object writes are atomic already
+        return
+    tmp = dst + ".part"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    if is_virtual(src):
+        # Archive members are extracted one at a time, straight from the mapped archive
+        with open_file(src) as fsrc, open(tmp, 'wb') as fdst:
+            shutil.copyfileobj(fsrc, fdst)
+    elif mode == "hardlink":
+        os.link(src, tmp)
+    elif mode == "symlink":
+        os.symlink(os.path.abspath(src), tmp)
+    elif mode == "reflink":
+        try:
+            reflink_file(src, tmp)
+        except (OSError, ImportError):
+            if os.path.lexists(tmp):
+                os.remove(tmp)
+            shutil.copy2(src, tmp)
+    else:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def commit_selection(store, export_worker, row, transform=None, append_csv=True):
+    # row: (filename, scene_id, source_path, dst_path, content_hash, phash).
+    # Records one undoable batch and queues the copy and the CSV row.
+    return commit_selections(store, export_worker, [row], [transform], append_csv)
+
+
+def commit_selections(store, export_worker, rows, transforms=None, append_csv=True):
+    # Any number of rows as one undoable batch: a single SQLite transaction,
+    # the copies queued in one call and the CSV rows appended in one write
+    transforms = transforms or [None] * len(rows)
+    batch = store.add(rows, [
+        None if transform is None else transform[0].spec(transform[1]) for transform in transforms
+    ])
+    export_worker.submit_many([
+        (row[2], row[3], transform) for row, transform in zip(rows, transforms)
+        if os.path.abspath(row[2]) != os.path.abspath(row[3])
+    ])
+    if append_csv:
+        for filename, scene_id, source_path in (row[:3] for row in rows):
+            export_worker.append_row([filename, scene_id, source_path])
+    return batch
+
+
+def revert_selection(store, export_worker):
+    # Undo the newest batch, deleting outputs no other active selection still uses
+    result = store.undo()
+    if result is None:
+        return None
+    for row in result[1]:
+        dst_path = row[3]
+        if dst_path and store.dst_owner(dst_path) is None:
+            export_worker.remove(dst_path)
+    return result
+
+
+def replay_selection(store, export_worker):
+    # Redo the newest undone batch, placing each file again the way it was
+    # first exported (same format, size and crop)
+    batch = store.next_redo()
+    result = store.redo()
+    if result is None:
+        return None
+    kind, rows = result
+    if kind != "scene":
+        items = []
+        for row, spec in zip(rows, store.export_specs(batch)):
+            filename, scene_id, source_path, dst_path = row[:4]
+            if not dst_path or os.path.abspath(source_path) == os.path.abspath(dst_path):
+                continue
+            transform = None
+            if spec:
+                settings, crop = ExportSettings.from_spec(spec)
+                transform = (settings, crop, {"scene_id": scene_id, "source_path": source_path})
+            items.append((source_path, dst_path, transform))
+        export_worker.submit_many(items)
+    return result
+
+
+class ExportSettings:
+    # How a selection is written out. The defaults copy the original bytes;
+    # anything else re-encodes the image in the shared process pool.
+    FORMATS = ("original", "jpeg", "webp", "png")
+    EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp", "png": ".png"}
+    # "original" re-encodes these in their own format and everything else (BMP) as PNG
+    PASSTHROUGH = {".jpg": "jpeg", ".jpeg": "jpeg", ".webp": "webp", ".png": "png"}
+
+    def __init__(self, format="original", quality=90, max_side=None, crop_to_view=False):
+        self.format = format
+        self.quality = quality
+        self.max_side = max_side
+        self.crop_to_view = crop_to_view
+
+    @property
+    def transforms(self):
+        return self.format != "original" or bool(self.max_side) or self.crop_to_view
+
+    def output_format(self, filename):
+        # Format encode_export writes for this source
+        if self.format != "original":
+            return self.format
+        return self.PASSTHROUGH.get(os.path.splitext(filename)[1].lower(), "png")
+
+    def output_name(self, filename):
+        stem, ext = os.path.splitext(filename)
+        if not self.transforms or self.PASSTHROUGH.get(ext.lower()) == self.output_format(filename):
+            return filename
+        return stem + self.EXTENSIONS[self.output_format(filename)]
+
+    def spec(self, crop=None):
+        # JSON kept with each selection so redo can re-export it identically
+        return json.dumps({
+            "format": self.format, "quality": self.quality, "max_side": self.max_side,
+            "crop": list(crop) if crop else None,
+        })
+
+    @classmethod
+    def from_spec(cls, spec):
+        # (settings, crop) back from spec()
+        values = json.loads(spec)
+        crop = values.pop("crop", None)
+        return cls(**values), tuple(crop) if crop else None
+
+    def describe(self):
+        if not self.transforms:
+            return "original files"
+        parts = [self.format if self.format != "original" else "same format", f"q{self.quality}"]
+        if self.max_side:
+            parts.append(f"≤{self.max_side}px")
+        if self.crop_to_view:
+            parts.append("cropped to view")
+        return ", ".join(parts)
+
+
+def encode_export(src, settings, crop=None, metadata=None):
+    # (bytes, extension) of src after crop -> resize -> re-encode. scene_id and
+    # source_path go into EXIF ImageDescription (JPEG/WebP) or PNG text chunks.
+    with open_image(src) as img:
+        fmt = settings.output_format(src)  # must agree with output_name
+        exif = img.getexif()
+        if crop is not None:
+            img = img.crop(crop)
+        if settings.max_side and max(img.size) > settings.max_side:
+            img.thumbnail((settings.max_side, settings.max_side), Image.Resampling.LANCZOS)
+
+        options = {}
+        if fmt == "png":
+            from PIL.PngImagePlugin import PngInfo
+
+            info = PngInfo()
+            for key, value in (metadata or {}).items():
+                info.add_text(key, str(value))
+            options["pnginfo"] = info
+        else:
+            if metadata:
+                exif[0x010E] = json.dumps(metadata)
+            options["exif"] = exif.tobytes()
+            options["quality"] = settings.quality
+            if fmt == "jpeg" and img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+
+        buf = io.BytesIO()
+        img.save(buf, fmt.upper(), **options)
+    return buf.getvalue(), ExportSettings.EXTENSIONS[fmt]
+
+
+def export_image(src, dst, settings, crop=None, metadata=None):
+    # Runs in the shared process pool
+    data, _ = encode_export(src, settings, crop, metadata)
+    if is_remote(dst):
+        remote_storage().write(dst, data)
+        return dst
+    tmp = dst + ".part"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, dst)
+    return dst
+
+
+def export_sample(job):
+    # (key, {extension: bytes}) for one WebDataset sample, or (key, None) on failure.
+    # Without transforms the original bytes go into the shard unchanged.
+    key, src, settings, metadata = job
+    try:
+        if settings.transforms:
+            data, ext = encode_export(src, settings, None, metadata)
+        else:
+            with open_file(src) as f:
+                data = f.read()
+            ext = os.path.splitext(src)[1].lower()
+    except Exception:
+        return key, None
+    return key, {ext.lstrip("."): data, "json": json.dumps(metadata).encode("utf-8")}
+
+
+class ShardWriter:
+    # WebDataset-style output: numbered tar shards where every sample is a
+    # group of members sharing one key (key.jpg + key.json).
+    def __init__(self, out_dir, prefix="shard", max_count=1000, max_bytes=1024 ** 3):
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.index = -1
+        self.tar = None
+        self.count = 0
+        self.size = 0
+        self.paths = []
+
+    def _roll(self):
+        self.close()
+        self.index += 1
+        path = os.path.join(self.out_dir, f"{self.prefix}-{self.index:06d}.tar")
+        self.tar = tarfile.open(path + ".part", "w")
+        self.paths.append(path)
+        self.count = self.size = 0
+
+    def add(self, key, members):
+        if self.tar is None or self.count >= self.max_count or self.size >= self.max_bytes:
+            self._roll()
+        for ext, data in members.items():
+            info = tarfile.TarInfo(f"{key}.{ext}")
+            info.size = len(data)
+            info.mtime = time.time()
+            self.tar.addfile(info, io.BytesIO(data))
+            self.size += len(data)
+        self.count += 1
+
+    def close(self):
+        if self.tar is not None:
+            self.tar.close()
+            os.replace(self.paths[-1] + ".part", self.paths[-1])
+            self.tar = None
+
+
+def sample_key(filename, used):
+    # WebDataset splits keys at the first dot, so the key must not contain one
+    key = re.sub(r"[^\w-]", "_", os.path.splitext(filename)[0])
+    base, n = key, 1
+    while key in used:
+        n += 1
+        key = f"{base}_{n}"
+    used.add(key)
+    return key
+
+
+def unique_name(filename, used):
+    # filename, or filename_2, _3... when an earlier row already took it
+    stem, ext = os.path.splitext(filename)
+    name, n = filename, 1
+    while name.lower() in used:
+        n += 1
+        name = f"{stem}_{n}{ext}"
+    used.add(name.lower())
+    return name
+
+
+EXPORT_METADATA_NAME = "export_metadata.jsonl"
+
+
+def export_selection(csv_file, out_dir, settings, shard_size=None, workers=None, progress=print):
+    # Headless re-export of a selection CSV: one file per row, or shards of
+    # shard_size samples when shard_size is given. Returns (exported, failed).
+    # Shards hold a .json member per sample; exported files are listed with
+    # their scene_id and source_path in EXPORT_METADATA_NAME, since plain
+    # copies keep their bytes and carry no embedded metadata.
+    with open(csv_file, newline='') as f:
+        rows = [r for r in csv.DictReader(f) if r.get("source_path")]
+    os.makedirs(out_dir, exist_ok=True)
+    exported = failed = 0
+    started = time.time()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if shard_size:
+            used = set()
+            jobs = [
+                (sample_key(r["filename"], used), r["source_path"], settings,
+                 {"filename": r["filename"], "scene_id": r["scene_id"], "source_path": r["source_path"]})
+                for r in rows
+            ]
+            writer = ShardWriter(out_dir, max_count=shard_size)
+            try:
+                for key, members in pool.map(export_sample, jobs, chunksize=8):
+                    if members is None:
+                        failed += 1
+                        progress(f"❌ Could not export: {key}")
+                        continue
+                    writer.add(key, members)
+                    exported += 1
+                    if exported % 500 == 0:
+                        progress(f"📦 {exported}/{len(rows)} samples")
+            finally:
+                writer.close()
+            progress(f"📦 Wrote {len(writer.paths)} shards to {out_dir}")
+        else:
+            # Same-named frames from different folders must not overwrite each other
+            futures, used, records = {}, set(), []
+            for r in rows:
+                dst = os.path.join(out_dir, unique_name(settings.output_name(r["filename"]), used))
+                metadata = {"scene_id": r["scene_id"], "source_path": r["source_path"]}
+                if settings.transforms:
+                    future = pool.submit(export_image, r["source_path"], dst, settings, None, metadata)
+                else:
+                    future = pool.submit(place_file, r["source_path"], dst)
+                futures[future] = (dst, dict(metadata, file=os.path.basename(dst), filename=r["filename"]))
+            for future, (dst, record) in futures.items():
+                try:
+                    future.result()
+                    exported += 1
+                    records.append(record)
+                except Exception as e:
+                    failed += 1
+                    progress(f"❌ Could not export: {dst} - {e}")
+                if exported and exported % 500 == 0:
+                    progress(f"📤 {exported}/{len(rows)} files")
+            metadata_path = os.path.join(out_dir, EXPORT_METADATA_NAME)
+            with open(metadata_path + ".part", 'w') as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+            os.replace(metadata_path + ".part", metadata_path)
+
+    progress(f"✅ Exported {exported} of {len(rows)} selections in {time.time() - started:.1f}s ({failed} failed)")
+    return exported, failed
+
+
+class ExportWorker:
+    # Copies/links selected files to the output folder on a thread pool and
+    # appends CSV rows in batches on a single writer thread, so select_image
+    # never waits on storage. Results are handed to Tk through a queue.
+    MODES = ("copy", "hardlink", "reflink", "symlink")
+
+    def __init__(self, workers=4, mode="copy", retries=3, checkpoint_rows=1000, stats=None):
+        self.stats = stats or StageStats()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export")
+        self.csv_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export-csv")
+        self.mode = mode
+        self.retries = retries
+        self.checkpoint_rows = checkpoint_rows
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.discarded = set()
+        self.devices = {}
+        self.results = queue.Queue()
+        self.csv_buffer = []
+        self.rows_since_sync = 0
+        self.saved = 0
+        self.failed = 0
+
+    @property
+    def backlog(self):
+        with self.lock:
+            return len(self.pending)
+
+    def effective_mode(self, src, dst):
+        # Links only work within one filesystem; anything else is a copy
+        if self.mode == "copy" or is_virtual(src) or is_virtual(dst):
+            return "copy"
+        key = (os.path.dirname(src), os.path.dirname(dst))
+        if key not in self.devices:
+            try:
+                self.devices[key] = os.stat(key[0]).st_dev == os.stat(key[1]).st_dev
+            except OSError:
+                self.devices[key] = False
+        return self.mode if self.devices[key] else "copy"
+
+    def submit(self, src, dst, transform=None):
+        # transform is (settings, crop, metadata) for re-encoded exports
+        self.submit_many([(src, dst, transform)])
+
+    def submit_many(self, items):
+        # (src, dst, transform) triples queued under a single lock hold
+        modes = [self.effective_mode(src, dst) for src, dst, _ in items]
+        with self.lock:
+            for (src, dst, transform), mode in zip(items, modes):
+                self.discarded.discard(dst)
+                token = object()
+                self.pending[dst] = (token, self.executor.submit(self._place, src, dst, mode, token, transform))
+
+    def remove(self, dst):
+        with self.lock:
+            entry = self.pending.get(dst)
+            if entry is not None:
+                if entry[1].cancel():
+                    del self.pending[dst]
+                else:
+                    self.discarded.add(dst)  # still copying: delete once it lands
+                    return
+        self.executor.submit(self._remove, dst)
+
+    def _place(self, src, dst, mode, token, transform=None):
+        error = None
+        started = time.perf_counter()
+        for attempt in range(self.retries):
+            try:
+                if transform is not None:
+                    shared_process_pool().submit(export_image, src, dst, *transform).result()
+                else:
+                    place_file(src, dst, mode)
+                error = None
+                break
+            except Exception as e:
+                error = e
+                if attempt + 1 < self.retries:
+                    time.sleep(0.5 * 2 ** attempt)
+
+        with self.lock:
+            if self.pending.get(dst, (None,))[0] is token:
+                del self.pending[dst]
+            discard = dst in self.discarded
+            self.discarded.discard(dst)
+            if error is None:
+                self.saved += 1
+            else:
+                self.failed += 1
+
+        self.stats.record("export.encode" if transform is not None else "export.copy", started)
+        if discard and error is None:
+            self._remove(dst)
+        self.results.put(("saved" if error is None else "failed", src, dst, error))
+
+    def _remove(self, dst):
+        try:
+            if is_remote(dst):
+                remote_storage().delete(dst)
+            elif os.path.lexists(dst):
+                os.remove(dst)
+        except OSError as e:
+            self.results.put(("failed", None, dst, e))
+
+    def append_row(self, row):
+        self.csv_buffer.append(row)
+
+    def flush_csv(self, csv_file, sync=False):
+        rows, self.csv_buffer = self.csv_buffer, []
+        if rows or sync:
+            self.csv_executor.submit(self._append_rows, csv_file, rows, sync)
+
+    def _append_rows(self, csv_file, rows, sync):
+        try:
+            with self.stats.stage("export.csv_append"), open(csv_file, 'a', newline='') as f:
+                writer = csv.writer(f)
+                if os.fstat(f.fileno()).st_size == 0:
+                    writer.writerow(CSV_HEADER)
+                writer.writerows(rows)
+                self.rows_since_sync += len(rows)
+                # fsync only at checkpoints rather than per row
+                if sync or self.rows_since_sync >= self.checkpoint_rows:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self.rows_since_sync = 0
+        except Exception as e:
+            self.results.put(("csv_failed", None, csv_file, e))
+
+    def rewrite_csv(self, store, csv_file, upto_id):
+        # Buffered rows are already in the store snapshot the rewrite reads
+        self.csv_buffer.clear()
+        self.csv_executor.submit(self._rewrite_csv, store, csv_file, upto_id)
+
+    def _rewrite_csv(self, store, csv_file, upto_id):
+        try:
+            with self.stats.stage("export.csv_rewrite"):
+                store.export_csv(csv_file, upto_id)
+            self.rows_since_sync = 0
+        except Exception as e:
+            self.results.put(("csv_failed", None, csv_file, e))
+
+    def close(self, csv_file=None):
+        if csv_file:
+            self.flush_csv(csv_file, sync=True)
+        self.executor.shutdown(wait=True)
+        self.csv_executor.shutdown(wait=True)
+
+
+SUPPORTED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class DirectoryListing:
+    def __init__(self, mtime, dirs, images):
+        self.mtime = mtime
+        self.dirs = dirs
+        self.images = images
+        self.search_index = None
+
+
+def run_in_background(widget, func, on_done, poll_ms=40):
+    # Run func on a worker thread and hand (result, error) back on the Tk thread
+    result = {}
+
+    def work():
+        try:
+            result["value"] = func()
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=work, daemon=True)
+    thread.start()
+
+    def poll():
+        if thread.is_alive():
+            widget.after(poll_ms, poll)
+        else:
+            on_done(result.get("value"), result.get("error"))
+
+    widget.after(poll_ms, poll)
+
+
+def fuzzy_pattern(text):
+    return re.compile(".*?".join(re.escape(c) for c in text))
+
+
+def linear_search(names, text, mode="substring"):
+    text = text.lower()
+    if not text:
+        return list(names)
+    if mode == "prefix":
+        return [n for n in names if n.lower().startswith(text)]
+    if mode == "fuzzy":
+        pattern = fuzzy_pattern(text)
+        scored = []
+        for i, name in enumerate(names):
+            match = pattern.search(name.lower())
+            if match:
+                scored.append((match.end() - match.start(), i))
+        scored.sort()
+        return [names[i] for _, i in scored]
+    return [n for n in names if text in n.lower()]
+
+
+class FolderSearchIndex:
+    # Lowercased names with a trigram index for substring queries and a
+    # sorted key list for prefix queries. Results keep the original order.
+    MODES = ("substring", "prefix", "fuzzy")
+
+    def __init__(self, names):
+        self.names = names
+        self.lowered = [n.lower() for n in names]
+        self.by_key = sorted(range(len(names)), key=self.lowered.__getitem__)
+        self.sorted_keys = [self.lowered[i] for i in self.by_key]
+        self.trigrams = {}
+        for i, name in enumerate(self.lowered):
+            for gram in {name[j:j + 3] for j in range(len(name) - 2)}:
+                self.trigrams.setdefault(gram, []).append(i)
+
+    def search(self, text, mode="substring"):
+        text = text.lower()
+        if not text:
+            return list(self.names)
+
+        if mode == "prefix":
+            start = bisect.bisect_left(self.sorted_keys, text)
+            end = bisect.bisect_left(self.sorted_keys, text + "\uffff")
+            return [self.names[i] for i in sorted(self.by_key[start:end])]
+
+        if mode == "fuzzy":
+            return linear_search(self.names, text, mode)
+
+        if len(text) < 3:
+            return [self.names[i] for i, name in enumerate(self.lowered) if text in name]
+
+        postings = sorted(
+            (self.trigrams.get(text[j:j + 3], ()) for j in range(len(text) - 2)), key=len
+        )
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+        return [self.names[i] for i in sorted(candidates) if text in self.lowered[i]]
+
+
+def walk_folders(base):
+    # Every directory below base as a path relative to it (symlinks not followed)
+    if is_remote(base):
+        return remote_storage().walk_folders(base)
+    found = []
+    stack = [""]
+    while stack:
+        rel = stack.pop()
+        try:
+            with os.scandir(os.path.join(base, rel)) as entries:
+                for entry in entries:
+                    try:
+                        if not entry.is_dir(follow_symlinks=False):
+                            continue
+                    except OSError:
+                        continue
+                    child = os.path.join(rel, entry.name) if rel else entry.name
+                    found.append(child)
+                    stack.append(child)
+        except OSError:
+            continue
+    found.sort()
+    return found
+
+
+MANIFEST_NAME = ".pstool_manifest.db"
+
+
+def content_hash(path, chunk_size=1024 * 1024):
+    digest = hashlib.blake2b(digest_size=16)
+    with open_file(path) as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def gps_to_degrees(value, ref):
+    degrees, minutes, seconds = (float(v) for v in value)
+    result = degrees + minutes / 60 + seconds / 3600
+    return -result if ref in ("S", "W") else result
+
+
+def exif_summary(img):
+    # (capture timestamp, latitude, longitude) from EXIF, any of which may be None
+    try:
+        exif = img.getexif()
+    except Exception:
+        return None, None, None
+    taken_at = exif.get_ifd(0x8769).get(0x9003) or exif.get(0x0132)
+    lat = lon = None
+    gps = exif.get_ifd(0x8825)
+    try:
+        if 2 in gps and 4 in gps:
+            lat = gps_to_degrees(gps[2], gps.get(1))
+            lon = gps_to_degrees(gps[4], gps.get(3))
+    except (TypeError, ValueError, ZeroDivisionError):
+        lat = lon = None
+    return taken_at, lat, lon
+
+
+def index_file(entry):
+    # Process-pool worker: one manifest row for (path, size, mtime) seen by the walk
+    path, size, mtime = entry
+    width = height = fmt = None
+    taken_at = lat = lon = None
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            fmt = img.format
+            taken_at, lat, lon = exif_summary(img)
+    except Exception:
+        pass
+    try:
+        digest = content_hash(path)
+    except OSError:
+        digest = None
+    return (path, os.path.dirname(path), os.path.basename(path), size, mtime,
+            width, height, fmt, taken_at, lat, lon, digest)
+
+
+def scan_tree(root):
+    # All image files as (path, size, mtime) and all directories and archives as (path, parent, name, mtime)
+    files, dirs = [], []
+    root_stat = os.stat(root)
+    dirs.append((root, os.path.dirname(root), os.path.basename(root), root_stat.st_mtime_ns))
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            dirs.append((entry.path, current, entry.name, entry.stat().st_mtime_ns))
+                            stack.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in ARCHIVE_EXTENSIONS:
+                            # Archives browse as folders, so listings must keep them next to the subfolders
+                            dirs.append((entry.path, current, entry.name, entry.stat().st_mtime_ns))
+                        elif os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS:
+                            st = entry.stat()
+                            files.append((entry.path, st.st_size, st.st_mtime_ns))
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return files, dirs
+
+
+class Manifest:
+    # SQLite manifest of a dataset tree written by the "index" command. The GUI
+    # uses it for directory listings whenever a directory's mtime still matches.
+    # The manifest usually sits inside the tree it describes, so it must never
+    # create side files there (they would bump the root's mtime): the indexer
+    # keeps its journal in memory and the GUI opens it read-only.
+    def __init__(self, db_path, readonly=False):
+        self.db_path = db_path
+        if readonly:
+            self.conn = sqlite3.connect(f"file:{urllib.parse.quote(os.path.abspath(db_path))}?mode=ro", uri=True)
+            return
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=MEMORY")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY, dir TEXT NOT NULL, name TEXT NOT NULL,
+                size INTEGER, mtime INTEGER, width INTEGER, height INTEGER, format TEXT,
+                taken_at TEXT, gps_lat REAL, gps_lon REAL, content_hash TEXT);
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY, parent TEXT, name TEXT, mtime INTEGER);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE INDEX IF NOT EXISTS files_dir ON files(dir, name);
+            CREATE INDEX IF NOT EXISTS files_hash ON files(content_hash);
+            CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent, name);
+        """)
+        self.conn.commit()
+
+    def file_stats(self):
+        return {path: (size, mtime) for path, size, mtime in
+                self.conn.execute("SELECT path, size, mtime FROM files")}
+
+    def upsert_files(self, rows):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def delete_files(self, paths):
+        with self.conn:
+            self.conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in paths])
+
+    def replace_dirs(self, dirs):
+        with self.conn:
+            self.conn.execute("DELETE FROM dirs")
+            self.conn.executemany("INSERT INTO dirs VALUES (?, ?, ?, ?)", dirs)
+
+    def set_meta(self, **values):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)", [(k, str(v)) for k, v in values.items()]
+            )
+
+    def listing(self, path):
+        path = os.path.abspath(path)
+        row = self.conn.execute("SELECT mtime FROM dirs WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return None
+        try:
+            if os.stat(path).st_mtime_ns != row[0]:
+                return None  # changed since it was indexed: let the scanner look
+        except OSError:
+            return None
+        dirs = [r[0] for r in self.conn.execute("SELECT name FROM dirs WHERE parent = ? ORDER BY name", (path,))]
+        images = [r[0] for r in self.conn.execute("SELECT name FROM files WHERE dir = ? ORDER BY name", (path,))]
+        return DirectoryListing(row[0], dirs, images)
+
+    def capture_times(self, path):
+        # {path: taken_at} for the indexed images in one directory that have a capture time
+        return dict(self.conn.execute(
+            "SELECT path, taken_at FROM files WHERE dir = ? AND taken_at IS NOT NULL", (os.path.abspath(path),)
+        ))
+
+    def close(self):
+        self.conn.close()
+
+
+def build_manifest(root, manifest_path=None, workers=None, progress=print):
+    root = os.path.abspath(root)
+    manifest_path = manifest_path or os.path.join(root, MANIFEST_NAME)
+    manifest = Manifest(manifest_path)
+    started = time.time()
+
+    files, dirs = scan_tree(root)
+    known = manifest.file_stats()
+    changed = [f for f in files if known.get(f[0]) != (f[1], f[2])]
+    seen = {f[0] for f in files}
+    removed = [p for p in known if p not in seen]
+    progress(f"📂 {len(files)} images in {len(dirs)} folders; {len(changed)} new or changed, {len(removed)} removed")
+
+    if changed:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            batch = []
+            for done, row in enumerate(pool.map(index_file, changed, chunksize=16), 1):
+                batch.append(row)
+                if len(batch) >= 500:
+                    manifest.upsert_files(batch)
+                    batch = []
+                    progress(f"  indexed {done}/{len(changed)}")
+            manifest.upsert_files(batch)
+
+    manifest.delete_files(removed)
+    manifest.replace_dirs(dirs)
+    manifest.set_meta(root=root, indexed_at=time.time())
+    manifest.close()
+    progress(f"✅ Manifest written to {manifest_path} in {time.time() - started:.1f}s")
+    return manifest_path
+
+
+def iter_folder(path):
+    # (is_dir, name) for the subfolders, archives and images directly in path
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            ext = os.path.splitext(entry.name)[1].lower()
+            if is_dir or ext in ARCHIVE_EXTENSIONS:
+                yield True, entry.name
+            elif ext in SUPPORTED_EXTENSIONS:
+                yield False, entry.name
+
+
+def scan_folder(path):
+    # Blocking listing for headless callers; the GUI streams through DirectoryScanner
+    if is_virtual(path):
+        return storage_for(path).listing(path)
+    mtime = os.stat(path).st_mtime_ns
+    dirs, images = [], []
+    for is_dir, name in iter_folder(path):
+        (dirs if is_dir else images).append(name)
+    dirs.sort()
+    images.sort()
+    return DirectoryListing(mtime, dirs, images)
+
+
+class DirectoryScanner:
+    # os.scandir on a background thread, streaming batches back to Tk. Finished
+    # listings are cached per path and revalidated against the directory mtime.
+    def __init__(self, root, batch_size=2000, max_cached=256):
+        self.root = root
+        self.batch_size = batch_size
+        self.max_cached = max_cached
+        self.cache = OrderedDict()
+        self.active = {}
+        self.results = queue.Queue()
+        self.poll_job = None
+        self.manifest = None
+
+    def cached(self, path):
+        listing = self.cache.get(path)
+        if listing is None:
+            return None
+        try:
+            if is_remote(path):
+                mtime = remote_storage().listing_mtime(path)
+            else:
+                mtime = os.stat(split_virtual(path)[0]).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != listing.mtime:
+            del self.cache[path]
+            return None
+        self.cache.move_to_end(path)
+        return listing
+
+    def listdir(self, path, on_done, on_batch=None):
+        # on_batch(dirs, images) while streaming, then on_done(listing, error)
+        listing = self.cached(path)
+        if listing is None and self.manifest is not None:
+            listing = self.manifest.listing(path)
+            if listing is not None:
+                self.cache[path] = listing
+        if listing is not None:
+            on_done(listing, None)
+            return
+
+        if path in self.active:
+            self.active[path].append((on_batch, on_done))
+            return
+
+        self.active[path] = [(on_batch, on_done)]
+        threading.Thread(target=self._scan, args=(path,), daemon=True).start()
+        if self.poll_job is None:
+            self.poll_job = self.root.after(30, self._pump)
+
+    def invalidate(self, path):
+        self.cache.pop(path, None)
+
+    def prime(self, path, listing):
+        # A listing made elsewhere (the review queue) so opening the folder does not rescan it
+        self.cache[path] = listing
+        self.cache.move_to_end(path)
+        while len(self.cache) > self.max_cached:
+            self.cache.popitem(last=False)
+
+    def _scan(self, path):
+        if is_remote(path):
+            # Listing pages stream in like scandir batches
+            try:
+                listing = remote_storage().listing(
+                    path, on_page=lambda dirs, images: self.results.put((path, "batch", (dirs, images)))
+                )
+                self.results.put((path, "done", listing))
+            except OSError as e:
+                self.results.put((path, "error", e))
+            return
+        if is_virtual(path):
+            try:
+                self.results.put((path, "done", archive_storage().listing(path)))
+            except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+                self.results.put((path, "error", e))
+            return
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            dirs, images = [], []
+            batch_dirs, batch_images = [], []
+            for is_dir, name in iter_folder(path):
+                (batch_dirs if is_dir else batch_images).append(name)
+                if len(batch_dirs) + len(batch_images) >= self.batch_size:
+                    self.results.put((path, "batch", (batch_dirs, batch_images)))
+                    dirs.extend(batch_dirs)
+                    images.extend(batch_images)
+                    batch_dirs, batch_images = [], []
+
+            if batch_dirs or batch_images:
+                self.results.put((path, "batch", (batch_dirs, batch_images)))
+                dirs.extend(batch_dirs)
+                images.extend(batch_images)
+            dirs.sort()
+            images.sort()
+            self.results.put((path, "done", DirectoryListing(mtime, dirs, images)))
+        except OSError as e:
+            self.results.put((path, "error", e))
+
+    def _pump(self):
+        self.poll_job = None
+        try:
+            while True:
+                path, kind, payload = self.results.get_nowait()
+                if kind == "batch":
+                    for on_batch, _ in self.active.get(path, []):
+                        if on_batch is not None:
+                            on_batch(*payload)
+                    continue
+
+                subscribers = self.active.pop(path, [])
+                if kind == "done":
+                    self.cache[path] = payload
+                    while len(self.cache) > self.max_cached:
+                        self.cache.popitem(last=False)
+                    for _, on_done in subscribers:
+                        on_done(payload, None)
+                else:
+                    for _, on_done in subscribers:
+                        on_done(None, payload)
+        except queue.Empty:
+            pass
+
+        if self.active:
+            self.poll_job = self.root.after(30, self._pump)
+
+
+def entry_signature(entry):
+    # Size and mtime catch a file rewritten in place; on POSIX the inode also
+    # catches one replaced by rename with the same size and timestamp
+    st = entry.stat()
+    if os.name == "nt":
+        return st.st_mtime_ns, st.st_size
+    return entry.inode(), st.st_mtime_ns, st.st_size
+
+
+class FolderWatcher:
+    # Polls the open folder for frames that are still being copied in; inotify
+    # is unreliable over NFS, so this diffs readdir results instead. While the
+    # directory mtime holds still a poll is a single stat; when it moves the
+    # folder is re-read with one stat per image. New images are only
+    # announced once their size and mtime have settled, so a half-copied frame
+    # is never decoded. A full re-read every FULL_RESCAN_POLLS covers file
+    # systems with coarse directory mtimes and files rewritten in place
+    # (which leave the directory mtime alone).
+    FULL_RESCAN_POLLS = 30
+    # Polls back off so re-reads take at most this share of the time
+    MAX_DUTY = 0.1
+
+    def __init__(self, root, on_change, interval_ms=2000):
+        # on_change(folder, added, removed, changed, dirs_added, dirs_removed), names only
+        self.root = root
+        self.on_change = on_change
+        self.interval_ms = interval_ms
+        self.state = None
+        self.job = None
+
+    def watch(self, path, listing):
+        self.stop()
+        if is_virtual(path):
+            return  # archives do not change under us
+        # Only the poll thread touches a state; watch() starts a fresh one
+        self.state = {
+            "path": path, "mtime": listing.mtime, "polls": 0, "pending": {}, "cost": 0.0,
+            "entries": dict.fromkeys(listing.images),  # name -> signature, None until the first re-read
+            "dirs": set(listing.dirs),
+        }
+        self.job = self.root.after(self.interval_ms, self._poll)
+
+    def stop(self):
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+        self.job = None
+        self.state = None
+
+    def _poll(self):
+        self.job = None
+        state = self.state
+
+        def done(change, error):
+            if state is not self.state:
+                return
+            if error is not None:
+                self.stop()  # folder gone; the next click rescans it
+                return
+            if change is not None:
+                self.on_change(state["path"], *change)
+            delay = max(self.interval_ms, int(state["cost"] * 1000 / self.MAX_DUTY))
+            self.job = self.root.after(delay, self._poll)
+
+        run_in_background(self.root, lambda: self._check(state), done, poll_ms=100)
+
+    def _check(self, state):
+        # Worker thread: (added, removed, changed, dirs_added, dirs_removed) or None
+        path, pending = state["path"], state["pending"]
+        state["polls"] += 1
+        mtime = os.stat(path).st_mtime_ns
+        removed, changed, dirs_added, dirs_removed = [], [], [], []
+        if mtime != state["mtime"] or state["polls"] % self.FULL_RESCAN_POLLS == 0:
+            started = time.perf_counter()
+            state["mtime"] = mtime
+            entries, dirs = {}, set()
+            with os.scandir(path) as it:
+                for entry in it:
+                    # Extension first: is_dir() may cost a stat where d_type is unknown
+                    name = entry.name
+                    ext = name[name.rfind("."):].lower() if "." in name else ""
+                    try:
+                        if ext in SUPPORTED_EXTENSIONS:
+                            entries[name] = entry_signature(entry)
+                        elif ext in ARCHIVE_EXTENSIONS or entry.is_dir():
+                            dirs.add(name)
+                    except OSError:
+                        continue
+            known = state["entries"]
+            for name, signature in entries.items():
+                if name not in known:
+                    pending.setdefault(name, None)
+                elif known[name] is not None and known[name] != signature:
+                    changed.append(name)
+            removed = [name for name in known if name not in entries]
+            for name in [n for n in pending if n not in entries]:
+                del pending[name]
+            dirs_added = sorted(dirs - state["dirs"])
+            dirs_removed = sorted(state["dirs"] - dirs)
+            state["entries"] = {name: sig for name, sig in entries.items() if name not in pending}
+            state["dirs"] = dirs
+            state["cost"] = time.perf_counter() - started
+        elif not pending:
+            return None
+
+        added = []
+        now = time.time()
+        for name, last in list(pending.items()):
+            try:
+                st = os.stat(os.path.join(path, name))
+            except OSError:
+                continue
+            current = (st.st_mtime_ns, st.st_size)
+            # Settled: unchanged since the last poll, or last written well before this one
+            if current == last or now - st.st_mtime > self.interval_ms / 1000:
+                del pending[name]
+                state["entries"][name] = None
+                added.append(name)
+            else:
+                pending[name] = current
+
+        if not (added or removed or changed or dirs_added or dirs_removed):
+            return None
+        return sorted(added), removed, changed, dirs_added, dirs_removed
+
+
+REVIEW_ORDERS = ("off", "depth-first", "capture time", "unreviewed first")
+
+
+def capture_time(path):
+    # EXIF capture time ("YYYY:MM:DD HH:MM:SS" sorts as text), else the file mtime
+    try:
+        with open_image(path) as img:
+            taken_at = exif_summary(img)[0]
+        if taken_at:
+            return str(taken_at)
+    except Exception:
+        pass
+    try:
+        mtime = path_stat(path)[0] / 1e9
+    except OSError:
+        return ""
+    return time.strftime("%Y:%m:%d %H:%M:%S", time.localtime(mtime))
+
+
+def iter_review_queue(base, order="depth-first", progress=None, manifest=None):
+    # (folder, listing, image paths) for each folder below base that has images,
+    # in review order. A folder is listed only when the walk reaches it (capture
+    # time also lists a folder's children to order them by their first frame);
+    # "unreviewed first" holds finished folders back, by name, until the end.
+    def listing_for(folder):
+        listing = manifest.listing(folder) if manifest is not None and not is_virtual(folder) else None
+        return listing if listing is not None else scan_folder(folder)
+
+    def frame_times(folder, paths):
+        known = manifest.capture_times(folder) if manifest is not None and not is_virtual(folder) else {}
+        return {p: known.get(p) or capture_time(p) for p in paths}
+
+    finished = []
+    stack = [(base, None)]
+    while stack:
+        folder, listing = stack.pop()
+        try:
+            listing = listing or listing_for(folder)
+        except (OSError, tarfile.TarError, zipfile.BadZipFile):
+            continue
+        paths = [join_path(folder, name) for name in listing.images]
+        children = [join_path(folder, name) for name in listing.dirs]
+        if order == "capture time":
+            times = frame_times(folder, paths)
+            paths.sort(key=lambda p: (times[p], p))
+            keyed = []
+            for child in children:
+                try:
+                    child_listing = listing_for(child)
+                except (OSError, tarfile.TarError, zipfile.BadZipFile):
+                    continue
+                first = join_path(child, child_listing.images[0]) if child_listing.images else None
+                keyed.append((frame_times(child, [first])[first] if first else "", child, child_listing))
+            keyed.sort(key=lambda k: k[:2])
+            stack.extend((child, child_listing) for _, child, child_listing in reversed(keyed))
+        else:
+            stack.extend((child, None) for child in reversed(children))
+
+        if not paths:
+            continue
+        if order == "unreviewed first" and progress is not None and progress.is_done(folder):
+            finished.append(folder)
+            continue
+        yield folder, listing, paths
+
+    for folder in finished:
+        try:
+            listing = listing_for(folder)
+        except (OSError, tarfile.TarError, zipfile.BadZipFile):
+            continue
+        if listing.images:
+            yield folder, listing, [join_path(folder, name) for name in listing.images]
+
+
+class ReviewProgress:
+    # Per-folder review position for the cross-folder queue, cached with the thumbnails
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(default_cache_dir(), "review.db")
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS progress ("
+            "folder TEXT PRIMARY KEY, last_path TEXT, position INTEGER, total INTEGER, "
+            "done INTEGER NOT NULL DEFAULT 0, ts REAL)"
+        )
+        self.conn.commit()
+
+    def get(self, folder):
+        # (last_path, position, total, done) or None for a folder never opened in the queue
+        with self.lock:
+            return self.conn.execute(
+                "SELECT last_path, position, total, done FROM progress WHERE folder = ?", (folder,)
+            ).fetchone()
+
+    def is_done(self, folder):
+        row = self.get(folder)
+        return bool(row and row[3])
+
+    def update(self, folder, last_path, position, total, done=False):
+        # A finished folder stays finished when it is revisited
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO progress VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(folder) DO UPDATE SET "
+                "last_path = excluded.last_path, position = excluded.position, total = excluded.total, "
+                "done = MAX(done, excluded.done), ts = excluded.ts",
+                (folder, last_path, position, total, int(done), time.time())
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class ReviewQueue:
+    # Runs iter_review_queue on a background thread, listing at most LOOKAHEAD
+    # folders past the one on screen. The Tk side polls peek()/take().
+    LOOKAHEAD = 1
+
+    def __init__(self, base, order, progress, manifest_path=None, skip=None):
+        self.base = base
+        self.order = order
+        self.progress = progress
+        self.manifest_path = manifest_path
+        self.skip = skip
+        self.ready = queue.Queue(maxsize=self.LOOKAHEAD)
+        self.upcoming = None
+        self.finished = False
+        self.stopped = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def peek(self):
+        # (folder, listing, paths) of the next folder once it is listed, else None
+        if self.upcoming is None and not self.finished:
+            try:
+                item = self.ready.get_nowait()
+            except queue.Empty:
+                return None
+            if item is None:
+                self.finished = True
+            else:
+                self.upcoming = item
+        return self.upcoming
+
+    def take(self):
+        item = self.peek()
+        self.upcoming = None
+        return item
+
+    def stop(self):
+        self.stopped.set()
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.ready.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        # The manifest connection belongs to this thread
+        manifest = None
+        if self.manifest_path:
+            try:
+                manifest = Manifest(self.manifest_path, readonly=True)
+            except sqlite3.Error:
+                manifest = None
+        try:
+            for item in iter_review_queue(self.base, self.order, self.progress, manifest):
+                if item[0] != self.skip and not self._put(item):
+                    return
+        except Exception:
+            pass  # walk stopped by an unreadable tree; what was queued still stands
+        finally:
+            if manifest is not None:
+                manifest.close()
+        self._put(None)
+
+
+def session_state_path(labeler=None):
+    # The last session of this machine; one per labeler name
+    if not labeler:
+        return os.path.join(default_cache_dir(), "session.json")
+    labeler = re.sub(r"[^\w.-]", "_", labeler)
+    return os.path.join(default_cache_dir(), f"session.{labeler}.json")
+
+
+def load_session_state(path):
+    # The saved session, or None when it is missing or its folders are gone
+    state = read_json(path)
+    if not isinstance(state, dict):
+        return None
+    base_dir, output_dir = state.get("base_dir"), state.get("output_dir")
+    # Remote prefixes are not checked here; that would put a request before the first frame
+    if not base_dir or not output_dir or not state.get("csv_file"):
+        return None
+    if not (is_remote(base_dir) or os.path.isdir(base_dir)) or not (is_remote(output_dir) or os.path.isdir(output_dir)):
+        return None
+    folder = state.get("current_folder")
+    if not folder or not (is_remote(folder) or os.path.exists(split_virtual(folder)[0])):
+        state["current_folder"] = base_dir
+    return state
+
+
+def save_session_state(path, state):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_json(path, state)
+
+
+def setup_logging(log_dir=None, max_bytes=5 * 1024 * 1024, backups=5):
+    # Full log goes to a rotating file (and stdout) from a listener thread, so
+    # callers on any thread only pay for a queue put. Returns (logger, listener).
+    logger = logging.getLogger("pstool")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    handlers = [logging.StreamHandler(sys.stdout)]
+    handlers[0].setFormatter(logging.Formatter("%(message)s"))
+    log_dir = log_dir or os.path.join(default_cache_dir(), "logs")
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(log_dir, "pstool.log"), maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+        )
+        file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s [%(threadName)s] %(message)s"))
+        handlers.append(file_handler)
+    except OSError as e:
+        print(f"⚠️ File logging disabled: {e}")
+
+    records = queue.Queue()
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    return logger, listener
+
+
+class LogPanel(logging.Handler):
+    # Feeds the Tk log widget. Records from any thread land in a bounded
+    # buffer; Tk drains it with one insert at most every flush_ms, and the
+    # widget only ever holds the last max_lines lines.
+    def __init__(self, widget, max_lines=2000, flush_ms=100):
+        super().__init__(level=logging.INFO)
+        self.widget = widget
+        self.max_lines = max_lines
+        self.flush_ms = flush_ms
+        self.pending = deque(maxlen=max_lines)
+        self.buffer_lock = threading.Lock()
+        self.setFormatter(logging.Formatter("%(message)s"))
+        widget.tag_configure("error", foreground="#ff6b6b")
+        widget.after(flush_ms, self.drain)
+
+    def emit(self, record):
+        line = self.format(record)
+        with self.buffer_lock:
+            self.pending.append((line, "error" if record.levelno >= logging.ERROR else ()))
+
+    def drain(self):
+        with self.buffer_lock:
+            batch = list(self.pending)
+            self.pending.clear()
+
+        if batch:
+            # Only follow the tail if the user hasn't scrolled up to read something
+            at_bottom = self.widget.yview()[1] >= 0.999
+            chunks = []
+            for line, tags in batch:
+                chunks.extend((line + "\n", tags))
+            self.widget.configure(state='normal')
+            self.widget.insert(tk.END, *chunks)
+            # Count what the widget holds; a record with a traceback spans many
+            # lines. Every record ends in a newline, so the last line is empty.
+            excess = int(self.widget.index("end-1c").split(".")[0]) - 1 - self.max_lines
+            if excess > 0:
+                self.widget.delete("1.0", f"{excess + 1}.0")
+            self.widget.configure(state='disabled')
+            if at_bottom:
+                self.widget.yview(tk.END)
+
+        self.widget.after(self.flush_ms, self.drain)
+
+
+class ViewerCore:
+    # The viewing pipeline without Tk: listing -> prefetched decode ->
+    # fit-to-canvas -> zoom/pan -> output bitmap. It uses the same geometry
+    # and resampling as ImageSelectorGUI, which only adds PhotoImage and the
+    # canvas on top; the benchmark drives it directly.
+    def __init__(self, canvas_size=(1600, 1000), stats=None, prefetcher=None):
+        self.canvas_size = canvas_size
+        self.stats = stats or StageStats()
+        self.prefetcher = prefetcher or ImagePrefetcher(stats=self.stats, fit_size=canvas_size)
+        self.paths = []
+        self.index = 0
+        self.zoom = 1.0
+        self.offset = (0, 0)
+        self.pyramid = None
+
+    def open_folder(self, folder):
+        with self.stats.stage("view.scan"):
+            listing = scan_folder(folder)
+        self.prefetcher.cancel()
+        self.paths = [join_path(folder, name) for name in listing.images]
+        self.index = 0
+        return listing
+
+    def show(self, index, preview=False):
+        self.index = index
+        self.zoom = 1.0
+        self.offset = (0, 0)
+        with self.stats.stage("view.fetch"):
+            self.pyramid = self.prefetcher.get(self.paths[index])
+        self.prefetcher.schedule(self.paths, index)
+        return self.frame(preview)
+
+    def step(self, delta):
+        return self.show(min(max(self.index + delta, 0), len(self.paths) - 1))
+
+    def zoom_by(self, factor, preview=False):
+        self.zoom *= factor
+        return self.frame(preview)
+
+    def pan(self, dx, dy, preview=False):
+        self.offset = (self.offset[0] + dx, self.offset[1] + dy)
+        return self.frame(preview)
+
+    def frame(self, preview=False):
+        # What the canvas would show: the visible part of the scaled image on black
+        canvas_width, canvas_height = self.canvas_size
+        final_scale, new_width, new_height, left, top = fit_geometry(
+            self.pyramid.size, self.canvas_size, self.zoom, self.offset
+        )
+        if self.pyramid.base_scale < 1.0 and final_scale > self.pyramid.base_scale:
+            # The GUI does this in the background and upscales meanwhile
+            with self.stats.stage("view.upgrade"):
+                self.pyramid = self.prefetcher.get_full(self.paths[self.index])
+        box = (max(0, -left), max(0, -top), min(new_width, canvas_width - left), min(new_height, canvas_height - top))
+        output = Image.new("RGB", self.canvas_size)
+        if box[2] > box[0] and box[3] > box[1]:
+            with self.stats.stage("view.resize"):
+                region = render_region(self.pyramid, final_scale, (new_width, new_height), box, preview)
+            output.paste(region, (left + box[0], top + box[1]))
+        return output
+
+
+class VirtualListbox:
+    # Canvas-backed list that only creates items for the rows currently in view,
+    # so setting 100k entries costs nothing on the Tk side.
+    def __init__(self, parent, on_select=None, row_height=22, font=("Arial", 11)):
+        self.on_select = on_select
+        self.row_height = row_height
+        self.font = font
+        self.items = []
+        self.selected = None
+        self.fg = "black"
+        self.select_bg = "#cccccc"
+
+        self.frame = tk.Frame(parent)
+        self.canvas = tk.Canvas(self.frame, bg="white", highlightthickness=1)
+        self.scrollbar = tk.Scrollbar(self.frame, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set, yscrollincrement=row_height)
+
+        self.canvas.bind("<Configure>", lambda e: self.redraw())
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<MouseWheel>", lambda e: self.yview("scroll", int(-1 * (e.delta / 120)), "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def configure(self, bg=None, fg=None, highlightbackground=None, selectbackground=None):
+        if bg is not None:
+            self.canvas.configure(bg=bg)
+        if highlightbackground is not None:
+            self.canvas.configure(highlightbackground=highlightbackground)
+        if fg is not None:
+            self.fg = fg
+        if selectbackground is not None:
+            self.select_bg = selectbackground
+        self.redraw()
+
+    def set_items(self, items, reset_view=False):
+        self.items = items
+        self.selected = None
+        self.canvas.configure(scrollregion=(0, 0, 1, len(items) * self.row_height))
+        if reset_view:
+            self.canvas.yview_moveto(0)
+        self.redraw()
+
+    def size(self):
+        return len(self.items)
+
+    def get(self, index):
+        return self.items[index]
+
+    def curselection(self):
+        return () if self.selected is None else (self.selected,)
+
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        self.redraw()
+
+    def redraw(self):
+        top = self.canvas.canvasy(0)
+        first = max(0, int(top // self.row_height))
+        last = min(len(self.items), int((top + self.canvas.winfo_height()) // self.row_height) + 1)
+        width = self.canvas.winfo_width()
+
+        self.canvas.delete("row")
+        for index in range(first, last):
+            y = index * self.row_height
+            if index == self.selected:
+                self.canvas.create_rectangle(
+                    0, y, width, y + self.row_height, fill=self.select_bg, outline="", tags="row"
+                )
+            self.canvas.create_text(
+                6, y + self.row_height // 2, anchor="w", text=self.items[index],
+                fill=self.fg, font=self.font, tags="row"
+            )
+
+    def on_click(self, event):
+        index = int(self.canvas.canvasy(event.y) // self.row_height)
+        if 0 <= index < len(self.items):
+            self.selected = index
+            self.redraw()
+            if self.on_select is not None:
+                self.on_select(event)
 
 
 class FolderNavigator:
-    def __init__(self, parent, on_folder_change):
+    SEARCH_DEBOUNCE_MS = 150
+    # Below this many folders a plain scan is faster than building an index
+    INDEX_THRESHOLD = 2000
+
+    def __init__(self, parent, on_folder_change, scanner=None, on_error=print, stats=None):
         self.parent = parent
+        self.stats = stats or StageStats()
         self.on_folder_change = on_folder_change
+        self.scanner = scanner or DirectoryScanner(parent)
+        self.on_error = on_error
         self.current_path = ""
+        self.base_path = ""
         self.all_folders = []
+        self.listing = None
+        self.row_paths = []
+        self.search_job = None
+        self.recursive_index = None
+        self.recursive_building = False
 
         self.frame = tk.Frame(parent, width=250)
         self.frame.grid(row=0, column=0, sticky="nsew")
@@ -25,14 +3798,26 @@ class FolderNavigator:
 
         # 🔍 Search Bar
         self.search_var = tk.StringVar()
-        self.search_var.trace_add("write", self.update_filter)
+        self.search_var.trace_add("write", self.schedule_filter)
         self.search_entry = tk.Entry(self.frame, textvariable=self.search_var)
         self.search_entry.pack(fill=tk.X, padx=10, pady=(0, 5))
 
-        # Listbox for folders
-        self.listbox = tk.Listbox(self.frame)
+        search_options = tk.Frame(self.frame)
+        search_options.pack(fill=tk.X, padx=10, pady=(0, 5))
+        self.search_mode = tk.StringVar(value="substring")
+        self.mode_menu = tk.OptionMenu(
+            search_options, self.search_mode, *FolderSearchIndex.MODES, command=self.schedule_filter
+        )
+        self.mode_menu.pack(side=tk.LEFT)
+        self.recursive_var = tk.BooleanVar(value=False)
+        self.recursive_check = tk.Checkbutton(
+            search_options, text="All subfolders", variable=self.recursive_var, command=self.schedule_filter
+        )
+        self.recursive_check.pack(side=tk.LEFT, padx=5)
+
+        # Listbox for folders (virtualized: only visible rows exist as canvas items)
+        self.listbox = VirtualListbox(self.frame, on_select=self.handle_selection)
         self.listbox.pack(fill=tk.BOTH, expand=True, padx=10)
-        self.listbox.bind("<<ListboxSelect>>", self.handle_selection)
 
         # Select button
         #self.select_button = tk.Button(self.frame, text="Select Folder", command=self.select_folder)
@@ -45,25 +3830,109 @@ class FolderNavigator:
     #         self.load(folder_path)
     #         self.on_folder_change(folder_path)
 
+    def set_base_path(self, path):
+        self.base_path = path
+        self.recursive_index = None
+
     def load(self, path):
+        started = time.perf_counter()
         self.current_path = path
-        try:
-            self.all_folders = sorted([
-                d for d in os.listdir(path)
-                if os.path.isdir(os.path.join(path, d))
-            ])
+        self.all_folders = []
+        self.listing = None
+        self.update_filter(reset_view=True)
+
+        def on_batch(dirs, images):
+            if path == self.current_path:
+                self.all_folders.extend(dirs)
+                self.update_filter()
+
+        def on_done(listing, error):
+            if path != self.current_path:
+                return
+            if error is not None:
+                self.on_error(f"Error loading folders: {error}")
+                return
+            self.stats.record("folder.navigator", started)
+            self.listing = listing
+            self.all_folders = listing.dirs
             self.update_filter()
-        except Exception as e:
-            self.on_folder_change.log_error(f"Error loading folders: {e}")
+            self.index_listing(listing)
+
+        self.scanner.listdir(path, on_done, on_batch)
+
+    def index_listing(self, listing):
+        if listing.search_index is None and len(listing.dirs) >= self.INDEX_THRESHOLD:
+            def indexed(index, error):
+                if index is not None:
+                    listing.search_index = index
+            run_in_background(self.frame, lambda: FolderSearchIndex(listing.dirs), indexed)
+
+    def refresh_dirs(self, path, added, removed):
+        # Subfolders that appeared or went away under the open folder, without a rescan
+        if path != self.current_path or self.listing is None:
+            return
+        gone = set(removed)
+        dirs = sorted([d for d in self.listing.dirs if d not in gone] + added)
+        self.listing = DirectoryListing(self.listing.mtime, dirs, self.listing.images)
+        self.all_folders = dirs
+        self.recursive_index = None
+        self.update_filter()
+        self.index_listing(self.listing)
+
+    def schedule_filter(self, *args):
+        if self.search_job is not None:
+            self.frame.after_cancel(self.search_job)
+        self.search_job = self.frame.after(
+            self.SEARCH_DEBOUNCE_MS, lambda: self.update_filter(reset_view=True)
+        )
+
+    def update_filter(self, *args, reset_view=False):
+        self.search_job = None
+        filter_text = self.search_var.get()
+        mode = self.search_mode.get()
+
+        rows = [".. (Go Up)"]
+        self.row_paths = [parent_path(self.current_path)]
+
+        if filter_text and self.recursive_var.get() and self.base_path:
+            if self.recursive_index is None:
+                self.build_recursive_index()
+                rows.append("⏳ Indexing subfolders...")
+                self.row_paths.append(None)
+            else:
+                for rel in self.recursive_index.search(filter_text, mode):
+                    rows.append(rel)
+                    self.row_paths.append(
+                        join_path(self.base_path, rel) if is_remote(self.base_path) else os.path.join(self.base_path, rel)
+                    )
+            self.listbox.set_items(rows, reset_view=True)
+            return
+
+        index = self.listing.search_index if self.listing is not None else None
+        if index is not None and index.names is self.all_folders:
+            matches = index.search(filter_text, mode)
+        else:
+            matches = linear_search(self.all_folders, filter_text, mode)
+        rows.extend(matches)
+        self.row_paths.extend(join_path(self.current_path, m) for m in matches)
+        self.listbox.set_items(rows, reset_view=reset_view)
 
-    def update_filter(self, *args):
-        filter_text = self.search_var.get().lower()
-        self.listbox.delete(0, tk.END)
-        self.listbox.insert(tk.END, ".. (Go Up)")
+    def build_recursive_index(self):
+        if self.recursive_building:
+            return
+        self.recursive_building = True
+        base = self.base_path
+
+        def indexed(index, error):
+            self.recursive_building = False
+            if error is not None:
+                self.on_error(f"Error indexing subfolders: {error}")
+                return
+            if base == self.base_path:
+                self.recursive_index = index
+                self.update_filter()
 
-        for folder in self.all_folders:
-            if filter_text in folder.lower():
-                self.listbox.insert(tk.END, folder)
+        run_in_background(self.frame, lambda: FolderSearchIndex(walk_folders(base)), indexed)
 
 
     def handle_selection(self, event):
@@ -71,23 +3940,34 @@ class FolderNavigator:
         if not index:
             return
 
-        selection = self.listbox.get(index[0])
-        if selection.startswith(".."):
-            new_path = os.path.dirname(self.current_path)
-        else:
-            new_path = os.path.join(self.current_path, selection)
+        new_path = self.row_paths[index[0]]
+        if new_path is None:
+            return
 
-        if os.path.exists(new_path) and os.path.isdir(new_path):
+        if is_folder(new_path):
             self.current_path = new_path  # ✅ ensure internal path state updates
-            self.on_folder_change(new_path)  # 👈 calls back to main GUI to load images
-            self.load(new_path)  # 👈 refresh sidebar list based on new path
+            self.on_folder_change(new_path)  # 👈 calls back to main GUI, which also refreshes this sidebar
 
 
 
 
 class ImageSelectorGUI:
-    def __init__(self, root):
+    TILE_SIZE = 512
+    # Above this many canvases worth of pixels, only the visible tiles are rendered
+    TILED_AREA_RATIO = 2
+    EXPORT_WORKERS = 4
+    # Arrow presses closer together than this are treated as key-repeat
+    BURST_INTERVAL = 0.15
+    BURST_SETTLE_MS = 160
+    SESSION_POLL_MS = 3000
+    # The open folder, frame and zoom are saved at most this often
+    SESSION_SAVE_MS = 1000
+    # Lines kept in the on-screen log; the rotating file has everything
+    LOG_LINES = 2000
+
+    def __init__(self, root, labeler=None, resume=True, base_dir=None, output_dir=None):
         self.root = root
+        self.logger, self.log_listener = setup_logging()
         self.root.title("Deep Terrain AI PS-Tool")
 
         self.root.tk.call('tk', 'scaling', 1.5)
@@ -98,6 +3978,9 @@ class ImageSelectorGUI:
 
         self.zoom_level = 1.0
         self.original_image = None
+        self.pyramid = None
+        self.image_item = None
+        self.tile_items = {}
         self.image_offset = (0, 0)
         self.pan_start = None
 
@@ -105,13 +3988,66 @@ class ImageSelectorGUI:
         self.input_dir = ""
         self.output_dir = ""
         self.csv_file = ""
+        self.base_csv_file = ""
         self.image_paths = []
         self.current_index = 0
-        self.selected_images = set()
+        self.selected_hashes = set()
+        self.selected_sources = set()
+        self.hash_cache = ContentHashCache()
+        self.perceptual_index = PerceptualIndex()
+        self.hashing = set()  # frames whose select waits on a content hash
+        self.current_phash = None
+        self.near_duplicate_note = ""
+        # First frame of a shift/m range; the range runs to the current frame
+        self.range_anchor = None
+        self.range_anchor_index = 0
+        self.bulk_busy = False
+        self.selection_store = None
+        self.csv_dirty = False
+        self.csv_export_job = None
+        self.stats = StageStats()
+        self.stats_visible = False
+        self.stats_job = None
+        self.export_worker = ExportWorker(workers=self.EXPORT_WORKERS, stats=self.stats)
+        self.export_settings = ExportSettings()
+        # Shared output folder: this labeler's session and everyone else's selections
+        self.labeler = labeler
+        self.session = None
+        self.selection_feed = None
+        self.remote_hashes = set()
+        self.remote_sources = set()
+        self.remote_dst = {}
+        self.remote_phashes = []
+        # Last folder/frame/zoom, restored on the next launch without dialogs
+        self.session_file = session_state_path(labeler)
+        self.session_save_job = None
         self.tk_image = None
         self.current_folder = ""
         self.current_image_path = ""
         self.last_logged_image = ""
+        self.upgrading = set()
+        self.prefetcher = ImagePrefetcher(on_decoded=self.hash_cache.warm, stats=self.stats)
+        self.render_cache = RenderCache()
+        self.tile_cache = RenderCache(max_pixels=48 * 1024 * 1024)
+        self.render_scheduler = RenderScheduler(self.root, self.render)
+        self.last_nav_time = 0.0
+        self.burst_job = None
+        self.burst_preview_busy = False
+        self.scanner = DirectoryScanner(self.root)
+        self.watcher = FolderWatcher(self.root, self.folder_changed)
+        self.thumbnail_store = ThumbnailStore()
+        self.thumbnail_builder = ThumbnailBuilder(self.thumbnail_store)
+        self.filmstrip = None
+        # image_paths is the navigation order; folder_image_paths keeps the listing order
+        self.folder_image_paths = []
+        self.quality_scores = {}
+        self.quality_generation = 0
+        self.quality_scorer = QualityScorer(QualityScoreStore())
+        # Cross-folder review queue; the progress store opens with the first queue
+        self.review_queue = None
+        self.review_progress = None
+        self.review_root = ""
+        self.review_job = None
 
         self.folder_visible = True
         self.log_visible = True
@@ -120,15 +4056,96 @@ class ImageSelectorGUI:
         # UI Setup
         self.setup_ui()
 
-        # Ask for folder to begin
-        start_dir = filedialog.askdirectory(title="📂 Choose base folder to explore")
+        state = load_session_state(self.session_file) if resume and not base_dir else None
+        if state is not None:
+            self.restore_session(state)
+            return
+
+        # Ask for folder to begin (local folders and s3:// prefixes can also come from the command line)
+        if output_dir:
+            self.output_dir = output_dir
+        start_dir = base_dir or filedialog.askdirectory(title="📂 Choose base folder to explore")
         if start_dir:
+            self.open_manifest(start_dir)
+            self.sidebar.set_base_path(start_dir)
             self.sidebar.load(start_dir)
             self.current_folder = start_dir
         else:
             messagebox.showinfo("No Folder", "No base folder selected. Exiting.")
             self.root.destroy()
 
+    def open_manifest(self, base_dir):
+        manifest_path = os.path.join(base_dir, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return
+        try:
+            self.scanner.manifest = Manifest(manifest_path, readonly=True)
+            self.log_info(f"🗃️ Using manifest: {manifest_path}")
+        except Exception as e:
+            self.log_error(f"Could not open manifest {manifest_path}: {e}")
+
+    def restore_session(self, state):
+        # Back on the last folder and frame; the selection index loads once it is on screen
+        base_dir, folder = state["base_dir"], state["current_folder"]
+        self.output_dir = state["output_dir"]
+        self.csv_file = self.base_csv_file = state["csv_file"]
+        if self.labeler and not self.join_session():
+            self.output_dir = self.csv_file = self.base_csv_file = ""
+        self.quality_order.set(state.get("order") if state.get("order") in QUALITY_ORDERS else "name")
+        self.skip_poor.set(bool(state.get("skip_poor", False)))
+
+        self.open_manifest(base_dir)
+        self.sidebar.set_base_path(base_dir)
+        self.sidebar.load(folder)
+        self.current_folder = folder
+        self.log_info(f"🔁 Resuming session in {folder}")
+
+        def ready():
+            image_path = state.get("image_path")
+            if image_path in self.image_paths:
+                self.current_index = self.image_paths.index(image_path)
+            elif self.image_paths:
+                self.current_index = min(int(state.get("current_index", 0)), len(self.image_paths) - 1)
+            self.zoom_level = float(state.get("zoom_level", 1.0))
+            self.image_offset = tuple(state.get("image_offset", (0, 0)))
+            self.on_images_loaded(folder)
+            if state.get("review_order") in REVIEW_ORDERS[1:] and state.get("review_root"):
+                self.review_order.set(state["review_order"])
+                self.start_review_queue(state["review_root"])
+
+        self.load_images(on_ready=ready)
+
+    def schedule_session_save(self):
+        if self.session_save_job is None:
+            self.session_save_job = self.root.after(self.SESSION_SAVE_MS, self.save_session)
+
+    def save_session(self):
+        self.session_save_job = None
+        self.record_review_progress()
+        if not self.sidebar.base_path or not self.output_dir or not self.base_csv_file:
+            return
+        image_path = ""
+        if self.current_index < len(self.image_paths):
+            image_path = self.image_paths[self.current_index]
+        state = {
+            "base_dir": self.sidebar.base_path,
+            "current_folder": self.current_folder,
+            "current_index": self.current_index,
+            "image_path": image_path,
+            "output_dir": self.output_dir,
+            "csv_file": self.base_csv_file,
+            "zoom_level": self.zoom_level,
+            "image_offset": list(self.image_offset),
+            "order": self.quality_order.get(),
+            "skip_poor": self.skip_poor.get(),
+            "review_order": self.review_order.get(),
+            "review_root": self.review_root,
+        }
+        try:
+            save_session_state(self.session_file, state)
+        except OSError as e:
+            self.log_error(f"Could not save session: {e}")
+
     def bind_mousewheel_scroll(self, widget, canvas):
         def _on_mousewheel(event):
             canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
@@ -143,20 +4160,20 @@ class ImageSelectorGUI:
 
     def zoom_image(self, factor):
         self.zoom_level *= factor
-        self.show_image()
+        self.render_scheduler.request(interactive=True)
 
     def zoom_in(self):
         self.zoom_level *= 1.1
-        self.show_image()
+        self.render_scheduler.request(interactive=True)
 
     def zoom_out(self):
         self.zoom_level /= 1.1
-        self.show_image()
+        self.render_scheduler.request(interactive=True)
 
     def reset_zoom(self):
         self.zoom_level = 1.0
         self.image_offset = (0, 0)
-        self.show_image()
+        self.render_scheduler.request()
 
     def handle_mouse_zoom(self, event):
         if event.delta > 0:
@@ -173,7 +4190,14 @@ class ImageSelectorGUI:
             dy = event.y - self.pan_start[1]
             self.image_offset = (self.image_offset[0] + dx, self.image_offset[1] + dy)
             self.pan_start = (event.x, event.y)
-            self.show_image()
+            # Panning only moves the already rendered bitmap
+            if self.image_item is not None:
+                self.canvas.move(self.image_item, dx, dy)
+            elif self.tile_items:
+                self.canvas.move("tile", dx, dy)
+                self.render_scheduler.request(full=False, interactive=True)
+            else:
+                self.render_scheduler.request(interactive=True)
 
     def end_pan(self, event):
         self.pan_start = None
@@ -190,7 +4214,8 @@ class ImageSelectorGUI:
         Button(popup, text="OK", command=popup.destroy, width=10).pack(pady=10)
 
     def setup_file_paths(self):
-        self.output_dir = filedialog.askdirectory(title="📤 Choose Output Folder")
+        if not self.output_dir:
+            self.output_dir = filedialog.askdirectory(title="📤 Choose Output Folder")
         if not self.output_dir:
             self.show_error_popup("No output folder selected.")
             return False
@@ -203,16 +4228,130 @@ class ImageSelectorGUI:
         if not self.csv_file:
             self.show_error_popup("No CSV file selected.")
             return False
+        self.base_csv_file = self.csv_file
+
+        if self.labeler and self.session is None and not self.join_session():
+            return False
 
-        if os.path.exists(self.csv_file):
-            with open(self.csv_file, 'r') as f:
-                reader = csv.reader(f)
-                next(reader, None)
-                for row in reader:
-                    self.selected_images.add(row[0])
+        try:
+            self.open_selection_store()
+        except Exception as e:
+            self.show_error_popup(f"Could not open selection database: {e}")
+            return False
 
+        self.schedule_session_save()
+        return True
+
+    def join_session(self):
+        if is_remote(self.output_dir):
+            self.show_error_popup("Shared labeling needs a shared folder; it cannot run on an s3:// output prefix.")
+            return False
+        try:
+            self.session = LabelerSession(self.output_dir, self.labeler)
+        except (OSError, RuntimeError) as e:
+            self.show_error_popup(f"Could not join shared session: {e}")
+            return False
+        self.csv_file = self.session.csv_for(self.base_csv_file)
+        self.selection_feed = SelectionFeed(self.session.dir, exclude=self.session.labeler)
+        self.log_info(f"👥 Labeling as {self.session.labeler}; writing {self.csv_file}")
+        self.root.after(0, self.poll_sessions)
         return True
 
+    def ensure_selection_store(self):
+        # A resumed launch opens the store after the first frame is painted;
+        # anything that needs it sooner opens it on the spot
+        if self.selection_store is None and self.csv_file:
+            try:
+                with self.stats.stage("startup.selection"):
+                    self.open_selection_store()
+            except Exception as e:
+                self.show_error_popup(f"Could not open selection database: {e}")
+        return self.selection_store is not None
+
+    def load_selection_index(self):
+        if not self.ensure_selection_store():
+            return
+        if self.pyramid is not None and self.current_image_path:
+            self.check_near_duplicate(self.current_image_path)
+            if self.near_duplicate_note:
+                self.canvas.delete("overlay")
+                self.draw_overlays()
+
+    def open_selection_store(self):
+        if self.selection_store is not None:
+            self.selection_store.close()
+        self.selection_store = SelectionStore(SelectionStore.path_for_csv(self.csv_file))
+        if self.selection_store.is_empty() and os.path.exists(self.csv_file):
+            imported = self.selection_store.import_csv(self.csv_file)
+            self.log_info(f"📥 Imported {imported} selections from {self.csv_file}")
+        if self.session is not None:
+            if self.session.is_empty():
+                self.session.snapshot(self.selection_store)
+            self.selection_store.on_journal = self.session.record
+        self.load_selection_keys()
+
+        # Rows imported from a CSV have no hashes yet; fill them in off the Tk thread
+        if self.selection_store.rows_missing_hashes(limit=1):
+            db_path = self.selection_store.db_path
+
+            def backfilled(filled, error):
+                if error is not None:
+                    self.log_error(f"Error hashing existing selections: {error}")
+                elif filled:
+                    self.log_info(f"🔑 Hashed {filled} existing selections")
+                    self.load_selection_keys()
+
+            run_in_background(self.root, lambda: backfill_selection_hashes(db_path), backfilled, poll_ms=500)
+
+    def load_selection_keys(self):
+        self.selected_hashes, self.selected_sources = self.selection_store.selected_keys()
+        self.perceptual_index = PerceptualIndex()
+        for source_path, filename, phash in self.selection_store.perceptual_hashes():
+            self.perceptual_index.add(source_path, phash, filename)
+        for source_path, name, phash in self.remote_phashes:
+            self.perceptual_index.add(source_path, phash, name)
+
+    def poll_sessions(self):
+        # Heartbeat and pick up other labelers' selections; shard reads can be
+        # slow on NFS, so they happen off the Tk thread
+        session, feed = self.session, self.selection_feed
+        if session is None:
+            return
+
+        def work():
+            session.heartbeat()
+            return feed.active_rows() if feed.refresh() else None
+
+        def done(rows, error):
+            if self.session is not session:
+                return
+            if error is not None:
+                self.log_error(f"Error reading shared session: {error}")
+            elif rows is not None:
+                self.apply_remote_rows(rows)
+            self.root.after(self.SESSION_POLL_MS, self.poll_sessions)
+
+        run_in_background(self.root, work, done, poll_ms=200)
+
+    def apply_remote_rows(self, rows):
+        self.remote_hashes = {row[4] for _, row in rows if row[4]}
+        self.remote_sources = {row[2] for _, row in rows if row[2]}
+        self.remote_dst = {row[3]: row[4] or "" for _, row in rows if row[3]}
+        self.remote_phashes = [(row[2], f"{labeler}/{row[0]}", row[5]) for labeler, row in rows if row[5] is not None]
+        if self.selection_store is not None:
+            self.load_selection_keys()
+        self.log_info(f"👥 {len(rows)} selections from other labelers")
+
+    def is_already_selected(self, img_path):
+        # Same file, or identical bytes under another name/folder
+        if img_path in self.selected_sources or img_path in self.remote_sources:
+            return True
+        try:
+            digest = self.hash_cache.get(img_path)
+            return digest in self.selected_hashes or digest in self.remote_hashes
+        except OSError:
+            return False
+
     
 
     def setup_ui(self):
@@ -232,8 +4371,47 @@ class ImageSelectorGUI:
         self.theme_toggle_btn = tk.Button(toggle_frame, text="🌙 Dark Mode", command=self.toggle_theme)
         self.theme_toggle_btn.pack(side=tk.RIGHT, padx=5)
 
+        self.filmstrip_btn = tk.Button(toggle_frame, text="🎞️ Filmstrip", command=self.open_filmstrip)
+        self.filmstrip_btn.pack(side=tk.RIGHT, padx=5)
+
+        self.export_mode = tk.StringVar(value=self.export_worker.mode)
+        tk.Label(toggle_frame, text="📤 Export:").pack(side=tk.LEFT, padx=(10, 2))
+        self.export_mode_menu = tk.OptionMenu(
+            toggle_frame, self.export_mode, *ExportWorker.MODES, command=self.set_export_mode
+        )
+        self.export_mode_menu.pack(side=tk.LEFT)
+        self.export_settings_btn = tk.Button(toggle_frame, text="⚙️ Output", command=self.open_export_settings)
+        self.export_settings_btn.pack(side=tk.LEFT, padx=5)
+        self.export_status = tk.Label(toggle_frame, text="")
+        self.export_status.pack(side=tk.LEFT, padx=10)
+
+        self.quality_order = tk.StringVar(value="name")
+        tk.Label(toggle_frame, text="📊 Order:").pack(side=tk.LEFT, padx=(10, 2))
+        self.quality_order_menu = tk.OptionMenu(
+            toggle_frame, self.quality_order, *QUALITY_ORDERS,
+            command=lambda _: self.apply_navigation_order()
+        )
+        self.quality_order_menu.pack(side=tk.LEFT)
+        self.skip_poor = tk.BooleanVar(value=False)
+        self.skip_poor_check = tk.Checkbutton(
+            toggle_frame, text="Skip poor frames", variable=self.skip_poor,
+            command=self.apply_navigation_order
+        )
+        self.skip_poor_check.pack(side=tk.LEFT, padx=5)
+        self.quality_status = tk.Label(toggle_frame, text="")
+        self.quality_status.pack(side=tk.LEFT, padx=10)
+
+        self.review_order = tk.StringVar(value="off")
+        tk.Label(toggle_frame, text="🔁 Queue:").pack(side=tk.LEFT, padx=(10, 2))
+        self.review_order_menu = tk.OptionMenu(
+            toggle_frame, self.review_order, *REVIEW_ORDERS, command=lambda _: self.start_review_queue()
+        )
+        self.review_order_menu.pack(side=tk.LEFT)
+
         # --- Folder Panel ---
-        self.sidebar = FolderNavigator(self.root, self.on_folder_selected)
+        self.sidebar = FolderNavigator(
+            self.root, self.on_folder_selected, self.scanner, self.log_error, stats=self.stats
+        )
         self.sidebar_frame = self.sidebar.frame
         self.sidebar_frame.grid(row=1, column=0, rowspan=3, sticky="nsew")
         self.sidebar_frame.grid_propagate(False)
@@ -282,6 +4460,15 @@ class ImageSelectorGUI:
         self.undo_btn = tk.Button(btn_frame, text="⏪ Undo", command=self.undo_last_selection)
         self.undo_btn.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
 
+        self.redo_btn = tk.Button(btn_frame, text="⏩ Redo", command=self.redo_last_selection)
+        self.redo_btn.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
+
+        self.candidate_btn = tk.Button(btn_frame, text="⏭️ Next Good", command=self.next_candidate)
+        self.candidate_btn.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
+
+        self.scene_btn = tk.Button(btn_frame, text="🏷️ Apply Scene ID", command=self.apply_scene_to_range)
+        self.scene_btn.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
+
         # --- Terminal / Log (Below Image Viewer only) ---
         self.log_frame = tk.Frame(self.root)
         self.log_frame.grid(row=3, column=1, sticky="nsew")
@@ -292,13 +4479,25 @@ class ImageSelectorGUI:
         scrollbar = tk.Scrollbar(self.log_frame, command=self.log_output.yview)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=(5, 10))
         self.log_output['yscrollcommand'] = scrollbar.set
-        self.root.bind("<Left>", lambda e: self.previous_image())
-        self.root.bind("<Right>", lambda e: self.next_image())
+        self.log_panel = LogPanel(self.log_output, max_lines=self.LOG_LINES)
+        self.logger.addHandler(self.log_panel)
+        self.root.bind("<Left>", lambda e: self.on_arrow_key(-1))
+        self.root.bind("<Right>", lambda e: self.on_arrow_key(1))
         self.root.bind("<s>", lambda e: self.select_image())
         self.root.bind("<S>", lambda e: self.select_image())  # capital S
         self.root.bind("<u>", lambda e: self.undo_last_selection())
+        self.root.bind("<r>", lambda e: self.redo_last_selection())
+        self.root.bind("<n>", lambda e: self.next_candidate())
+        self.root.bind("<m>", lambda e: self.mark_range_start())
+        self.root.bind("<Shift-Left>", lambda e: self.extend_range(-1))
+        self.root.bind("<Shift-Right>", lambda e: self.extend_range(1))
+        self.root.bind("<Escape>", lambda e: self.clear_range())
+        self.root.bind("<F2>", lambda e: self.toggle_stats())
+        self.root.bind("<F3>", lambda e: self.export_trace())
 
         self.apply_theme()
+        self.root.after(250, self.poll_exports)
+        self.root.after(300, self.poll_quality)
         print("✅ setup_ui completed!")
 
 
@@ -317,44 +4516,108 @@ class ImageSelectorGUI:
 
 
     def on_canvas_resize(self, event):
-        self.show_image()
-
+        # Decodes from here on only need to cover the canvas
+        if event.width > 1 and event.height > 1:
+            self.prefetcher.fit_size = (event.width, event.height)
+        self.render_scheduler.request(interactive=True)
+
+    def render(self, full=True, preview=False):
+        if full:
+            self.show_image(preview=preview)
+        elif self.tile_items:
+            self.update_tiles(preview=preview)
+
+    # Both are safe to call from worker threads; see LogPanel
     def log_error(self, message):
-        print(message)
-        self.log_output.configure(state='normal')
-        self.log_output.insert(tk.END, message + '\n')
-        self.log_output.configure(state='disabled')
-        self.log_output.yview(tk.END)
+        self.logger.error(message)
 
     def log_info(self, message):
-        print(message)
-        self.log_output.configure(state='normal')
-        self.log_output.insert(tk.END, message + '\n')
-        self.log_output.configure(state='disabled')
-        self.log_output.yview(tk.END)
+        self.logger.info(message)
 
     def on_folder_selected(self, folder_path):
+        self.prefetcher.cancel()
+        if self.burst_job is not None:
+            self.root.after_cancel(self.burst_job)
+            self.burst_job = None
+        # Clicking the open folder again keeps the current frame
+        keep = self.current_image_path if folder_path == self.current_folder else None
+        if keep is None:
+            self.range_anchor = None
+            self.release_folder()
         self.current_folder = folder_path
         self.current_index = 0
         self.sidebar.load(folder_path)
-        self.load_images()
 
+        def ready():
+            if keep in self.image_paths:
+                self.current_index = self.image_paths.index(keep)
+            self.on_images_loaded(folder_path)
+
+        self.load_images(on_ready=ready)
+
+    def release_folder(self):
+        # Leaving the open folder frees it for the other labelers
+        if self.session is not None and self.current_folder:
+            self.session.release(self.current_folder)
+
+    def on_images_loaded(self, folder_path):
         if not self.output_dir or not self.csv_file:
             if not self.setup_file_paths():
                 return
 
+        if self.session is not None:
+            owner = self.session.claim(folder_path)
+            if owner is not None and not messagebox.askyesno(
+                "Folder Claimed", f"'{folder_name(folder_path)}' is being reviewed by {owner}.\nOpen it anyway?"
+            ):
+                self.log_info(f"👥 Skipped folder claimed by {owner}: {folder_path}")
+                self.image_paths = []
+                self.images_listed()
+                if self.review_queue is not None:
+                    self.advance_folder()
+                return
+
         self.show_image()
         self.log_info(f"📂 Opened folder: {folder_path}")
+        if self.selection_store is None:
+            self.root.after_idle(self.load_selection_index)
 
-    def load_images(self):
-        supported = ['.jpg', '.jpeg', '.png', '.bmp']
-        self.image_paths = [
-            os.path.join(self.current_folder, f)
-            for f in sorted(os.listdir(self.current_folder))
-            if any(f.lower().endswith(ext) for ext in supported)
-        ]
+    def load_images(self, on_ready=None):
+        started = time.perf_counter()
+        folder = self.current_folder
+        self.image_paths = []
+        self.canvas.delete("all")
+        self.image_item = None
+        self.tile_items = {}
+        self.canvas.create_text(
+            self.canvas.winfo_width() // 2,
+            self.canvas.winfo_height() // 2,
+            text="⏳ Scanning folder...",
+            fill="white",
+            font=("Arial", 16)
+        )
+
+        def on_done(listing, error):
+            if folder != self.current_folder:
+                return  # user already moved on
+            if error is not None:
+                self.log_error(f"Error scanning folder: {folder} - {error}")
+            names = listing.images if listing is not None else []
+            self.image_paths = [join_path(folder, f) for f in names]
+            self.stats.record("folder.images", started)
+            if listing is not None:
+                self.watcher.watch(folder, listing)
+            self.images_listed()
+            if on_ready is not None:
+                on_ready()
+
+        self.scanner.listdir(folder, on_done)
+
+    def images_listed(self):
         if not self.image_paths:
             self.canvas.delete("all")
+            self.image_item = None
+            self.tile_items = {}
             self.canvas.create_text(
                 self.canvas.winfo_width() // 2,
                 self.canvas.winfo_height() // 2,
@@ -364,6 +4627,256 @@ class ImageSelectorGUI:
             )
             self.log_info("No images found in this folder.")
 
+        self.thumbnail_builder.build(self.image_paths)
+        if self.filmstrip is not None:
+            self.filmstrip.set_paths(self.image_paths)
+
+        self.folder_image_paths = list(self.image_paths)
+        self.quality_scores = {}
+        self.quality_generation = self.quality_scorer.score(self.image_paths)
+        self.quality_status.config(text="scoring..." if self.image_paths else "")
+
+    def poll_quality(self):
+        finished = False
+        current_scored = False
+        try:
+            while True:
+                generation, scores = self.quality_scorer.scored.get_nowait()
+                if generation != self.quality_generation:
+                    continue
+                if scores is None:
+                    finished = True
+                    continue
+                self.quality_scores.update(scores)
+                current_scored = current_scored or self.current_image_path in scores
+        except queue.Empty:
+            pass
+
+        if current_scored and (self.image_item is not None or self.tile_items):
+            self.canvas.delete("overlay")
+            self.draw_overlays()
+        if finished:
+            flagged = sum(1 for score in self.quality_scores.values() if quality_problem(score))
+            self.quality_status.config(text=f"{len(self.quality_scores)} scored · {flagged} flagged")
+            self.log_info(f"📊 Scored {len(self.quality_scores)} frames, {flagged} flagged as poor")
+            if self.quality_order.get() != "name" or self.skip_poor.get():
+                self.apply_navigation_order()
+        self.root.after(300, self.poll_quality)
+
+    def navigation_paths(self):
+        paths = quality_order(self.folder_image_paths, self.quality_scores, self.quality_order.get())
+        if self.skip_poor.get():
+            paths = [p for p in paths if not quality_problem(self.quality_scores.get(p))]
+        return paths
+
+    def folder_changed(self, folder, added, removed, changed, dirs_added, dirs_removed):
+        # FolderWatcher: frames copied in (or replaced/removed) while the folder is open
+        if folder != self.current_folder:
+            return
+        self.sidebar.refresh_dirs(folder, dirs_added, dirs_removed)
+        if not (added or removed or changed):
+            return
+        self.scanner.invalidate(folder)
+        added = [join_path(folder, name) for name in added]
+        removed = {join_path(folder, name) for name in removed}
+        changed = [join_path(folder, name) for name in changed]
+        for path in changed + list(removed):
+            self.prefetcher.discard(path)
+            self.render_cache.discard(path)
+            self.tile_cache.discard(path)
+            self.quality_scores.pop(path, None)
+
+        current = None
+        if self.current_index < len(self.image_paths):
+            current = self.image_paths[self.current_index]
+        # Both lists are already sorted, which makes this a linear merge
+        self.folder_image_paths = sorted([p for p in self.folder_image_paths if p not in removed] + added)
+        self.image_paths = self.navigation_paths()
+        if current in self.image_paths:
+            self.current_index = self.image_paths.index(current)
+        else:
+            self.current_index = min(self.current_index, max(len(self.image_paths) - 1, 0))
+        if self.filmstrip is not None:
+            self.filmstrip.update_paths(self.image_paths)
+
+        if added or changed:
+            self.thumbnail_builder.prioritize(added + changed)
+            self.quality_scorer.add(added + changed)
+            self.quality_status.config(text="scoring...")
+        self.log_info(f"🛰️ {folder_name(folder)}: {len(added)} new, {len(changed)} changed, {len(removed)} removed")
+
+        # Redraw only if the frame on screen went away or its file changed
+        if current != self.current_image_path or current in changed or current in removed:
+            if current in removed:
+                self.zoom_level = 1.0
+                self.image_offset = (0, 0)
+            self.current_image_path = ""
+            self.show_image()
+        else:
+            self.prefetcher.schedule(self.prefetch_paths(), self.current_index)
+
+    def apply_navigation_order(self):
+        # Re-sorts/filters the folder while keeping the current frame in view
+        current = None
+        if self.current_index < len(self.image_paths):
+            current = self.image_paths[self.current_index]
+        paths = self.navigation_paths()
+        self.image_paths = paths
+
+        if current in paths:
+            self.current_index = paths.index(current)
+        else:
+            self.current_index = min(self.current_index, max(len(paths) - 1, 0))
+            self.zoom_level = 1.0
+            self.image_offset = (0, 0)
+        if self.filmstrip is not None:
+            self.filmstrip.update_paths(self.image_paths)
+
+        hidden = len(self.folder_image_paths) - len(paths)
+        self.log_info(f"📊 Order: {self.quality_order.get()}" + (f", {hidden} poor frames hidden" if hidden else ""))
+        if paths:
+            self.prefetcher.cancel()
+            self.show_image()
+        elif self.folder_image_paths:
+            self.canvas.delete("all")
+            self.image_item = None
+            self.tile_items = {}
+            self.canvas.create_text(
+                self.canvas.winfo_width() // 2,
+                self.canvas.winfo_height() // 2,
+                text="Every frame in this folder was flagged as poor",
+                fill="white", font=("Arial", 16)
+            )
+
+    def next_candidate(self):
+        # Next frame in navigation order that is unscored or passed every check
+        for index in range(self.current_index + 1, len(self.image_paths)):
+            if not quality_problem(self.quality_scores.get(self.image_paths[index])):
+                self.jump_to(index)
+                return
+        self.log_info("🔹 No more good candidates in this folder.")
+
+    def open_filmstrip(self):
+        if self.filmstrip is not None:
+            self.filmstrip.window.lift()
+            return
+        self.filmstrip = FilmstripView(self)
+
+    def jump_to(self, index):
+        if not 0 <= index < len(self.image_paths):
+            return
+        self.zoom_level = 1.0
+        self.image_offset = (0, 0)
+        self.current_index = index
+        self.show_image()
+        self.log_info(f"🎯 Jumped to image: {os.path.basename(self.image_paths[index])}")
+
+    def start_review_queue(self, root=None):
+        # Walks the open folder's subtree (or a resumed root) as one stream of frames
+        if self.review_queue is not None:
+            self.review_queue.stop()
+            self.review_queue = None
+        if self.review_job is not None:
+            self.root.after_cancel(self.review_job)
+            self.review_job = None
+        order = self.review_order.get()
+        if order == "off":
+            self.review_root = ""
+            self.log_info("🔁 Review queue off")
+            self.schedule_session_save()
+            return
+        self.review_root = root or self.current_folder
+        if not self.review_root:
+            return
+        if self.review_progress is None:
+            try:
+                self.review_progress = ReviewProgress()
+            except sqlite3.Error as e:
+                self.log_error(f"Could not open review progress: {e}")
+                return
+        manifest = self.scanner.manifest
+        self.review_queue = ReviewQueue(
+            self.review_root, order, self.review_progress,
+            manifest_path=manifest.db_path if manifest is not None else None,
+            skip=self.current_folder if self.folder_image_paths else None
+        )
+        self.log_info(f"🔁 Review queue ({order}) over {self.review_root}")
+        self.schedule_session_save()
+        if not self.image_paths:
+            self.advance_folder()
+
+    def prefetch_paths(self):
+        # Near the end of a folder the queue's next folder continues the prefetch
+        if self.review_queue is not None and len(self.image_paths) - self.current_index <= self.prefetcher.ahead:
+            upcoming = self.review_queue.peek()
+            if upcoming is not None:
+                return self.image_paths + upcoming[2][:self.prefetcher.ahead]
+        return self.image_paths
+
+    def record_review_progress(self, done=False):
+        if self.review_progress is None or not self.current_folder or not self.image_paths:
+            return
+        position = min(self.current_index + 1, len(self.image_paths))
+        try:
+            self.review_progress.update(
+                self.current_folder, self.image_paths[position - 1], position, len(self.image_paths), done
+            )
+        except sqlite3.Error as e:
+            self.log_error(f"Could not save review progress: {e}")
+
+    def advance_folder(self):
+        # End of a folder in queue mode: open the next one in place, without dialogs
+        if self.review_job is not None:
+            self.root.after_cancel(self.review_job)
+            self.review_job = None
+        if self.review_queue is None:
+            return
+        item = self.review_queue.take()
+        if item is None:
+            text = "⏳ Finding the next folder..."
+            if self.review_queue.finished:
+                text = "🏁 Review queue finished"
+                self.log_info(f"🏁 Every folder below {self.review_root} has been reviewed")
+                self.record_review_progress(done=True)
+                self.review_queue = None
+                self.review_order.set("off")
+                self.review_root = ""
+            else:
+                self.review_job = self.root.after(200, self.advance_folder)
+            self.canvas.delete("all")
+            self.image_item = None
+            self.tile_items = {}
+            self.canvas.create_text(
+                self.canvas.winfo_width() // 2, self.canvas.winfo_height() // 2,
+                text=text, fill="white", font=("Arial", 16)
+            )
+            return
+
+        self.record_review_progress(done=True)
+        folder, listing, paths = item
+        if self.burst_job is not None:
+            self.root.after_cancel(self.burst_job)
+            self.burst_job = None
+        self.range_anchor = None
+        self.release_folder()
+        self.current_folder = folder
+        self.scanner.prime(folder, listing)
+        self.sidebar.load(folder)
+        self.image_paths = paths
+        self.current_index = 0
+        self.zoom_level = 1.0
+        self.image_offset = (0, 0)
+        progress = self.review_progress.get(folder)
+        if progress is not None and not progress[3] and progress[0] in paths:
+            self.current_index = paths.index(progress[0])
+        self.watcher.watch(folder, listing)
+        self.images_listed()
+        self.log_info(
+            f"🔁 Next folder: {folder_name(folder)} ({len(paths)} frames"
+            + (f", resuming at {self.current_index + 1})" if self.current_index else ")")
+        )
+        self.on_images_loaded(folder)
+
     def reset_attribute_fields(self):
         # try:
         #     if self.scene_entry and self.scene_entry.winfo_exists():
@@ -373,7 +4886,12 @@ class ImageSelectorGUI:
         #     self.log_error(f"⚠️ Could not reset scene entry: {e}")
         pass
 
-    def show_image(self):
+    def show_image(self, preview=False):
+        with self.stats.stage("show.preview" if preview else "show.total"):
+            self._show_image(preview)
+        self.schedule_session_save()
+
+    def _show_image(self, preview=False):
         if self.current_index >= len(self.image_paths):
             return
 
@@ -381,44 +4899,248 @@ class ImageSelectorGUI:
 
         if img_path != self.current_image_path:
             try:
-                self.original_image = Image.open(img_path).convert("RGB")
+                with self.stats.stage("show.fetch"):
+                    self.pyramid = self.prefetcher.get(img_path)
+                self.original_image = self.pyramid.base
                 self.current_image_path = img_path
             except Exception as e:
                 self.log_error(f"❌ Failed to open image: {img_path} - {e}")
                 self.next_image()
                 return
+            self.prefetcher.schedule(self.prefetch_paths(), self.current_index)
+            self.check_near_duplicate(img_path)
 
         if self.original_image is None:
             return
 
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
+        canvas_width, canvas_height, final_scale, new_width, new_height, _, _ = self.display_geometry()
+        if self.pyramid.base_scale < 1.0 and final_scale > self.pyramid.base_scale:
+            self.request_full_resolution()
+
+        self.canvas.delete("all")
+        self.image_item = None
+        self.tile_items = {}
 
-        img = self.original_image
+        if new_width * new_height > self.TILED_AREA_RATIO * canvas_width * canvas_height:
+            try:
+                with self.stats.stage("show.tiles"):
+                    self.update_tiles(preview=preview)
+            except Exception as e:
+                self.log_error(f"🔥 Error rendering tiles: {e}\n{traceback.format_exc()}")
+            self.draw_overlays()
+            return
 
-        scale_w = canvas_width / img.width
-        scale_h = canvas_height / img.height
-        base_scale = min(scale_w, scale_h)
+        render_key = (img_path, canvas_width, canvas_height, round(self.zoom_level, 6))
+        tk_image = self.render_cache.get(render_key)
 
-        final_scale = base_scale * self.zoom_level
-        new_width = int(img.width * final_scale)
-        new_height = int(img.height * final_scale)
+        if tk_image is None:
+            # Previews use a cheap filter and are not cached; the settle pass replaces them
+            try:
+                with self.stats.stage("show.resize"):
+                    resized_img = render_region(
+                        self.pyramid, final_scale, (new_width, new_height), (0, 0, new_width, new_height), preview
+                    )
+                with self.stats.stage("show.photo"):
+                    tk_image = ImageTk.PhotoImage(resized_img)
+            except Exception as e:
+                self.log_error(f"🔥 Error resizing image: {e}\n{traceback.format_exc()}")
+                self.next_image()
+                return
+            if not preview:
+                self.render_cache.put(render_key, tk_image)
 
-        try:
-            resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            self.tk_image = ImageTk.PhotoImage(resized_img)
-        except Exception as e:
-            self.log_error(f"🔥 Error resizing image: {e}\n{traceback.format_exc()}")
-            self.next_image()
+        self.tk_image = tk_image
+        x_offset, y_offset = self.image_offset
+        with self.stats.stage("show.draw"):
+            self.image_item = self.canvas.create_image(
+                canvas_width // 2 + x_offset,
+                canvas_height // 2 + y_offset,
+                image=self.tk_image
+            )
+        self.draw_overlays()
+
+    def request_full_resolution(self):
+        # Zoomed past what the reduced decode holds: decode the full image off
+        # the Tk thread; until it lands the reduced one is upscaled
+        path = self.current_image_path
+        if path in self.upgrading:
             return
+        self.upgrading.add(path)
+        started = time.perf_counter()
 
-        self.canvas.delete("all")
-        x_offset, y_offset = self.image_offset
-        self.canvas.create_image(
-            canvas_width // 2 + x_offset,
-            canvas_height // 2 + y_offset,
-            image=self.tk_image
+        def done(pyramid, error):
+            self.upgrading.discard(path)
+            if error is not None:
+                self.log_error(f"❌ Failed to load full resolution: {path} - {error}")
+                return
+            self.stats.record("show.upgrade", started)
+            self.render_cache.discard(path)
+            self.tile_cache.discard(path)
+            if path == self.current_image_path:
+                self.pyramid = pyramid
+                self.original_image = pyramid.base
+                self.render_scheduler.request()
+
+        run_in_background(self.root, lambda: self.prefetcher.get_full(path), done)
+
+    def check_near_duplicate(self, img_path):
+        # dHash from the smallest pyramid level is essentially free at this point
+        self.current_phash = None
+        self.near_duplicate_note = ""
+        if self.selection_store is None:
+            return  # redone by load_selection_index
+        self.current_phash = int(dhash_array([self.pyramid.levels[-1][1]])[0])
+        if img_path in self.selected_sources:
+            return
+        matches = self.perceptual_index.search(self.current_phash)
+        if matches:
+            distance, name = matches[0]
+            self.near_duplicate_note = f"⚠️ Near-duplicate of selected {name} (distance {distance})"
+            self.log_info(f"{self.near_duplicate_note}: {os.path.basename(img_path)}")
+
+    def draw_overlays(self):
+        score = self.quality_scores.get(self.current_image_path)
+        if score is not None:
+            problem = quality_problem(score)
+            note = f"sharpness {score.sharpness:.0f} · brightness {score.brightness:.2f} · entropy {score.entropy:.1f}"
+            self.canvas.create_text(
+                10, self.canvas.winfo_height() - 10, anchor="sw",
+                text=note + (f" · ⚠️ {problem}" if problem else ""),
+                fill="#ffb300" if problem else "white", font=("Arial", 11), tags=("overlay",)
+            )
+        if self.stats_visible:
+            self.draw_stats()
+        if self.near_duplicate_note:
+            self.canvas.create_text(
+                10, 10, anchor="nw", text=self.near_duplicate_note,
+                fill="#ffb300", font=("Arial", 14, "bold"), tags=("overlay",)
+            )
+        paths = self.range_paths()
+        if paths:
+            self.canvas.create_text(
+                self.canvas.winfo_width() - 10, self.canvas.winfo_height() - 10, anchor="se",
+                text=f"📎 Range: {len(paths)} frames · s selects · Esc clears",
+                fill="#4fc3f7", font=("Arial", 12, "bold"), tags=("overlay",)
+            )
+
+    def toggle_stats(self):
+        self.stats_visible = not self.stats_visible
+        if self.stats_visible:
+            self.refresh_stats()
+        else:
+            if self.stats_job is not None:
+                self.root.after_cancel(self.stats_job)
+                self.stats_job = None
+            self.canvas.delete("stats")
+
+    def refresh_stats(self):
+        self.canvas.delete("stats")
+        self.draw_stats()
+        self.stats_job = self.root.after(1000, self.refresh_stats)
+
+    def draw_stats(self):
+        rows = [f"{'stage':<22}{'n':>5}{'p50':>8}{'p95':>8}{'p99':>8}  ms"]
+        for name, (count, p50, p95, p99) in sorted(self.stats.percentiles().items()):
+            rows.append(f"{name:<22}{count:>5}{p50:>8.1f}{p95:>8.1f}{p99:>8.1f}")
+        text = self.canvas.create_text(
+            self.canvas.winfo_width() - 10, 10, anchor="ne", text="\n".join(rows),
+            fill="#7CFC00", font=("Courier", 10), tags=("stats", "overlay")
+        )
+        x0, y0, x1, y1 = self.canvas.bbox(text)
+        background = self.canvas.create_rectangle(
+            x0 - 6, y0 - 4, x1 + 6, y1 + 4, fill="black", outline="#7CFC00", tags=("stats", "overlay")
+        )
+        self.canvas.tag_lower(background, text)
+
+    def export_trace(self):
+        path = filedialog.asksaveasfilename(
+            title="💾 Save Trace", defaultextension=".json", filetypes=[("Chrome trace", "*.json")]
         )
+        if not path:
+            return
+        try:
+            count = self.stats.export_trace(path)
+            self.log_info(f"📈 Wrote {count} trace events to {path} (open in chrome://tracing or Perfetto)")
+        except OSError as e:
+            self.log_error(f"Could not write trace: {e}")
+
+    def display_geometry(self):
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
+        final_scale, new_width, new_height, left, top = fit_geometry(
+            self.pyramid.size, (canvas_width, canvas_height), self.zoom_level, self.image_offset
+        )
+        return canvas_width, canvas_height, final_scale, new_width, new_height, left, top
+
+    def view_box(self):
+        # Part of the image visible on the canvas, in image pixels
+        if self.original_image is None:
+            return None
+        canvas_width, canvas_height, final_scale, _, _, left, top = self.display_geometry()
+        width, height = self.pyramid.size
+        box = (
+            max(0, int(-left / final_scale)),
+            max(0, int(-top / final_scale)),
+            min(width, int(math.ceil((canvas_width - left) / final_scale))),
+            min(height, int(math.ceil((canvas_height - top) / final_scale))),
+        )
+        if box[2] <= box[0] or box[3] <= box[1]:
+            return None
+        return box
+
+    def update_tiles(self, preview=False):
+        # Render only the tiles that intersect the canvas (plus a margin), reusing cached ones
+        canvas_width, canvas_height, final_scale, new_width, new_height, left, top = self.display_geometry()
+        tile = self.TILE_SIZE
+        margin = tile // 2
+
+        first_x = max(0, (-left - margin) // tile)
+        last_x = min((new_width - 1) // tile, (canvas_width - left + margin) // tile)
+        first_y = max(0, (-top - margin) // tile)
+        last_y = min((new_height - 1) // tile, (canvas_height - top + margin) // tile)
+
+        visible = set()
+        for ty in range(first_y, last_y + 1):
+            for tx in range(first_x, last_x + 1):
+                visible.add((tx, ty))
+                existing = self.tile_items.get((tx, ty))
+                # Keep drawn tiles, except previews once a full-quality pass is requested
+                if existing is not None and (preview or not existing[2]):
+                    continue
+                photo, is_preview = self.render_tile(final_scale, tx, ty, new_width, new_height, preview)
+                item = self.canvas.create_image(
+                    left + tx * tile, top + ty * tile, anchor="nw", image=photo, tags=("tile",)
+                )
+                if existing is not None:
+                    self.canvas.delete(existing[0])
+                self.tile_items[(tx, ty)] = (item, photo, is_preview)
+
+        for key in [k for k in self.tile_items if k not in visible]:
+            item = self.tile_items.pop(key)[0]
+            self.canvas.delete(item)
+
+    def render_tile(self, final_scale, tx, ty, new_width, new_height, preview=False):
+        tile = self.TILE_SIZE
+        key = (self.current_image_path, round(final_scale, 9), tx, ty)
+        photo = self.tile_cache.get(key)
+        if photo is not None:
+            return photo, False
+
+        x0, y0 = tx * tile, ty * tile
+        tile_w = min(tile, new_width - x0)
+        tile_h = min(tile, new_height - y0)
+
+        # Resample just the tile's display rectangle from the chosen pyramid level
+        with self.stats.stage("tile.resize"):
+            region = render_region(
+                self.pyramid, final_scale, (new_width, new_height), (x0, y0, x0 + tile_w, y0 + tile_h), preview
+            )
+
+        with self.stats.stage("tile.photo"):
+            photo = ImageTk.PhotoImage(region)
+        if not preview:
+            self.tile_cache.put(key, photo)
+        return photo, preview
 
 
     def ask_overwrite_popup(self, filename):
@@ -457,53 +5179,272 @@ class ImageSelectorGUI:
 
 
     def select_image(self):
-        if not self.image_paths:
+        if not self.image_paths or not self.ensure_selection_store():
+            return
+        if self.range_paths():
+            if self.select_paths(self.range_paths()):
+                self.clear_range()
             return
 
         img_path = self.image_paths[self.current_index]
+        if img_path in self.hashing:
+            return
+        if img_path in self.selected_sources or img_path in self.remote_sources \
+                or self.hash_cache.peek(img_path) is not None:
+            self.finish_select(img_path)
+            return
+
+        # The prefetcher usually hashes a frame while decoding it; when it has
+        # not got there yet, the file is read off the Tk thread
+        self.hashing.add(img_path)
+        hash_cache = self.hash_cache
+
+        def done(_, error):
+            self.hashing.discard(img_path)
+            if error is not None:
+                self.log_error(f"Error reading image: {os.path.basename(img_path)} - {error}")
+                return
+            self.finish_select(img_path)
+
+        run_in_background(self.root, lambda: hash_cache.get(img_path), done, poll_ms=15)
+
+    def finish_select(self, img_path):
+        # Select img_path once its content hash is cached; moves on only if the
+        # user is still looking at it
         filename = os.path.basename(img_path)
+        advance = self.current_index < len(self.image_paths) and self.image_paths[self.current_index] == img_path
 
-        if filename in self.selected_images:
+        if self.is_already_selected(img_path):
             self.log_info(f"⚠️ Skipped (already selected): {filename}")
             if not self.ask_overwrite_popup(filename):
-                self.next_image()
+                if advance:
+                    self.next_image()
                 return
 
-        scene_id = self.scene_entry.get().strip()
-        if not scene_id or scene_id == "Enter scene ID or leave blank":
-            scene_id = os.path.basename(os.path.dirname(img_path))
+        with self.stats.stage("select.total"):
+            selected = self.select_path(img_path)
+        if selected and advance:
+            self.reset_attribute_fields()
+            self.next_image()
 
-        try:
-            os.makedirs(self.output_dir, exist_ok=True)
-            dst_path = os.path.join(self.output_dir, filename)
+    def range_paths(self):
+        # Frames from the anchor to the current frame, inclusive, in navigation order
+        if self.range_anchor is None or self.current_index >= len(self.image_paths):
+            return []
+        anchor = self.range_anchor_index
+        if not (anchor < len(self.image_paths) and self.image_paths[anchor] == self.range_anchor):
+            # The list was reordered or refreshed since the anchor was set;
+            # find it once and cache the new position
+            if self.range_anchor not in self.image_paths:
+                return []
+            anchor = self.range_anchor_index = self.image_paths.index(self.range_anchor)
+        low, high = sorted((anchor, self.current_index))
+        return self.image_paths[low:high + 1]
+
+    def mark_range_start(self):
+        if self.current_index >= len(self.image_paths):
+            return
+        self.range_anchor = self.image_paths[self.current_index]
+        self.range_anchor_index = self.current_index
+        self.log_info(f"📎 Range starts at {os.path.basename(self.range_anchor)}")
+        self.redraw_overlays()
+
+    def extend_range(self, step):
+        if self.range_anchor is None and self.current_index < len(self.image_paths):
+            self.range_anchor = self.image_paths[self.current_index]
+            self.range_anchor_index = self.current_index
+        if step < 0:
+            self.previous_image()
+        elif self.current_index + 1 < len(self.image_paths):
+            self.next_image()
 
-            if os.path.abspath(img_path) != os.path.abspath(dst_path):
-                shutil.copy2(img_path, dst_path)
-                self.log_info(f"✅ Saved image: {filename} to {dst_path}")
-            else:
-                self.log_info(f"⚠️ Skipped copying (same file): {filename}")
+    def clear_range(self):
+        if self.range_anchor is not None:
+            self.range_anchor = None
+            self.redraw_overlays()
 
-            # === Write to CSV ===
-            with open(self.csv_file, 'a', newline='') as f:
-                writer = csv.writer(f)
-                if os.stat(self.csv_file).st_size == 0:
-                    writer.writerow(['filename', 'scene_id', 'source_path'])
+    def redraw_overlays(self):
+        self.canvas.delete("overlay")
+        self.draw_overlays()
+
+    def select_paths(self, paths):
+        # Bulk selection: hashing runs on a thread pool, then every new frame is
+        # committed as one batch (one SQLite transaction, one CSV append, one undo step).
+        # False if nothing was queued, so callers keep the user's range or marks.
+        if not self.output_dir or not self.csv_file:
+            if not self.setup_file_paths():
+                return False
+        if not self.ensure_selection_store():
+            return False
+        if self.bulk_busy:
+            self.log_info("⏳ Still working on the previous bulk selection")
+            return False
 
-                writer.writerow([filename, scene_id, img_path])
+        total = len(paths)
+        paths = [p for p in paths if p not in self.selected_sources and p not in self.remote_sources]
+        if not paths:
+            self.log_info(f"⚠️ All {total} frames are already selected")
+            return False
+        scenes = {p: self.scene_id_for(p) for p in paths}
+        hash_cache = self.hash_cache
+        started = time.perf_counter()
+        self.bulk_busy = True
+        self.log_info(f"⏳ Hashing {len(paths)} frames for selection...")
+
+        def keys(img_path):
+            try:
+                return img_path, hash_cache.get(img_path), dhash_paths([img_path]).get(img_path)
+            except OSError:
+                return img_path, None, None
+
+        def work():
+            with ThreadPoolExecutor(max_workers=self.EXPORT_WORKERS, thread_name_prefix="bulk-hash") as pool:
+                return list(pool.map(keys, paths))
+
+        def done(result, error):
+            self.bulk_busy = False
+            if error is not None:
+                self.log_error(f"Bulk selection failed: {error}")
+                return
+            try:
+                self.commit_bulk(result, scenes, total, started)
+            except Exception as e:
+                self.log_error(f"Error saving selection: {e}\n{traceback.format_exc()}")
+
+        run_in_background(self.root, work, done, poll_ms=100)
+        return True
 
-            self.last_selected = {
-                "filename": filename,
-                "path": dst_path,
-                "csv_line": [filename, scene_id, img_path]
-            }
+    def commit_bulk(self, keys, scenes, total, started):
+        settings = self.export_settings
+        rows, transforms, taken, seen = [], [], {}, set()
+        for img_path, digest, phash in keys:
+            if digest is None:
+                self.log_error(f"Error reading image: {os.path.basename(img_path)}")
+                continue
+            if digest in self.selected_hashes or digest in self.remote_hashes or digest in seen:
+                continue
+            seen.add(digest)
+            filename = self.output_name_for(img_path, digest, taken)
+            dst_path = join_path(self.output_dir, filename)
+            taken[dst_path] = digest
+            scene_id = scenes[img_path]
+            rows.append((filename, scene_id, img_path, dst_path, digest, None if phash is None else to_signed64(phash)))
+            transforms.append(
+                (settings, None, {"scene_id": scene_id, "source_path": img_path}) if settings.transforms else None
+            )
+        if not rows:
+            self.log_info(f"⚠️ All {total} frames are already selected")
+            return
+
+        if not is_remote(self.output_dir):
+            os.makedirs(self.output_dir, exist_ok=True)
+        with self.stats.stage("select.bulk"):
+            commit_selections(
+                self.selection_store, self.export_worker, rows, transforms, append_csv=not self.csv_dirty
+            )
+        for filename, _, img_path, _, digest, phash in rows:
+            self.selected_hashes.add(digest)
+            self.selected_sources.add(img_path)
+            if phash is not None:
+                self.perceptual_index.add(img_path, phash, filename)
+        self.log_info(
+            f"✅ Selected {len(rows)} of {total} frames as one batch "
+            f"({total - len(rows)} skipped) in {time.perf_counter() - started:.1f}s"
+        )
+
+    def entered_scene_id(self):
+        scene_id = self.scene_entry.get().strip()
+        return "" if scene_id == "Enter scene ID or leave blank" else scene_id
+
+    def scene_id_for(self, img_path):
+        return self.entered_scene_id() or folder_name(parent_path(img_path))
+
+    def apply_scene_to_range(self):
+        paths = self.range_paths()
+        if not paths and self.current_index < len(self.image_paths):
+            paths = [self.image_paths[self.current_index]]
+        if paths and self.apply_scene(paths):
+            self.clear_range()
+
+    def apply_scene(self, paths):
+        # Re-label frames that are already selected; one undo step for the lot
+        scene_id = self.entered_scene_id()
+        if not scene_id:
+            self.log_info("⚠️ Type a scene ID first")
+            return False
+        if not self.ensure_selection_store():
+            return False
+        with self.stats.stage("select.scene"):
+            _, rows = self.selection_store.set_scene(paths, scene_id)
+        if not rows:
+            self.log_info(f"⚠️ None of the {len(paths)} frames are selected under another scene")
+            return False
+        self.schedule_csv_export()
+        self.log_info(f"🏷️ Scene '{scene_id}' applied to {len(rows)} selections")
+        return True
+
+    def output_name_for(self, img_path, digest, taken=None):
+        # Different files that share a name (IMG_0001.jpg from two flights)
+        # must not overwrite each other in the output folder. taken holds
+        # names claimed earlier in the same bulk batch.
+        filename = self.export_settings.output_name(os.path.basename(img_path))
+        dst_path = join_path(self.output_dir, filename)
+        owner = self.selection_store.dst_owner(dst_path)
+        if owner is None and taken:
+            owner = taken.get(dst_path)
+        if owner is None:
+            owner = self.remote_dst.get(dst_path)
+        if owner is None or owner == digest:
+            return filename
+        stem, ext = os.path.splitext(filename)
+        return f"{stem}_{digest[:8]}{ext}"
+
+    def perceptual_hash_for(self, img_path):
+        if img_path == self.current_image_path and self.current_phash is not None:
+            return self.current_phash
+        return dhash_paths([img_path]).get(img_path)
+
+    def select_path(self, img_path):
+        filename = os.path.basename(img_path)
+        scene_id = self.scene_id_for(img_path)
 
-            self.selected_images.add(filename)
+        try:
+            with self.stats.stage("select.hash"):
+                digest = self.hash_cache.get(img_path)
+                phash = self.perceptual_hash_for(img_path)
+            filename = self.output_name_for(img_path, digest)
+
+            if not is_remote(self.output_dir):
+                os.makedirs(self.output_dir, exist_ok=True)
+            dst_path = join_path(self.output_dir, filename)
+
+            # Copy happens on the export pool; poll_exports reports the outcome
+            transform = None
+            if self.export_settings.transforms:
+                settings = self.export_settings
+                crop = self.view_box() if settings.crop_to_view and img_path == self.current_image_path else None
+                transform = (settings, crop, {"scene_id": scene_id, "source_path": img_path})
+
+            # A pending CSV rewrite will pick this row up from the store
+            with self.stats.stage("select.commit"):
+                commit_selection(
+                    self.selection_store, self.export_worker,
+                    (filename, scene_id, img_path, dst_path, digest, None if phash is None else to_signed64(phash)),
+                    transform, append_csv=not self.csv_dirty
+                )
+            if os.path.abspath(img_path) == os.path.abspath(dst_path):
+                self.log_info(f"⚠️ Skipped copying (same file): {filename}")
+
+            self.selected_hashes.add(digest)
+            self.selected_sources.add(img_path)
+            if phash is not None:
+                self.perceptual_index.add(img_path, phash, filename)
             self.log_info(f"📃 Logged to CSV: {filename}, scene: {scene_id}")
-            self.reset_attribute_fields()
-            self.next_image()
+            return True
 
         except Exception as e:
             self.log_error(f"Error saving image: {filename} - {e}\n{traceback.format_exc()}")
+            return False
 
 
     def update_attribute_states(self, *args):
@@ -530,8 +5471,12 @@ class ImageSelectorGUI:
             self.last_logged_image = ""
             self.reset_attribute_fields()
             self.show_image()
+        elif self.review_queue is not None:
+            self.advance_folder()
         else:
             self.canvas.delete("all")
+            self.image_item = None
+            self.tile_items = {}
             self.canvas.create_text(
                 self.canvas.winfo_width() // 2,
                 self.canvas.winfo_height() // 2,
@@ -541,38 +5486,258 @@ class ImageSelectorGUI:
             self.log_info("🔹 Finished folder. No more images to show.")
 
 
+    def on_arrow_key(self, step):
+        now = time.monotonic()
+        repeating = now - self.last_nav_time < self.BURST_INTERVAL
+        self.last_nav_time = now
+
+        if not repeating and self.burst_job is None:
+            if step > 0:
+                self.next_image()
+            else:
+                self.previous_image()
+            return
+
+        self.burst_step(step)
+
+    def burst_step(self, step):
+        # Key held down: move the index at repeat speed and only fully render
+        # the frame the user stops on
+        if not self.image_paths:
+            return
+        target = min(max(self.current_index + step, 0), len(self.image_paths) - 1)
+        if target == self.current_index:
+            return
+
+        self.current_index = target
+        self.zoom_level = 1.0
+        self.image_offset = (0, 0)
+        self.prefetcher.schedule(self.prefetch_paths(), self.current_index, direction=step)
+        self.show_burst_frame()
+
+        if self.burst_job is not None:
+            self.root.after_cancel(self.burst_job)
+        self.burst_job = self.root.after(self.BURST_SETTLE_MS, self.finish_burst)
+
+    def show_burst_frame(self):
+        img_path = self.image_paths[self.current_index]
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
+
+        # Only draw what is already at hand; never decode while skimming
+        photo = self.render_cache.get((img_path, canvas_width, canvas_height, 1.0))
+        if photo is None:
+            pyramid = self.prefetcher.peek(img_path)
+            if pyramid is not None:
+                scale = min(canvas_width / pyramid.size[0], canvas_height / pyramid.size[1])
+                _, source = pyramid.level_for(scale)
+                size = (max(1, int(pyramid.size[0] * scale)), max(1, int(pyramid.size[1] * scale)))
+                photo = ImageTk.PhotoImage(source.resize(size, Image.Resampling.BILINEAR))
+
+        self.render_scheduler.cancel()
+        self.canvas.delete("all")
+        self.image_item = None
+        self.tile_items = {}
+        if photo is not None:
+            self.tk_image = photo
+            self.image_item = self.canvas.create_image(canvas_width // 2, canvas_height // 2, image=photo)
+
+        self.canvas.create_text(
+            10, 10, anchor="nw",
+            text=f"{os.path.basename(img_path)}  ({self.current_index + 1}/{len(self.image_paths)})",
+            fill="white", font=("Arial", 14)
+        )
+        if photo is None:
+            self.request_burst_preview()
+
+    def request_burst_preview(self):
+        # One thumbnail lookup in flight at a time; when it lands the user has
+        # usually moved on, so it is only drawn if still on that frame and the
+        # next lookup goes straight to wherever the burst is now
+        if self.burst_preview_busy:
+            return
+        img_path = self.image_paths[self.current_index]
+        self.burst_preview_busy = True
+        store = self.thumbnail_store
+
+        def done(thumb, error):
+            self.burst_preview_busy = False
+            if self.burst_job is None or self.image_item is not None:
+                return
+            if self.image_paths[self.current_index] != img_path:
+                self.request_burst_preview()
+                return
+            if thumb is None:
+                return
+            canvas_width = self.canvas.winfo_width()
+            canvas_height = self.canvas.winfo_height()
+            scale = min(canvas_width / thumb.width, canvas_height / thumb.height)
+            size = (max(1, int(thumb.width * scale)), max(1, int(thumb.height * scale)))
+            self.tk_image = ImageTk.PhotoImage(thumb.resize(size, Image.Resampling.BILINEAR))
+            self.image_item = self.canvas.create_image(canvas_width // 2, canvas_height // 2, image=self.tk_image)
+            self.canvas.tag_lower(self.image_item)
+
+        run_in_background(self.root, lambda: stored_thumbnail(store, img_path), done, poll_ms=15)
+
+    def finish_burst(self):
+        self.burst_job = None
+        self.show_image()
+        self.log_info(f"⏩ Stopped at image: {os.path.basename(self.image_paths[self.current_index])}")
+
     def quit_app(self):
+        if self.session_save_job is not None:
+            self.root.after_cancel(self.session_save_job)
+        self.save_session()
+        if self.selection_store is not None and self.csv_export_job is not None:
+            self.root.after_cancel(self.csv_export_job)
+            self.export_csv()
+        # Waits for queued copies so no selection is lost on exit
+        self.export_worker.close(self.csv_file)
+        self.watcher.stop()
+        if self.review_queue is not None:
+            self.review_queue.stop()
+        if self.review_progress is not None:
+            self.review_progress.close()
+        self.thumbnail_builder.shutdown()
+        self.quality_scorer.shutdown()
+        shutdown_process_pool()
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        self.log_listener.stop()
         self.root.quit()
 
 
     def undo_last_selection(self):
-        if not hasattr(self, 'last_selected') or not self.last_selected:
+        started = time.perf_counter()
+        self.ensure_selection_store()
+        result = revert_selection(self.selection_store, self.export_worker) if self.selection_store else None
+        if result is None:
             self.log_info("⚠️ Nothing to undo.")
             return
 
-        filename = self.last_selected["filename"]
-        path = self.last_selected["path"]
-        line_to_remove = self.last_selected["csv_line"]
+        kind, rows = result
+        if kind == "scene":
+            # The replaced rows are active again; selected keys are unchanged
+            self.schedule_csv_export()
+            self.log_info(f"⏪ Undid scene change on {len(rows)} selections")
+            return
+        for filename, _, source_path, dst_path, digest, _ in rows:
+            if digest and not self.selection_store.has_hash(digest):
+                self.selected_hashes.discard(digest)
+            if not self.selection_store.has_source(source_path):
+                self.selected_sources.discard(source_path)
+                self.perceptual_index.remove(source_path)
+
+        self.schedule_csv_export()
+        self.stats.record("undo.total", started)
+        self.log_info(f"⏪ Undid selection: {', '.join(r[0] for r in rows[:5])}"
+                      + (f" (+{len(rows) - 5} more)" if len(rows) > 5 else ""))
+
+    def redo_last_selection(self):
+        self.ensure_selection_store()
+        result = replay_selection(self.selection_store, self.export_worker) if self.selection_store else None
+        if result is None:
+            self.log_info("⚠️ Nothing to redo.")
+            return
 
-        # Remove from CSV
-        if os.path.exists(self.csv_file):
-            with open(self.csv_file, 'r') as f:
-                rows = list(csv.reader(f))
-            rows = [r for r in rows if r != line_to_remove]
-            with open(self.csv_file, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerows(rows)
+        kind, rows = result
+        if kind == "scene":
+            self.schedule_csv_export()
+            self.log_info(f"⏩ Redid scene change on {len(rows)} selections")
+            return
+        for filename, _, source_path, dst_path, digest, phash in rows:
+            if digest:
+                self.selected_hashes.add(digest)
+            self.selected_sources.add(source_path)
+            if phash is not None:
+                self.perceptual_index.add(source_path, phash, filename)
+
+        self.schedule_csv_export()
+        self.log_info(f"⏩ Redid selection: {', '.join(r[0] for r in rows[:5])}"
+                      + (f" (+{len(rows) - 5} more)" if len(rows) > 5 else ""))
+
+    def schedule_csv_export(self):
+        # Rewriting the CSV is O(selections), so it is batched and done off the Tk thread
+        self.csv_dirty = True
+        if self.csv_export_job is not None:
+            self.root.after_cancel(self.csv_export_job)
+        self.csv_export_job = self.root.after(2000, self.export_csv)
+
+    def export_csv(self):
+        self.csv_export_job = None
+        self.csv_dirty = False
+        self.export_worker.rewrite_csv(self.selection_store, self.csv_file, self.selection_store.max_id())
+
+    def open_export_settings(self):
+        popup = tk.Toplevel(self.root)
+        popup.title("Output Settings")
+        popup.grab_set()
+        current = self.export_settings
+
+        form = tk.Frame(popup, padx=20, pady=15)
+        form.pack()
+        format_var = tk.StringVar(value=current.format)
+        quality_var = tk.IntVar(value=current.quality)
+        max_side_var = tk.StringVar(value=str(current.max_side or ""))
+        crop_var = tk.BooleanVar(value=current.crop_to_view)
+
+        tk.Label(form, text="Format:").grid(row=0, column=0, sticky="w", pady=3)
+        tk.OptionMenu(form, format_var, *ExportSettings.FORMATS).grid(row=0, column=1, sticky="w")
+        tk.Label(form, text="Quality:").grid(row=1, column=0, sticky="w", pady=3)
+        tk.Spinbox(form, from_=1, to=100, textvariable=quality_var, width=6).grid(row=1, column=1, sticky="w")
+        tk.Label(form, text="Max side (px, blank = keep):").grid(row=2, column=0, sticky="w", pady=3)
+        tk.Entry(form, textvariable=max_side_var, width=8).grid(row=2, column=1, sticky="w")
+        tk.Checkbutton(form, text="Crop to current view", variable=crop_var).grid(
+            row=3, column=0, columnspan=2, sticky="w", pady=3
+        )
 
-        # Remove image file
-        if os.path.exists(path):
-            os.remove(path)
+        def save():
+            try:
+                max_side = int(max_side_var.get()) if max_side_var.get().strip() else None
+                quality = min(max(int(quality_var.get()), 1), 100)
+            except (ValueError, tk.TclError):
+                self.show_error_popup("Quality and max side must be whole numbers.")
+                return
+            self.export_settings = ExportSettings(format_var.get(), quality, max_side, crop_var.get())
+            self.log_info(f"⚙️ Output: {self.export_settings.describe()}")
+            popup.destroy()
+
+        button_frame = tk.Frame(popup)
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="✅ Save", width=12, command=save).pack(side=tk.LEFT, padx=10)
+        tk.Button(button_frame, text="❌ Cancel", width=12, command=popup.destroy).pack(side=tk.LEFT, padx=10)
+
+    def set_export_mode(self, mode):
+        self.export_worker.mode = mode
+        self.log_info(f"📤 Export mode: {mode}")
+
+    def poll_exports(self):
+        if self.csv_file:
+            self.export_worker.flush_csv(self.csv_file)
 
-        # Update internal state
-        if filename in self.selected_images:
-            self.selected_images.remove(filename)
+        saved = []
+        try:
+            while True:
+                kind, src, dst, error = self.export_worker.results.get_nowait()
+                if kind == "saved":
+                    saved.append(dst)
+                elif kind == "csv_failed":
+                    self.log_error(f"❌ Error writing CSV: {dst} - {error}")
+                else:
+                    self.log_error(f"❌ Export failed after retries: {dst} - {error}")
+        except queue.Empty:
+            pass
+        # A bulk selection lands hundreds of files per poll: one line for those
+        if len(saved) > 5:
+            self.log_info(f"✅ Saved {len(saved)} images to {self.output_dir}")
+        else:
+            for dst in saved:
+                self.log_info(f"✅ Saved image: {os.path.basename(dst)} to {dst}")
 
-        self.last_selected = None
-        self.log_info(f"⏪ Undid selection: {filename}")
+        worker = self.export_worker
+        self.export_status.config(text=f"{worker.backlog} queued · {worker.saved} saved · {worker.failed} failed")
+        self.root.after(250, self.poll_exports)
 
 
     def toggle_theme(self):
@@ -635,6 +5800,9 @@ class ImageSelectorGUI:
         self.next_btn.configure(bg=btn_bg, fg=fg)
         self.quit_btn.configure(bg=btn_bg, fg=fg)
         self.undo_btn.configure(bg=btn_bg, fg=fg)
+        self.redo_btn.configure(bg=btn_bg, fg=fg)
+        self.candidate_btn.configure(bg=btn_bg, fg=fg)
+        self.scene_btn.configure(bg=btn_bg, fg=fg)
 
         # Log panel
         self.log_frame.configure(bg=bg)
@@ -647,7 +5815,8 @@ class ImageSelectorGUI:
         # Hover effects
         hover_btn_bg = "#2c3b2c" if self.dark_mode else "#d9d9d9"
         for btn in [
-            self.select_btn, self.next_btn, self.quit_btn, self.undo_btn, self.theme_toggle_btn
+            self.select_btn, self.next_btn, self.quit_btn, self.undo_btn, self.redo_btn,
+            self.candidate_btn, self.scene_btn, self.theme_toggle_btn
         ]:
             self.apply_hover_effects(btn, btn_bg, hover_btn_bg)
 
@@ -658,7 +5827,239 @@ class ImageSelectorGUI:
         widget.bind("<Leave>", lambda e: widget.configure(bg=normal_bg))
 
 
-if __name__ == "__main__":
+def make_synthetic_tree(root, folders=3, images=40, size=(4000, 3000), formats=("jpg",), seed=0):
+    # Textured frames from upscaled noise: terrain-like detail, cheap to encode.
+    # Existing files are kept, so a tree is generated once and reused.
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    made = 0
+    for f in range(folders):
+        folder = os.path.join(root, f"flight_{f:03d}")
+        os.makedirs(folder, exist_ok=True)
+        for i in range(images):
+            fmt = formats[i % len(formats)]
+            path = os.path.join(folder, f"IMG_{i:05d}.{fmt}")
+            if os.path.exists(path):
+                continue
+            small = (rng.random((max(2, size[1] // 48), max(2, size[0] // 48), 3)) * 255).astype(np.uint8)
+            img = Image.fromarray(small).resize(size, Image.Resampling.BICUBIC)
+            if fmt in ("jpg", "jpeg"):
+                img.save(path, quality=90)
+            else:
+                img.save(path)
+            made += 1
+    return made
+
+
+def peak_rss_mb():
+    try:
+        import resource  # not on Windows
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_benchmark(root, canvas_size=(1600, 1000), steps=30, think_ms=0, progress=print):
+    # Drives ViewerCore and the select/undo core over every folder under root
+    stats = StageStats(window=100000)
+    viewer = ViewerCore(canvas_size, stats=stats)
+    folders = sorted(
+        os.path.join(root, name) for name in os.listdir(root) if os.path.isdir(os.path.join(root, name))
+    )
+    for folder in folders:
+        with stats.stage("bench.folder_scan"):
+            scan_folder(folder)
+
+    selectable = []
+    for folder in folders:
+        started = time.perf_counter()
+        viewer.open_folder(folder)
+        if not viewer.paths:
+            continue
+        viewer.show(0)
+        stats.record("bench.first_image", started)
+        selectable.extend(viewer.paths[:steps])
+
+        for _ in range(min(steps, len(viewer.paths) - 1)):
+            if think_ms:
+                time.sleep(think_ms / 1000)
+            with stats.stage("bench.next_image"):
+                viewer.step(1)
+
+        # Interactive frames use the preview filter, like the GUI while keys/mouse are busy
+        for _ in range(20):
+            with stats.stage("bench.zoom_frame"):
+                viewer.zoom_by(1.1, preview=True)
+        with stats.stage("bench.zoom_settle"):
+            viewer.frame()
+        for _ in range(steps):
+            with stats.stage("bench.pan_frame"):
+                viewer.pan(37, 23, preview=True)
+        progress(f"⏱️ {os.path.basename(folder)}: {len(viewer.paths)} images")
+    viewer.prefetcher.cancel()
+
+    with tempfile.TemporaryDirectory() as out:
+        csv_file = os.path.join(out, "bench.csv")
+        store = SelectionStore(SelectionStore.path_for_csv(csv_file))
+        worker = ExportWorker(stats=stats)
+        hash_cache = ContentHashCache()
+        for path in selectable:
+            with stats.stage("bench.select"):
+                digest = hash_cache.get(path)
+                name = f"{folder_name(parent_path(path))}_{os.path.basename(path)}"
+                commit_selection(store, worker, (name, "bench", path, os.path.join(out, name), digest, None))
+        worker.flush_csv(csv_file)
+        for _ in selectable:
+            with stats.stage("bench.undo"):
+                revert_selection(store, worker)
+        with stats.stage("bench.export_drain"):
+            worker.close(csv_file)
+        store.close()
+
+    metrics = {
+        name: {"n": count, "p50": round(p50, 3), "p95": round(p95, 3), "p99": round(p99, 3)}
+        for name, (count, p50, p95, p99) in stats.percentiles().items()
+    }
+    return {
+        "meta": {
+            "root": os.path.abspath(root), "canvas": list(canvas_size), "steps": steps, "think_ms": think_ms,
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "metrics": metrics,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare_benchmark(results, baseline, tolerance=0.2, floor_ms=1.0):
+    # (metric, statistic, baseline, current) for everything more than `tolerance`
+    # slower than the baseline; differences under floor_ms are noise
+    regressions = []
+    for name, current in results["metrics"].items():
+        base = baseline.get("metrics", {}).get(name)
+        if base is None:
+            continue
+        for key in ("p50", "p95"):
+            if current[key] > base[key] * (1 + tolerance) and current[key] - base[key] > floor_ms:
+                regressions.append((name, key, base[key], current[key]))
+    base_rss, rss = baseline.get("peak_rss_mb"), results.get("peak_rss_mb")
+    if base_rss and rss and rss > base_rss * (1 + tolerance):
+        regressions.append(("peak_rss_mb", "max", base_rss, rss))
+    return regressions
+
+
+def benchmark_command(args):
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    canvas = tuple(int(v) for v in args.canvas.lower().split("x"))
+    formats = tuple(f.strip().lower() for f in args.formats.split(",") if f.strip())
+    made = make_synthetic_tree(args.root, args.folders, args.images, (width, height), formats)
+    if made:
+        print(f"🧪 Generated {made} synthetic images under {args.root}")
+
+    results = run_benchmark(args.root, canvas, args.steps, args.think_ms)
+    print(f"{'metric':<24}{'n':>7}{'p50':>10}{'p95':>10}{'p99':>10}  ms")
+    for name, m in sorted(results["metrics"].items()):
+        print(f"{name:<24}{m['n']:>7}{m['p50']:>10.2f}{m['p95']:>10.2f}{m['p99']:>10.2f}")
+    if results["peak_rss_mb"] is not None:
+        print(f"peak RSS: {results['peak_rss_mb']:.0f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_benchmark(results, baseline, args.tolerance)
+        for name, key, before, after in regressions:
+            print(f"❌ {name} {key}: {before:.2f} -> {after:.2f}")
+        if regressions:
+            return 1
+        print(f"✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="GUI_tool", description="Deep Terrain AI PS-Tool")
+    commands = parser.add_subparsers(dest="command")
+
+    index_parser = commands.add_parser("index", help="Build or refresh the image manifest of a dataset tree")
+    index_parser.add_argument("root", help="Dataset root folder")
+    index_parser.add_argument("--manifest", help=f"Manifest path (default: <root>/{MANIFEST_NAME})")
+    index_parser.add_argument("--workers", type=int, default=None, help="Indexer processes (default: CPU count)")
+
+    export_parser = commands.add_parser("export", help="Re-export the images listed in a selection CSV")
+    export_parser.add_argument("csv_file", help="Selection CSV (filename, scene_id, source_path)")
+    export_parser.add_argument("out_dir", help="Output folder")
+    export_parser.add_argument("--format", choices=ExportSettings.FORMATS, default="original")
+    export_parser.add_argument("--quality", type=int, default=90, help="JPEG/WebP quality (default: 90)")
+    export_parser.add_argument("--max-side", type=int, default=None, help="Downscale so the longest side fits")
+    export_parser.add_argument("--shard-size", type=int, default=None,
+                               help="Write WebDataset tar shards of this many samples instead of files")
+    export_parser.add_argument("--workers", type=int, default=None, help="Encoder processes (default: CPU count)")
+
+    merge_parser = commands.add_parser("merge", help="Merge every labeler's selections in a shared output folder")
+    merge_parser.add_argument("output_dir", help="Shared output folder")
+    merge_parser.add_argument("csv_file", help="Merged CSV to write")
+    merge_parser.add_argument("--compact", action="store_true", help="Also compact shards of finished sessions")
+
+    bench_parser = commands.add_parser("benchmark", help="Time the viewing and selection pipeline on synthetic images")
+    bench_parser.add_argument("root", help="Image tree to benchmark; synthetic folders are generated here if missing")
+    bench_parser.add_argument("--folders", type=int, default=3)
+    bench_parser.add_argument("--images", type=int, default=40, help="Images per folder")
+    bench_parser.add_argument("--size", default="4000x3000", help="Synthetic image size WxH")
+    bench_parser.add_argument("--formats", default="jpg", help="Comma-separated synthetic formats (jpg,png,bmp)")
+    bench_parser.add_argument("--canvas", default="1600x1000", help="Simulated canvas size WxH")
+    bench_parser.add_argument("--steps", type=int, default=30, help="Next-image/pan steps and selections per folder")
+    bench_parser.add_argument("--think-ms", type=int, default=0, help="Pause between next-image steps")
+    bench_parser.add_argument("--output", help="Write results JSON here (use one as a baseline)")
+    bench_parser.add_argument("--baseline", help="Compare against a stored results JSON")
+    bench_parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs baseline")
+
+    parser.add_argument("--labeler", default=os.environ.get("PSTOOL_LABELER"),
+                        help="Name for shared-folder labeling (default: $PSTOOL_LABELER)")
+    parser.add_argument("--new-session", action="store_true",
+                        help="Ignore the saved session and choose the folders again")
+    parser.add_argument("--open", dest="base_dir", help="Base folder or s3://bucket/prefix to browse")
+    parser.add_argument("--output", help="Output folder or s3://bucket/prefix for selected images")
+    parser.add_argument("--s3-endpoint", default=os.environ.get("PSTOOL_S3_ENDPOINT"),
+                        help="S3-compatible endpoint URL, e.g. a local MinIO (default: $PSTOOL_S3_ENDPOINT)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "index":
+        build_manifest(args.root, args.manifest, args.workers)
+        return 0
+
+    if args.command == "export":
+        settings = ExportSettings(args.format, args.quality, args.max_side)
+        _, failed = export_selection(args.csv_file, args.out_dir, settings, args.shard_size, args.workers)
+        return 1 if failed else 0
+
+    if args.command == "benchmark":
+        return benchmark_command(args)
+
+    if args.command == "merge":
+        merge_sessions(args.output_dir, args.csv_file, args.compact)
+        return 0
+
+    if args.s3_endpoint:
+        os.environ["PSTOOL_S3_ENDPOINT"] = args.s3_endpoint  # inherited by the pool workers
+    base_dir, output_dir = args.base_dir, args.output
+    if base_dir and is_remote(base_dir) and base_dir != REMOTE_PREFIX:
+        base_dir = base_dir.rstrip("/")
+    if output_dir and is_remote(output_dir):
+        output_dir = output_dir.rstrip("/")
     root = tk.Tk()
-    app = ImageSelectorGUI(root)
+    app = ImageSelectorGUI(
+        root, labeler=args.labeler, resume=not args.new_session, base_dir=base_dir, output_dir=output_dir
+    )
     root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from PIL import Image
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    # Caches (thumbnails, hashes, quality scores) go under ~/.cache/pstool
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    return tmp_path / "home"
+
+
+@pytest.fixture
+def make_image():
+    def make(path, size=(320, 240), color=(200, 80, 40)):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        Image.new("RGB", size, color).save(path)
+        return str(path)
+    return make
@@ -0,0 +1,94 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+import GUI_tool as pstool
+
+
+def test_manifest_listing_keeps_archives(tmp_path, make_image):
+    root = tmp_path / "dataset"
+    make_image(root / "sub" / "a.jpg")
+    make_image(root / "b.png")
+    frame = make_image(tmp_path / "c.jpg")
+    with zipfile.ZipFile(root / "flight.zip", "w") as zf:
+        zf.write(frame, "c.jpg")
+    with tarfile.open(root / "day2.tar", "w") as tf:
+        tf.add(frame, "c.jpg")
+    manifest_path = str(tmp_path / "manifest.db")
+
+    pstool.build_manifest(str(root), manifest_path, workers=1, progress=lambda m: None)
+    manifest = pstool.Manifest(manifest_path, readonly=True)
+    listing = manifest.listing(str(root))
+    manifest.close()
+
+    assert listing.dirs == sorted(pstool.scan_folder(str(root)).dirs) == ["day2.tar", "flight.zip", "sub"]
+    assert listing.images == ["b.png"]
+
+
+def build_archives(root, frame_bytes):
+    root.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(root / "flight.zip", "w") as zf:
+        zf.writestr("day1/a.jpg", frame_bytes, compress_type=zipfile.ZIP_STORED)
+        zf.writestr("day1/b.jpg", frame_bytes[::-1], compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr("notes.txt", b"not an image")
+    with tarfile.open(root / "day2.tar", "w") as tf:
+        info = tarfile.TarInfo("./c.jpg")
+        info.size = len(frame_bytes)
+        tf.addfile(info, io.BytesIO(frame_bytes))
+    return str(root / "flight.zip"), str(root / "day2.tar")
+
+
+def test_members_read_back_from_zip_and_tar(tmp_path):
+    frame = bytes(range(256)) * 40
+    zip_path, tar_path = build_archives(tmp_path / "data", frame)
+    storage = pstool.ArchiveStorage(str(tmp_path / "archives.db"))
+    sep = pstool.ARCHIVE_SEP
+
+    listing = storage.listing(zip_path + sep)
+    assert (listing.dirs, listing.images) == (["day1"], [])
+    assert storage.listing(zip_path + sep + "day1").images == ["a.jpg", "b.jpg"]
+    assert storage.read(zip_path + sep + "day1/a.jpg") == frame
+    assert storage.read(zip_path + sep + "day1/b.jpg") == frame[::-1]
+    assert storage.read(tar_path + sep + "c.jpg") == frame
+    assert storage.stat(tar_path + sep + "c.jpg")[1] == len(frame)
+    with pytest.raises(FileNotFoundError):
+        storage.read(zip_path + sep + "day1/missing.jpg")
+
+    # A second storage reuses the SQLite member index instead of re-reading the archive
+    again = pstool.ArchiveStorage(str(tmp_path / "archives.db"))
+    again._build = None
+    assert again.read(zip_path + sep + "day1/a.jpg") == frame
+    storage.close()
+    again.close()
+
+
+def test_replaced_and_evicted_archives_are_unmapped(tmp_path, monkeypatch):
+    monkeypatch.setattr(pstool.ArchiveStorage, "MAX_MAPS", 2)
+    storage = pstool.ArchiveStorage(str(tmp_path / "archives.db"))
+    sep = pstool.ARCHIVE_SEP
+    archives = []
+    for i in range(3):
+        path = tmp_path / f"flight{i}.zip"
+        with zipfile.ZipFile(path, "w") as zf:
+            zf.writestr("a.jpg", b"old %d" % i)
+        archives.append(str(path))
+
+    assert storage.read(archives[0] + sep + "a.jpg") == b"old 0"
+    first = storage.maps[archives[0]][1]
+    with zipfile.ZipFile(archives[0], "w") as zf:
+        zf.writestr("a.jpg", b"replacement")
+    os.utime(archives[0], ns=(1, 1))
+    assert storage.read(archives[0] + sep + "a.jpg") == b"replacement"
+    assert first.closed
+
+    current = storage.maps[archives[0]][1]
+    for path in archives[1:]:
+        storage.read(path + sep + "a.jpg")
+    assert list(storage.maps) == archives[1:]
+    assert current.closed
+
+    storage.close()
+    assert storage.maps == {}
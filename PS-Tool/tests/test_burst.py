@@ -0,0 +1,91 @@
+import io
+import time
+
+from PIL import Image
+
+import GUI_tool as pstool
+
+
+class Root:
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+
+    def run_until_idle(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.callbacks:
+            assert time.monotonic() < deadline, "timed out"
+            time.sleep(0.01)
+            self.callbacks.pop(0)()
+
+
+class Canvas:
+    def __init__(self):
+        self.images = []
+
+    def winfo_width(self):
+        return 800
+
+    def winfo_height(self):
+        return 600
+
+    def create_image(self, x, y, image=None):
+        self.images.append(image)
+        return len(self.images)
+
+    def tag_lower(self, item):
+        pass
+
+
+def cached_thumbnail(store, path, size=(160, 120)):
+    buf = io.BytesIO()
+    Image.new("RGB", size).save(buf, "JPEG")
+    mtime, file_size = pstool.path_stat(path)
+    store.put_many([(path, mtime, file_size, buf.getvalue())])
+
+
+def test_stored_thumbnail_prefers_the_cache(tmp_path, make_image):
+    store = pstool.ThumbnailStore(str(tmp_path / "thumbnails.db"))
+    path = make_image(tmp_path / "a.jpg")
+    assert pstool.stored_thumbnail(store, path) is None  # no cache entry and no EXIF preview
+    cached_thumbnail(store, path)
+    assert pstool.stored_thumbnail(store, path).size == (160, 120)
+
+
+def test_burst_preview_is_looked_up_off_the_tk_thread_for_the_frame_in_view(tmp_path, make_image, monkeypatch):
+    monkeypatch.setattr(pstool.ImageTk, "PhotoImage", lambda image: image)
+    store = pstool.ThumbnailStore(str(tmp_path / "thumbnails.db"))
+    paths = [make_image(tmp_path / f"{i}.jpg") for i in range(3)]
+    cached_thumbnail(store, paths[2])
+
+    gui = pstool.ImageSelectorGUI.__new__(pstool.ImageSelectorGUI)
+    gui.root, gui.canvas, gui.thumbnail_store = Root(), Canvas(), store
+    gui.image_paths, gui.current_index = paths, 0
+    gui.image_item, gui.burst_job, gui.burst_preview_busy = None, "held", False
+
+    gui.request_burst_preview()
+    gui.current_index = 2  # the key is still held: the first lookup is stale by the time it lands
+    gui.request_burst_preview()  # ignored, one lookup at a time
+    gui.root.run_until_idle()
+
+    assert [img.size for img in gui.canvas.images] == [(800, 600)]
+    assert gui.image_item == 1 and not gui.burst_preview_busy
+
+
+def test_burst_preview_is_dropped_once_the_burst_has_ended(tmp_path, make_image, monkeypatch):
+    monkeypatch.setattr(pstool.ImageTk, "PhotoImage", lambda image: image)
+    store = pstool.ThumbnailStore(str(tmp_path / "thumbnails.db"))
+    path = make_image(tmp_path / "a.jpg")
+    cached_thumbnail(store, path)
+
+    gui = pstool.ImageSelectorGUI.__new__(pstool.ImageSelectorGUI)
+    gui.root, gui.canvas, gui.thumbnail_store = Root(), Canvas(), store
+    gui.image_paths, gui.current_index = [path], 0
+    gui.image_item, gui.burst_job, gui.burst_preview_busy = None, "held", False
+
+    gui.request_burst_preview()
+    gui.burst_job = None  # finish_burst ran and drew the full frame
+    gui.root.run_until_idle()
+    assert gui.canvas.images == []
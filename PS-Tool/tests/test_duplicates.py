@@ -0,0 +1,49 @@
+import shutil
+
+import GUI_tool as pstool
+
+
+def test_removing_a_frame_keeps_same_named_frames_from_other_folders():
+    index = pstool.PerceptualIndex()
+    index.add("/data/flight1/IMG_0001.JPG", 0b1111, "IMG_0001.JPG")
+    index.add("/data/flight2/IMG_0001.JPG", 0b1111 << 32, "IMG_0001.JPG")
+    index.remove("/data/flight1/IMG_0001.JPG")
+    assert index.search(0b1111, max_distance=0) == []
+    assert index.search(0b1111 << 32, max_distance=0) == [(0, "IMG_0001.JPG")]
+
+
+def test_search_orders_matches_by_distance():
+    index = pstool.PerceptualIndex()
+    index.add("/a.jpg", 0b0111, "a.jpg")
+    index.add("/b.jpg", 0b0000, "b.jpg")
+    index.add("/c.jpg", 0b0001, "c.jpg")
+    index.add("/far.jpg", (1 << 64) - 1, "far.jpg")
+    assert index.search(0, max_distance=3) == [(0, "b.jpg"), (1, "c.jpg"), (3, "a.jpg")]
+    assert len(index) == 4
+
+
+def test_identical_bytes_hash_alike_under_any_name(tmp_path, make_image):
+    src = make_image(tmp_path / "a" / "frame.jpg")
+    copy = tmp_path / "b" / "renamed.jpg"
+    copy.parent.mkdir()
+    shutil.copyfile(src, copy)
+    other = make_image(tmp_path / "c" / "frame.jpg", color=(0, 0, 0))
+    assert pstool.content_hash(src) == pstool.content_hash(str(copy)) != pstool.content_hash(other)
+
+
+def test_hash_cache_hit_does_not_reread_the_file(tmp_path, make_image, monkeypatch):
+    path = make_image(tmp_path / "frame.jpg")
+    reads = []
+    real_hash = pstool.content_hash
+    monkeypatch.setattr(pstool, "content_hash", lambda p: reads.append(p) or real_hash(p))
+    cache = pstool.ContentHashCache()
+
+    assert cache.peek(path) is None
+    digest = cache.get(path)
+    assert cache.get(path) == cache.peek(path) == digest
+    assert reads == [path]
+
+    make_image(tmp_path / "frame.jpg", size=(100, 80))  # rewritten: the cached hash is stale
+    assert cache.peek(path) is None
+    assert cache.get(path) != digest
+    assert len(reads) == 2
@@ -0,0 +1,88 @@
+import csv
+import json
+import os
+import tarfile
+
+from PIL import Image
+
+import GUI_tool as pstool
+
+
+def test_redo_reexports_with_the_original_transform(tmp_path, make_image):
+    src = make_image(tmp_path / "in" / "frame.jpg", size=(400, 300))
+    dst = str(tmp_path / "out" / "frame.webp")
+    os.makedirs(os.path.dirname(dst))
+    settings = pstool.ExportSettings(format="webp", quality=80, max_side=100)
+    store = pstool.SelectionStore(str(tmp_path / "selections.db"))
+    store.add([("frame.jpg", "s1", src, dst, None, None)], exports=[settings.spec()])
+    store.undo()
+
+    worker = pstool.ExportWorker(workers=1)
+    kind, rows = pstool.replay_selection(store, worker)
+    worker.close()
+
+    assert kind == "select" and [r[3] for r in rows] == [dst]
+    with Image.open(dst) as img:
+        assert img.format == "WEBP"
+        assert max(img.size) == 100
+    store.close()
+
+
+def test_export_keeps_same_named_frames_apart(tmp_path, make_image):
+    csv_file = str(tmp_path / "selections.csv")
+    sources = [make_image(tmp_path / folder / "IMG_0001.JPG") for folder in ("a", "b", "c")]
+    sources.append(make_image(tmp_path / "d" / "img_0001.jpg"))
+    with open(csv_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(pstool.CSV_HEADER)
+        writer.writerows((os.path.basename(s), "", s) for s in sources)
+
+    out = str(tmp_path / "export")
+    exported, failed = pstool.export_selection(csv_file, out, pstool.ExportSettings(), workers=2,
+                                               progress=lambda m: None)
+
+    assert (exported, failed) == (4, 0)
+    names = ["IMG_0001.JPG", "IMG_0001_2.JPG", "IMG_0001_3.JPG", "img_0001_4.jpg"]
+    assert sorted(os.listdir(out)) == sorted(names + [pstool.EXPORT_METADATA_NAME])
+    # Plain copies carry no embedded metadata; the sidecar says where each came from
+    with open(os.path.join(out, pstool.EXPORT_METADATA_NAME)) as f:
+        records = {r["source_path"]: r["file"] for r in map(json.loads, f)}
+    assert sorted(records.values()) == names
+    for source in sources:
+        with open(source, "rb") as original, open(os.path.join(out, records[source]), "rb") as copy:
+            assert original.read() == copy.read()
+
+
+def test_bmp_export_is_named_for_the_format_it_is_encoded_in(tmp_path, make_image):
+    src = make_image(tmp_path / "frame.bmp")
+    settings = pstool.ExportSettings(max_side=64)
+    data, _ = pstool.encode_export(src, settings)
+    assert settings.output_format(src) == "png"
+    assert settings.output_name("frame.bmp") == "frame.png"
+    assert data.startswith(b"\x89PNG")
+    # Untransformed copies keep their bytes, so they keep their name
+    assert pstool.ExportSettings().output_name("frame.bmp") == "frame.bmp"
+
+
+def test_original_format_shards_keep_the_source_bytes(tmp_path, make_image):
+    sources = [make_image(tmp_path / "in" / f"frame{i}.jpg") for i in range(3)]
+    csv_file = str(tmp_path / "selections.csv")
+    with open(csv_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(pstool.CSV_HEADER)
+        writer.writerows((os.path.basename(s), "s1", s) for s in sources)
+
+    out = str(tmp_path / "shards")
+    assert pstool.export_selection(csv_file, out, pstool.ExportSettings(), shard_size=2, workers=1,
+                                   progress=lambda m: None) == (3, 0)
+
+    members = {}
+    for name in sorted(os.listdir(out)):
+        with tarfile.open(os.path.join(out, name)) as tf:
+            for info in tf.getmembers():
+                members[info.name] = tf.extractfile(info).read()
+    assert sorted(members) == ["frame0.jpg", "frame0.json", "frame1.jpg", "frame1.json", "frame2.jpg", "frame2.json"]
+    for i, source in enumerate(sources):
+        with open(source, "rb") as f:
+            assert members[f"frame{i}.jpg"] == f.read()
+        assert json.loads(members[f"frame{i}.json"])["source_path"] == source
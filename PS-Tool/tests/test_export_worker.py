@@ -0,0 +1,65 @@
+import csv
+import os
+
+import pytest
+
+import GUI_tool as pstool
+
+
+def drain(worker):
+    results = []
+    while not worker.results.empty():
+        results.append(worker.results.get())
+    return results
+
+
+@pytest.mark.parametrize("mode", ["copy", "hardlink", "symlink", "reflink"])
+def test_link_modes_place_the_file(tmp_path, make_image, mode):
+    src = make_image(tmp_path / "in" / "frame.jpg")
+    dst = str(tmp_path / "out" / "frame.jpg")
+    os.makedirs(os.path.dirname(dst))
+    worker = pstool.ExportWorker(workers=1, mode=mode)
+    worker.submit(src, dst)
+    worker.close()
+
+    assert [r[0] for r in drain(worker)] == ["saved"]
+    assert not os.path.exists(dst + ".part")
+    with open(src, "rb") as a, open(dst, "rb") as b:
+        assert a.read() == b.read()
+    assert os.path.islink(dst) == (mode == "symlink")
+    assert os.path.samefile(src, dst) == (mode in ("hardlink", "symlink"))
+
+
+def test_archive_members_and_objects_are_always_copied(tmp_path):
+    worker = pstool.ExportWorker(workers=1, mode="hardlink")
+    assert worker.effective_mode(str(tmp_path / "a.jpg"), str(tmp_path / "b.jpg")) == "hardlink"
+    member = str(tmp_path / "flight.zip") + pstool.ARCHIVE_SEP + "a.jpg"
+    assert worker.effective_mode(member, str(tmp_path / "b.jpg")) == "copy"
+    assert worker.effective_mode(str(tmp_path / "a.jpg"), "s3://frames/b.jpg") == "copy"
+    worker.close()
+
+
+def test_failed_copies_retry_without_sleeping_after_the_last_attempt(tmp_path, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(pstool.time, "sleep", sleeps.append)
+    worker = pstool.ExportWorker(workers=1, retries=3)
+    dst = str(tmp_path / "frame.jpg")
+    worker.submit(str(tmp_path / "missing.jpg"), dst)
+    worker.close()
+
+    (status, _, failed_dst, error), = drain(worker)
+    assert (status, failed_dst) == ("failed", dst)
+    assert isinstance(error, OSError)
+    assert sleeps == [0.5, 1.0]
+    assert (worker.saved, worker.failed, worker.backlog) == (0, 1, 0)
+
+
+def test_csv_rows_are_appended_under_one_header(tmp_path):
+    csv_file = str(tmp_path / "selections.csv")
+    worker = pstool.ExportWorker(workers=1)
+    worker.append_row(["a.jpg", "s1", "/data/a.jpg"])
+    worker.flush_csv(csv_file)
+    worker.append_row(["b.jpg", "s1", "/data/b.jpg"])
+    worker.close(csv_file)
+    with open(csv_file, newline="") as f:
+        assert list(csv.reader(f)) == [pstool.CSV_HEADER, ["a.jpg", "s1", "/data/a.jpg"], ["b.jpg", "s1", "/data/b.jpg"]]
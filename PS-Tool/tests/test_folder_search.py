@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+import GUI_tool as pstool
+
+NAMES = ["Flight_07_North", "flight_12_south", "Calib", "archive_2023", "North_pass", "f1", "FLIGHT_07_retake"]
+
+
+def test_substring_search_is_case_insensitive_and_keeps_order():
+    index = pstool.FolderSearchIndex(NAMES)
+    assert index.search("FLIGHT_07") == ["Flight_07_North", "FLIGHT_07_retake"]
+    assert index.search("nor") == ["Flight_07_North", "North_pass"]
+    assert index.search("f1") == ["f1"]  # shorter than a trigram
+    assert index.search("zzz") == []
+    assert index.search("") == NAMES
+
+
+def test_prefix_search_returns_matches_in_original_order():
+    index = pstool.FolderSearchIndex(NAMES)
+    assert index.search("fli", "prefix") == ["Flight_07_North", "flight_12_south", "FLIGHT_07_retake"]
+    assert index.search("north", "prefix") == ["North_pass"]
+
+
+def test_fuzzy_search_ranks_the_tightest_match_first():
+    index = pstool.FolderSearchIndex(NAMES)
+    assert index.search("f07n", "fuzzy") == ["Flight_07_North"]
+    assert index.search("fs", "fuzzy")[0] == "flight_12_south"
+
+
+@pytest.mark.parametrize("mode", pstool.FolderSearchIndex.MODES)
+def test_index_matches_a_linear_scan(mode):
+    rng = random.Random(7)
+    names = ["".join(rng.choice("abcde_") for _ in range(rng.randint(1, 10))) for _ in range(500)]
+    index = pstool.FolderSearchIndex(names)
+    for query in ["a", "ab", "abc", "b_d", "eeee", "c_a_"]:
+        assert index.search(query, mode) == pstool.linear_search(names, query, mode)
@@ -0,0 +1,114 @@
+import itertools
+import os
+import time
+
+import GUI_tool as pstool
+
+
+class Root:
+    def after(self, ms, callback):
+        return "job"
+
+    def after_cancel(self, job):
+        pass
+
+
+TICKS = itertools.count(1)
+
+
+def touch_dir(path):
+    # Directory mtimes can be coarse; make every change visible to the watcher
+    tick = next(TICKS) * 10 ** 9
+    os.utime(path, ns=(tick, tick))
+
+
+def start(folder):
+    watcher = pstool.FolderWatcher(Root(), on_change=None)
+    watcher.watch(folder, pstool.scan_folder(folder))
+    return watcher
+
+
+def test_new_frames_are_announced_once_they_settle(tmp_path, make_image):
+    folder = str(tmp_path)
+    make_image(tmp_path / "001.jpg")
+    watcher = start(folder)
+    assert watcher._check(watcher.state) is None
+
+    make_image(tmp_path / "002.jpg")  # just written: may still be copying
+    touch_dir(folder)
+    assert watcher._check(watcher.state) is None
+    assert list(watcher.state["pending"]) == ["002.jpg"]
+
+    assert watcher._check(watcher.state) == (["002.jpg"], [], [], [], [])
+    assert watcher.state["pending"] == {}
+
+
+def test_frames_written_long_ago_are_announced_straight_away(tmp_path, make_image):
+    folder = str(tmp_path)
+    watcher = start(folder)
+    old = make_image(tmp_path / "old.jpg")
+    os.utime(old, (time.time() - 60, time.time() - 60))
+    touch_dir(folder)
+    assert watcher._check(watcher.state) == (["old.jpg"], [], [], [], [])
+
+
+def test_removed_rewritten_and_new_folders_are_reported(tmp_path, make_image):
+    folder = str(tmp_path)
+    make_image(tmp_path / "001.jpg")
+    make_image(tmp_path / "002.jpg")
+    watcher = start(folder)
+    touch_dir(folder)
+    assert watcher._check(watcher.state) is None  # first re-read only learns signatures
+
+    os.remove(tmp_path / "002.jpg")
+    make_image(tmp_path / "001.jpg", size=(100, 100))
+    (tmp_path / "flight2").mkdir()
+    (tmp_path / "notes.txt").write_text("ignored")
+    touch_dir(folder)
+    assert watcher._check(watcher.state) == ([], ["002.jpg"], ["001.jpg"], ["flight2"], [])
+
+
+def test_in_place_rewrites_are_caught_by_the_periodic_full_rescan(tmp_path, make_image):
+    folder = str(tmp_path)
+    make_image(tmp_path / "001.jpg")
+    watcher = start(folder)
+    touch_dir(folder)
+    watcher._check(watcher.state)
+
+    mtime = os.stat(folder).st_mtime_ns
+    make_image(tmp_path / "001.jpg", size=(100, 100))
+    os.utime(folder, ns=(mtime, mtime))  # the directory itself looks untouched
+    results = [watcher._check(watcher.state) for _ in range(pstool.FolderWatcher.FULL_RESCAN_POLLS)]
+    assert results.count(None) == len(results) - 1
+    assert ([], [], ["001.jpg"], [], []) in results
+
+
+def test_entry_signature_tracks_size_and_mtime(tmp_path, make_image):
+    make_image(tmp_path / "a.jpg")
+    before = [pstool.entry_signature(e) for e in os.scandir(tmp_path)]
+    make_image(tmp_path / "a.jpg", size=(10, 10))
+    after = [pstool.entry_signature(e) for e in os.scandir(tmp_path)]
+    assert before != after
+
+
+class Canvas:
+    def canvasy(self, y):
+        return 0
+
+    def yview_moveto(self, fraction):
+        pass
+
+
+def test_filmstrip_marks_follow_their_frames_when_paths_change():
+    view = pstool.FilmstripView.__new__(pstool.FilmstripView)
+    view.canvas = Canvas()
+    view.columns, view.cell = 4, 100
+    view.layout = view.refresh = lambda: None
+    view.paths = ["a", "b", "c", "d"]
+    view.marked = {1, 3}
+    view.last_clicked = 3
+
+    view.update_paths(["new", "a", "b", "d"])  # c removed, a frame copied in at the front
+    assert view.marked == {2, 3}
+    assert view.last_clicked == 3
+    assert view.index_of["new"] == 0
@@ -0,0 +1,74 @@
+import os
+import time
+
+import GUI_tool as pstool
+
+
+class Root:
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+        return len(self.callbacks)
+
+    def run_until_idle(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.callbacks:
+            assert time.monotonic() < deadline, "timed out"
+            time.sleep(0.01)
+            self.callbacks.pop(0)()
+
+
+def make_tree(root, make_image, images=5):
+    for i in range(images):
+        make_image(root / f"{i:03d}.jpg", size=(8, 8))
+    (root / "notes.txt").write_text("not an image")
+    (root / "sub" / "deeper").mkdir(parents=True)
+    (root / "b_sub").mkdir()
+    return str(root)
+
+
+def test_scan_folder_lists_subfolders_and_images_sorted(tmp_path, make_image):
+    folder = make_tree(tmp_path / "data", make_image)
+    listing = pstool.scan_folder(folder)
+    assert listing.dirs == ["b_sub", "sub"]
+    assert listing.images == [f"{i:03d}.jpg" for i in range(5)]
+    assert listing.mtime == os.stat(folder).st_mtime_ns
+    assert pstool.walk_folders(folder) == ["b_sub", "sub", os.path.join("sub", "deeper")]
+
+
+def test_scanner_streams_batches_and_shares_one_scan(tmp_path, make_image):
+    folder = make_tree(tmp_path / "data", make_image, images=7)
+    root = Root()
+    scanner = pstool.DirectoryScanner(root, batch_size=3)
+    batches, done = [], []
+    scanner.listdir(folder, lambda listing, error: done.append(listing), lambda d, i: batches.append(len(d) + len(i)))
+    scanner.listdir(folder, lambda listing, error: done.append(listing))
+    root.run_until_idle()
+
+    assert sum(batches) == 9 and max(batches) == 3
+    assert len(done) == 2 and done[0] is done[1]
+    assert done[0].images == [f"{i:03d}.jpg" for i in range(7)]
+
+
+def test_cached_listing_is_dropped_when_the_folder_changes(tmp_path, make_image):
+    folder = make_tree(tmp_path / "data", make_image)
+    root = Root()
+    scanner = pstool.DirectoryScanner(root)
+    scanner.listdir(folder, lambda listing, error: None)
+    root.run_until_idle()
+    assert scanner.cached(folder) is not None
+
+    make_image(tmp_path / "data" / "new.jpg", size=(8, 8))
+    os.utime(folder, ns=(1, 1))
+    assert scanner.cached(folder) is None
+
+
+def test_scan_errors_reach_the_caller(tmp_path):
+    root = Root()
+    scanner = pstool.DirectoryScanner(root)
+    errors = []
+    scanner.listdir(str(tmp_path / "missing"), lambda listing, error: errors.append(error))
+    root.run_until_idle()
+    assert isinstance(errors[0], FileNotFoundError)
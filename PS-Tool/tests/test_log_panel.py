@@ -0,0 +1,92 @@
+import logging
+import threading
+
+import GUI_tool as pstool
+
+
+class Text:
+    # Just enough of a Tk Text widget: its content, tags and scroll position
+    def __init__(self):
+        self.lines = []
+        self.tags = []
+        self.inserts = 0
+        self.scrolled_to_end = False
+        self.view = (0.0, 1.0)
+        self.after_calls = []
+
+    def tag_configure(self, tag, **options):
+        pass
+
+    def after(self, ms, callback):
+        self.after_calls.append(callback)
+
+    def configure(self, **options):
+        pass
+
+    def yview(self, *args):
+        if args:
+            self.scrolled_to_end = True
+        return self.view
+
+    def insert(self, index, *chunks):
+        self.inserts += 1
+        for text, tags in zip(chunks[::2], chunks[1::2]):
+            for line in text.splitlines():
+                self.lines.append(line)
+                self.tags.append(tags)
+
+    def index(self, index):
+        # Tk keeps a trailing newline, so "end-1c" sits on the line after the last record
+        return f"{len(self.lines) + 1}.0"
+
+    def delete(self, start, end):
+        count = int(end.split(".")[0]) - 1
+        del self.lines[:count]
+        del self.tags[:count]
+
+
+def make_logger(panel):
+    logger = logging.getLogger(f"test_log_panel.{id(panel)}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(panel)
+    return logger
+
+
+def test_records_from_many_threads_land_in_one_insert():
+    widget = Text()
+    panel = pstool.LogPanel(widget, max_lines=1000)
+    logger = make_logger(panel)
+    threads = [threading.Thread(target=lambda n=n: [logger.info("t%d-%d", n, i) for i in range(50)])
+               for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    logger.error("boom")
+
+    panel.drain()
+    assert widget.inserts == 1
+    assert len(widget.lines) == 201
+    assert widget.tags[-1] == "error" and widget.tags[0] == ()
+    assert widget.scrolled_to_end
+    assert len(widget.after_calls) == 2  # the first drain, then the one it rescheduled
+
+
+def test_widget_keeps_only_the_last_lines_even_for_multi_line_records():
+    widget = Text()
+    panel = pstool.LogPanel(widget, max_lines=5)
+    logger = make_logger(panel)
+    for i in range(3):
+        logger.info("record %d", i)
+    logger.info("traceback\n  line 1\n  line 2")
+    panel.drain()
+    assert widget.lines == ["record 1", "record 2", "traceback", "  line 1", "  line 2"]
+
+    # Scrolled up to read: new records are added but the view stays put
+    widget.view = (0.2, 0.5)
+    widget.scrolled_to_end = False
+    logger.info("later")
+    panel.drain()
+    assert widget.lines[-1] == "later" and len(widget.lines) == 5
+    assert not widget.scrolled_to_end
@@ -0,0 +1,60 @@
+import os
+
+from PIL import Image
+
+import GUI_tool as pstool
+
+
+def test_index_file_records_size_format_and_capture_time(tmp_path):
+    path = str(tmp_path / "frame.jpg")
+    exif = Image.Exif()
+    exif[0x0132] = "2024:05:06 07:08:09"
+    Image.new("RGB", (64, 48), (10, 20, 30)).save(path, exif=exif)
+    st = os.stat(path)
+
+    row = pstool.index_file((path, st.st_size, st.st_mtime_ns))
+    assert row[:8] == (path, str(tmp_path), "frame.jpg", st.st_size, st.st_mtime_ns, 64, 48, "JPEG")
+    assert row[8] == "2024:05:06 07:08:09"
+    assert row[11] == pstool.content_hash(path)
+
+
+def test_rebuild_only_reindexes_changed_files(tmp_path, make_image):
+    root = tmp_path / "dataset"
+    make_image(root / "a.jpg")
+    make_image(root / "b.jpg")
+    gone = make_image(root / "sub" / "c.jpg")
+    manifest_path = str(tmp_path / "manifest.db")
+    messages = []
+    pstool.build_manifest(str(root), manifest_path, workers=1, progress=messages.append)
+    assert "3 new or changed, 0 removed" in messages[0]
+
+    messages.clear()
+    pstool.build_manifest(str(root), manifest_path, workers=1, progress=messages.append)
+    assert "0 new or changed, 0 removed" in messages[0]
+
+    make_image(root / "a.jpg", size=(100, 50))
+    os.remove(gone)
+    messages.clear()
+    pstool.build_manifest(str(root), manifest_path, workers=1, progress=messages.append)
+    assert "1 new or changed, 1 removed" in messages[0]
+
+    manifest = pstool.Manifest(manifest_path, readonly=True)
+    sizes = {name: (w, h) for name, w, h in manifest.conn.execute("SELECT name, width, height FROM files")}
+    assert sizes == {"a.jpg": (100, 50), "b.jpg": (320, 240)}
+    assert manifest.listing(str(root)).images == ["a.jpg", "b.jpg"]
+    manifest.close()
+
+
+def test_listing_falls_back_once_the_directory_changes(tmp_path, make_image):
+    root = tmp_path / "dataset"
+    make_image(root / "a.jpg")
+    manifest_path = str(tmp_path / "manifest.db")
+    pstool.build_manifest(str(root), manifest_path, workers=1, progress=lambda m: None)
+    manifest = pstool.Manifest(manifest_path, readonly=True)
+    assert manifest.listing(str(root)).images == ["a.jpg"]
+
+    make_image(root / "b.jpg")
+    os.utime(root, ns=(1, 1))
+    assert manifest.listing(str(root)) is None
+    assert manifest.listing(str(tmp_path / "elsewhere")) is None
+    manifest.close()
@@ -0,0 +1,63 @@
+import time
+
+import GUI_tool as pstool
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_schedule_decodes_the_neighbours_in_the_background(tmp_path, make_image):
+    paths = [make_image(tmp_path / f"{i:02d}.jpg") for i in range(8)]
+    decoded = []
+    prefetcher = pstool.ImagePrefetcher(ahead=2, behind=1, on_decoded=decoded.append)
+
+    prefetcher.schedule(paths, 4)
+    wait_for(lambda: len(decoded) == 3)
+    assert sorted(decoded) == [paths[3], paths[5], paths[6]]
+    assert prefetcher.peek(paths[4]) is None
+
+
+def test_get_decodes_once_and_serves_from_the_cache(tmp_path, make_image, monkeypatch):
+    path = make_image(tmp_path / "a.jpg", size=(600, 400))
+    prefetcher = pstool.ImagePrefetcher(workers=1)
+    loads = []
+    real_load = prefetcher._load
+    monkeypatch.setattr(prefetcher, "_load", lambda p, full=False: loads.append(p) or real_load(p, full))
+
+    pyramid = prefetcher.get(path)
+    assert prefetcher.get(path) is pyramid
+    assert loads == [path]
+    assert pyramid.size == (600, 400)
+
+
+def test_cache_stays_within_its_memory_budget(tmp_path, make_image):
+    paths = [make_image(tmp_path / f"{i}.png", size=(300, 300)) for i in range(4)]
+    one = pstool.ImagePrefetcher(workers=1).get(paths[0]).nbytes
+    prefetcher = pstool.ImagePrefetcher(workers=1, memory_budget=int(one * 2.5))
+    for path in paths:
+        prefetcher.get(path)
+    assert prefetcher.cache_bytes <= prefetcher.memory_budget
+    assert list(prefetcher.cache) == paths[2:]
+
+
+def test_cancel_drops_queued_decodes(tmp_path, make_image):
+    paths = [make_image(tmp_path / f"{i}.jpg") for i in range(6)]
+    prefetcher = pstool.ImagePrefetcher(workers=0)  # nothing picks tasks up
+    prefetcher.schedule(paths, 0)
+    assert not prefetcher.tasks.empty()
+    prefetcher.cancel()
+    assert prefetcher.tasks.empty()
+
+
+def test_moving_backwards_prefetches_ahead_in_that_direction(tmp_path, make_image):
+    paths = [make_image(tmp_path / f"{i:02d}.jpg") for i in range(8)]
+    prefetcher = pstool.ImagePrefetcher(ahead=3, behind=1, workers=0)
+    prefetcher.schedule(paths, 4, direction=-1)
+    queued = []
+    while not prefetcher.tasks.empty():
+        queued.append(prefetcher.tasks.get()[1])
+    assert queued == [paths[3], paths[5], paths[2], paths[1]]
@@ -0,0 +1,61 @@
+import io
+import struct
+
+from PIL import Image
+
+import GUI_tool as pstool
+
+
+def jpeg_bytes(size, color):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, "JPEG")
+    return out.getvalue()
+
+
+def test_jpeg_decodes_at_the_scale_the_canvas_needs(tmp_path, make_image):
+    path = make_image(tmp_path / "big.jpg", size=(1600, 1200))
+    img, size = pstool.decode_image(path, fit_size=(400, 300))
+    assert size == (1600, 1200)
+    assert img.size == (400, 300)
+
+    img, _ = pstool.decode_image(path, fit_size=(500, 400))
+    assert img.size == (800, 600)  # 1/4 would no longer cover the fitted image
+    assert pstool.decode_image(path)[0].size == (1600, 1200)
+
+
+def test_png_always_decodes_in_full(tmp_path, make_image):
+    path = make_image(tmp_path / "big.png", size=(1600, 1200))
+    img, size = pstool.decode_image(path, fit_size=(400, 300))
+    assert img.size == size == (1600, 1200)
+
+
+def test_reduced_pyramid_is_swapped_for_full_resolution_on_demand(tmp_path, make_image):
+    path = make_image(tmp_path / "big.jpg", size=(1600, 1200))
+    prefetcher = pstool.ImagePrefetcher(workers=0, fit_size=(400, 300))
+    reduced = prefetcher.get(path)
+    assert (reduced.size, reduced.base_scale) == ((1600, 1200), 0.25)
+
+    full = prefetcher.get_full(path)
+    assert full.base_scale == 1.0
+    assert prefetcher.peek(path) is full
+    assert prefetcher.get_full(path) is full
+
+
+def test_embedded_exif_preview_is_read_without_decoding_the_frame(tmp_path):
+    preview = jpeg_bytes((80, 60), (0, 255, 0))
+    # Little-endian TIFF: IFD0 with one entry, then IFD1 pointing at the preview
+    tiff = b"II*\x00" + struct.pack("<I", 8)
+    tiff += struct.pack("<H", 1) + struct.pack("<HHII", 0x0112, 3, 1, 1) + struct.pack("<I", 26)
+    tiff += struct.pack("<H", 2) + struct.pack("<HHII", 0x0201, 4, 1, 56)
+    tiff += struct.pack("<HHII", 0x0202, 4, 1, len(preview)) + struct.pack("<I", 0)
+    path = str(tmp_path / "frame.jpg")
+    Image.new("RGB", (1600, 1200), (255, 0, 0)).save(path, exif=b"Exif\x00\x00" + tiff + preview)
+
+    thumb = pstool.exif_thumbnail(path)
+    assert thumb.size == (80, 60)
+    assert thumb.getpixel((40, 30))[1] > 200
+
+    plain = str(tmp_path / "plain.jpg")
+    Image.new("RGB", (64, 48)).save(plain)
+    assert pstool.exif_thumbnail(plain) is None
+    assert pstool.exif_thumbnail(str(tmp_path / "missing.jpg")) is None
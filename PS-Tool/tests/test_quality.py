@@ -0,0 +1,76 @@
+import time
+
+import pytest
+from PIL import Image, ImageFilter
+
+import GUI_tool as pstool
+
+
+def nap(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_shutdown_drops_queued_work(monkeypatch):
+    monkeypatch.setattr(pstool, "_process_pool", pstool.SharedProcessPool(max_workers=1))
+    futures = [pstool.shared_process_pool().submit(nap, 0.2) for _ in range(20)]
+    started = time.monotonic()
+    pstool.shutdown_process_pool()
+    assert time.monotonic() - started < 2
+    assert sum(f.cancelled() for f in futures) >= 15
+    assert pstool._process_pool is None
+
+
+@pytest.fixture
+def np():
+    # numpy is only imported where the metrics need it
+    return pytest.importorskip("numpy")
+
+
+def texture(np, seed=0, size=256):
+    rng = np.random.default_rng(seed)
+    return rng.integers(40, 215, (size, size)).astype(np.uint8)
+
+
+def test_blur_lowers_sharpness_and_reads_as_blurry(np):
+    sharp = texture(np)
+    blurred = np.asarray(Image.fromarray(sharp).filter(ImageFilter.GaussianBlur(6)))
+    sharp_score = pstool.quality_metrics(sharp)
+    blurred_score = pstool.quality_metrics(blurred)
+    assert sharp_score.sharpness > 10 * blurred_score.sharpness
+    assert pstool.quality_problem(sharp_score) == ""
+    assert pstool.quality_problem(blurred_score) == "blurry"
+
+
+def test_exposure_problems_take_precedence(np):
+    dark = pstool.quality_metrics(texture(np) // 32)
+    assert dark.dark > 0.9 and pstool.quality_problem(dark) == "underexposed"
+    blown = pstool.quality_metrics(np.full((256, 256), 250, np.uint8))
+    assert blown.clipped == 1.0 and pstool.quality_problem(blown) == "overexposed"
+    assert pstool.quality_problem(None) == ""
+
+
+def test_quality_order_puts_unscored_frames_last(np):
+    scores = {
+        "a": pstool.quality_metrics(texture(np, 1)),
+        "b": pstool.quality_metrics(np.full((64, 64), 128, np.uint8)),
+        "c": pstool.quality_metrics(np.full((64, 64), 250, np.uint8)),
+    }
+    paths = ["x", "c", "b", "a"]
+    assert pstool.quality_order(paths, scores, "name") == paths
+    assert pstool.quality_order(paths, scores, "sharpness")[0] == "a"
+    assert pstool.quality_order(paths, scores, "exposure")[:2] == ["b", "a"]
+    assert pstool.quality_order(paths, scores, "entropy")[-1] == "x"
+
+
+def test_scores_are_cached_until_the_file_changes(tmp_path, make_image, np):
+    path = str(tmp_path / "frame.png")
+    Image.fromarray(texture(np)).save(path)
+    rows = pstool.score_batch([path, str(tmp_path / "missing.png")])
+    assert [row[0] for row in rows] == [path]
+
+    store = pstool.QualityScoreStore(str(tmp_path / "quality.db"))
+    store.put_many(rows)
+    assert store.get_many([path])[path] == pstool.QualityScore(*rows[0][3:])
+    make_image(tmp_path / "frame.png", size=(40, 40))
+    assert store.get_many([path]) == {}
@@ -0,0 +1,47 @@
+import GUI_tool as pstool
+
+
+def make_gui(paths):
+    # Just the state range selection touches; no Tk
+    gui = pstool.ImageSelectorGUI.__new__(pstool.ImageSelectorGUI)
+    gui.image_paths = list(paths)
+    gui.current_index = 0
+    gui.range_anchor = None
+    gui.range_anchor_index = 0
+    gui.output_dir = "/out"
+    gui.csv_file = "/out/selections.csv"
+    gui.bulk_busy = False
+    gui.messages = []
+    gui.log_info = gui.messages.append
+    gui.redraw_overlays = lambda: None
+    gui.ensure_selection_store = lambda: True
+    return gui
+
+
+def test_range_runs_from_anchor_to_current_frame_in_either_direction():
+    gui = make_gui("abcdef")
+    gui.current_index = 4
+    gui.mark_range_start()
+    gui.current_index = 1
+    assert gui.range_paths() == list("bcde")
+
+
+def test_range_follows_its_anchor_through_a_reorder():
+    gui = make_gui("abcdef")
+    gui.current_index = 1
+    gui.mark_range_start()
+    gui.image_paths = list("zyabcdef")
+    gui.current_index = 5
+    assert gui.range_paths() == list("bcd")
+    gui.image_paths = list("acdef")
+    assert gui.range_paths() == []
+
+
+def test_busy_bulk_selection_keeps_the_range():
+    gui = make_gui("abcdef")
+    gui.mark_range_start()
+    gui.current_index = 3
+    gui.bulk_busy = True
+    gui.select_image()
+    assert gui.range_paths() == list("abcd")
+    assert any("Still working" in m for m in gui.messages)
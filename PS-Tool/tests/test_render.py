@@ -0,0 +1,104 @@
+from PIL import Image, ImageChops
+
+import GUI_tool as pstool
+
+
+class Photo:
+    # Stands in for a PhotoImage: RenderCache only asks for its size
+    def __init__(self, width, height):
+        self.size = (width, height)
+
+    def width(self):
+        return self.size[0]
+
+    def height(self):
+        return self.size[1]
+
+
+def test_pyramid_halves_while_the_short_side_stays_above_the_minimum():
+    pyramid = pstool.ImagePyramid(Image.new("RGB", (2048, 1536)), min_side=256)
+    assert [img.size for _, img in pyramid.levels] == [(2048, 1536), (1024, 768), (512, 384)]
+    assert [scale for scale, _ in pyramid.levels] == [1.0, 0.5, 0.25]
+    assert pyramid.nbytes == sum(w * h * 3 for w, h in [(2048, 1536), (1024, 768), (512, 384)])
+
+
+def test_level_for_picks_the_smallest_level_with_enough_detail():
+    pyramid = pstool.ImagePyramid(Image.new("RGB", (2048, 1536)), min_side=256)
+    assert pyramid.level_for(0.3)[0] == 0.5
+    assert pyramid.level_for(0.25)[0] == 0.25
+    assert pyramid.level_for(0.05)[0] == 0.25
+    assert pyramid.level_for(2.0)[0] == 1.0
+
+
+def test_reduced_decode_keeps_the_full_size():
+    pyramid = pstool.ImagePyramid(Image.new("RGB", (1000, 750)), full_size=(4000, 3000))
+    assert pyramid.size == (4000, 3000)
+    assert pyramid.base_scale == 0.25
+
+
+def test_render_cache_evicts_least_recently_used_by_pixels():
+    cache = pstool.RenderCache(max_pixels=300)
+    cache.put(("a", 800, 600, 1.0), Photo(10, 10))
+    cache.put(("b", 800, 600, 1.0), Photo(10, 10))
+    assert cache.get(("a", 800, 600, 1.0)) is not None  # a is now the most recent
+    cache.put(("c", 800, 600, 1.0), Photo(10, 15))
+    assert list(cache.entries) == [("a", 800, 600, 1.0), ("c", 800, 600, 1.0)]
+    assert cache.pixels == 250
+
+    cache.put(("a", 800, 600, 2.0), Photo(5, 5))
+    cache.discard("a")
+    assert list(cache.entries) == [("c", 800, 600, 1.0)]
+    assert cache.pixels == 150
+
+
+def test_fit_geometry_centres_the_zoomed_image():
+    scale, width, height, left, top = pstool.fit_geometry((4000, 3000), (800, 800), zoom=2.0, offset=(10, -5))
+    assert (scale, width, height) == (0.4, 1600, 1200)
+    assert (left, top) == (400 + 10 - 800, 400 - 5 - 600)
+
+
+def test_a_tile_matches_the_same_region_of_a_full_render():
+    image = Image.radial_gradient("L").resize((1024, 768)).convert("RGB")
+    pyramid = pstool.ImagePyramid(image, min_side=256)
+    full = pstool.render_region(pyramid, 1.5, (1536, 1152), (0, 0, 1536, 1152))
+    tile = pstool.render_region(pyramid, 1.5, (1536, 1152), (512, 512, 1024, 1024))
+    assert tile.size == (512, 512)
+    expected = full.crop((512, 512, 1024, 1024))
+    assert max(high for _, high in ImageChops.difference(tile, expected).getextrema()) <= 2
+
+
+class Canvas:
+    def __init__(self):
+        self.items = {}
+
+    def create_image(self, x, y, **options):
+        self.items[len(self.items) + 1] = (x, y)
+        return len(self.items)
+
+    def delete(self, item):
+        self.items.pop(item, None)
+
+
+def test_only_tiles_near_the_viewport_are_drawn():
+    gui = pstool.ImageSelectorGUI.__new__(pstool.ImageSelectorGUI)
+    gui.canvas = Canvas()
+    gui.tile_items = {}
+    rendered = []
+
+    def render_tile(final_scale, tx, ty, new_width, new_height, preview=False):
+        rendered.append((tx, ty))
+        return object(), preview
+
+    gui.render_tile = render_tile
+    # A 4096x4096 display image on an 800x600 canvas, scrolled to its top-left corner
+    gui.display_geometry = lambda: (800, 600, 1.0, 4096, 4096, 0, 0)
+    gui.update_tiles()
+    assert sorted(gui.tile_items) == [(x, y) for x in range(3) for y in range(2)]
+
+    # Pan right by two tiles: tiles that left the viewport are deleted, kept ones are not redrawn
+    rendered.clear()
+    gui.display_geometry = lambda: (800, 600, 1.0, 4096, 4096, -1024, 0)
+    gui.update_tiles()
+    assert sorted(gui.tile_items) == [(x, y) for x in range(1, 5) for y in range(2)]
+    assert sorted(rendered) == [(x, y) for x in (3, 4) for y in range(2)]
+    assert len(gui.canvas.items) == len(gui.tile_items)
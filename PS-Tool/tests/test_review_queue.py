@@ -0,0 +1,83 @@
+import os
+import time
+
+from PIL import Image
+
+import GUI_tool as pstool
+
+
+def shot(path, taken_at):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    exif = Image.Exif()
+    exif[0x0132] = taken_at
+    Image.new("RGB", (32, 24)).save(path, exif=exif)
+    return str(path)
+
+
+def build_tree(root, make_image):
+    make_image(root / "z_day1" / "a.jpg", size=(32, 24))
+    make_image(root / "z_day1" / "late" / "a.jpg", size=(32, 24))
+    make_image(root / "a_day2" / "a.jpg", size=(32, 24))
+    (root / "empty").mkdir()
+    return str(root)
+
+
+def folders(queue):
+    return [os.path.basename(folder) for folder, _, _ in queue]
+
+
+def test_depth_first_walks_by_name_and_skips_empty_folders(tmp_path, make_image):
+    base = build_tree(tmp_path / "data", make_image)
+    assert folders(pstool.iter_review_queue(base)) == ["a_day2", "z_day1", "late"]
+
+
+def test_folders_are_listed_only_when_the_queue_reaches_them(tmp_path, make_image, monkeypatch):
+    base = build_tree(tmp_path / "data", make_image)
+    scanned = []
+    real_scan = pstool.scan_folder
+    monkeypatch.setattr(pstool, "scan_folder", lambda p: scanned.append(os.path.basename(p)) or real_scan(p))
+    queue = pstool.iter_review_queue(base)
+    assert folders([next(queue)]) == ["a_day2"]
+    assert scanned == ["data", "a_day2"]
+
+
+def test_capture_time_orders_folders_and_frames(tmp_path):
+    base = tmp_path / "data"
+    shot(base / "b_flight" / "2.jpg", "2024:01:01 09:00:00")
+    shot(base / "b_flight" / "1.jpg", "2024:01:01 09:05:00")
+    shot(base / "a_flight" / "1.jpg", "2024:01:01 11:00:00")
+    queue = list(pstool.iter_review_queue(str(base), "capture time"))
+    assert folders(queue) == ["b_flight", "a_flight"]
+    assert [os.path.basename(p) for p in queue[0][2]] == ["2.jpg", "1.jpg"]
+
+
+def test_finished_folders_wait_until_the_end_and_stay_finished(tmp_path, make_image):
+    base = build_tree(tmp_path / "data", make_image)
+    progress = pstool.ReviewProgress(str(tmp_path / "review.db"))
+    day2 = os.path.join(base, "a_day2")
+    progress.update(day2, os.path.join(day2, "a.jpg"), 0, 1, done=True)
+    progress.update(day2, os.path.join(day2, "a.jpg"), 0, 1)  # revisited later
+    progress.close()
+
+    progress = pstool.ReviewProgress(str(tmp_path / "review.db"))
+    assert progress.is_done(day2) and not progress.is_done(os.path.join(base, "z_day1"))
+    assert folders(pstool.iter_review_queue(base, "unreviewed first", progress)) == ["z_day1", "late", "a_day2"]
+    progress.close()
+
+
+def test_background_queue_streams_folders_and_skips_the_open_one(tmp_path, make_image):
+    base = build_tree(tmp_path / "data", make_image)
+    progress = pstool.ReviewProgress(str(tmp_path / "review.db"))
+    queue = pstool.ReviewQueue(base, "depth-first", progress, skip=os.path.join(base, "a_day2"))
+    seen = []
+    deadline = time.monotonic() + 5
+    while not queue.finished:
+        assert time.monotonic() < deadline, "timed out"
+        item = queue.take()
+        if item is None:
+            time.sleep(0.01)
+        else:
+            seen.append(os.path.basename(item[0]))
+    queue.stop()
+    assert seen == ["z_day1", "late"]
+    progress.close()
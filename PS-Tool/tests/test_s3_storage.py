@@ -0,0 +1,79 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import GUI_tool as pstool
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    moto = pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.delenv("PSTOOL_S3_ENDPOINT", raising=False)
+    with moto.mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket="frames")
+        for key in ("flight/001.jpg", "flight/002.png", "flight/notes.txt", "flight/day2/003.jpg", "other/004.jpg"):
+            client.put_object(Bucket="frames", Key=key, Body=key.encode())
+        yield pstool.S3Storage(pool_size=4)
+
+
+def test_listing_splits_prefixes_and_images(storage):
+    listing = storage.listing("s3://frames/flight")
+    assert listing.dirs == ["day2"]
+    assert listing.images == ["001.jpg", "002.png"]
+    assert storage.listing("s3://").dirs == ["frames"]
+    assert storage.walk_folders("s3://frames") == ["flight", "flight/day2", "other"]
+
+
+def test_listing_streams_pages(storage):
+    pages = []
+    storage.listing("s3://frames/flight", on_page=lambda dirs, images: pages.append((dirs, images)))
+    assert pages == [(["day2"], ["001.jpg", "002.png"])]
+
+
+def test_stat_and_range_read(storage):
+    storage.listing("s3://frames/flight")
+    assert storage.stat("s3://frames/flight/001.jpg")[1] == len(b"flight/001.jpg")
+    assert storage.read("s3://frames/flight/001.jpg", 7, 10) == b"001"
+    with pytest.raises(FileNotFoundError):
+        storage.stat("s3://frames/flight/missing.jpg")
+
+
+def test_server_side_copy_refreshes_the_listing(storage):
+    assert storage.listing("s3://frames/picked").images == []
+    storage.copy("s3://frames/flight/001.jpg", "s3://frames/picked/001.jpg")
+    assert storage.listing("s3://frames/picked").images == ["001.jpg"]
+    assert storage.get("s3://frames/picked/001.jpg") == b"flight/001.jpg"
+
+
+def test_upload_from_local_file(storage, tmp_path):
+    local = tmp_path / "005.jpg"
+    local.write_bytes(b"local bytes")
+    storage.copy(str(local), "s3://frames/picked/005.jpg")
+    assert storage.exists("s3://frames/picked/005.jpg")
+    storage.delete("s3://frames/picked/005.jpg")
+    assert not storage.exists("s3://frames/picked/005.jpg")
+
+
+def test_parent_of_a_bucket_is_the_bucket_list():
+    assert pstool.parent_path("s3://frames/flight") == "s3://frames"
+    assert pstool.parent_path("s3://frames") == pstool.REMOTE_PREFIX
+    assert pstool.join_path(pstool.REMOTE_PREFIX, "frames") == "s3://frames"
+
+
+def storage_is_fresh():
+    return pstool._remote_storage is None and pstool._archive_storage is None
+
+
+@pytest.mark.skipif(not hasattr(os, "register_at_fork"), reason="needs fork")
+def test_forked_workers_build_their_own_storage(monkeypatch):
+    monkeypatch.setattr(pstool, "_remote_storage", object())
+    monkeypatch.setattr(pstool, "_archive_storage", object())
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork")) as pool:
+        assert pool.submit(storage_is_fresh).result()
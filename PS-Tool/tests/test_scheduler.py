@@ -0,0 +1,59 @@
+import GUI_tool as pstool
+
+
+class Root:
+    # Runs Tk's after/after_idle callbacks by hand
+    def __init__(self):
+        self.jobs = {}
+        self.next_id = 0
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.jobs[self.next_id] = (ms, callback)
+        return self.next_id
+
+    def after_idle(self, callback):
+        return self.after("idle", callback)
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def run(self, kind):
+        for job, (ms, callback) in list(self.jobs.items()):
+            if (ms == "idle") == (kind == "idle"):
+                del self.jobs[job]
+                callback()
+
+
+def test_requests_in_one_cycle_coalesce_into_one_render():
+    root, renders = Root(), []
+    scheduler = pstool.RenderScheduler(root, lambda **kw: renders.append(kw))
+    scheduler.request(full=False)
+    scheduler.request(full=True)
+    scheduler.request(full=False)
+    root.run("idle")
+    assert renders == [{"full": True, "preview": False}]
+
+
+def test_interaction_draws_previews_then_one_settled_full_render():
+    root, renders = Root(), []
+    scheduler = pstool.RenderScheduler(root, lambda **kw: renders.append(kw), settle_ms=180)
+    for _ in range(3):
+        scheduler.request(full=False, interactive=True)
+        root.run("idle")
+    assert renders == [{"full": False, "preview": True}] * 3
+    assert len([j for j in root.jobs.values() if j[0] == 180]) == 1  # each event re-arms the one settle timer
+
+    root.run("timer")
+    assert renders[-1] == {"full": False, "preview": False}
+    assert not scheduler.interacting
+
+
+def test_cancel_drops_pending_renders():
+    root, renders = Root(), []
+    scheduler = pstool.RenderScheduler(root, lambda **kw: renders.append(kw))
+    scheduler.request(interactive=True)
+    scheduler.cancel()
+    root.run("idle")
+    root.run("timer")
+    assert renders == [] and root.jobs == {}
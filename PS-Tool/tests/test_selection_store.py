@@ -0,0 +1,81 @@
+import csv
+
+import GUI_tool as pstool
+
+
+def row(name, scene="s1"):
+    return (name, scene, f"/data/{name}", f"/out/{name}", f"hash-{name}", None)
+
+
+def active(store):
+    return sorted(r[0] for rows in store.active_batches().values() for r in rows)
+
+
+def test_undo_and_redo_walk_the_batches(tmp_path):
+    store = pstool.SelectionStore(str(tmp_path / "sel.db"))
+    first = store.add([row("a.jpg"), row("b.jpg")])
+    second = store.add([row("c.jpg")])
+    assert active(store) == ["a.jpg", "b.jpg", "c.jpg"]
+
+    kind, rows = store.undo()
+    assert (kind, [r[0] for r in rows]) == ("select", ["c.jpg"])
+    store.undo()
+    assert active(store) == [] and store.undo() is None
+    assert store.next_redo() == first
+
+    store.redo()
+    assert active(store) == ["a.jpg", "b.jpg"] and store.next_redo() == second
+    store.add([row("d.jpg")])  # a new action drops the redo history
+    assert store.redo() is None
+    store.close()
+
+
+def test_relabel_swaps_rows_on_undo_and_redo(tmp_path):
+    store = pstool.SelectionStore(str(tmp_path / "sel.db"))
+    store.add([row("a.jpg"), row("b.jpg")])
+    batch, rows = store.set_scene(["/data/a.jpg"], "s2")
+    assert [r[1] for r in rows] == ["s2"]
+    assert [r[1] for r in store.find_by_source("/data/a.jpg")] == ["s2"]
+    assert store.set_scene(["/data/a.jpg"], "s2") == (None, [])
+
+    store.undo()
+    assert [r[1] for r in store.find_by_source("/data/a.jpg")] == ["s1"]
+    store.redo()
+    assert [r[1] for r in store.find_by_source("/data/a.jpg")] == ["s2"]
+    store.close()
+
+
+def test_history_is_replayed_from_the_journal_on_reopen(tmp_path):
+    db = str(tmp_path / "sel.db")
+    store = pstool.SelectionStore(db)
+    first = store.add([row("a.jpg")])
+    second = store.add([row("b.jpg")])
+    store.undo()
+    store.close()
+
+    store = pstool.SelectionStore(db)
+    assert active(store) == ["a.jpg"]
+    assert store.next_redo() == second
+    store.redo()
+    store.undo()
+    store.undo()
+    assert active(store) == [] and store.next_redo() == first
+    store.close()
+
+
+def test_csv_round_trip_exports_only_active_rows(tmp_path):
+    legacy = tmp_path / "selections.csv"
+    legacy.write_text("filename,scene_id,source_path\nold.jpg,s0,/data/old.jpg\n")
+    store = pstool.SelectionStore(str(tmp_path / "sel.db"))
+    assert store.import_csv(str(legacy)) == 1
+    assert store.undo() is None  # imported rows are not undoable
+    store.add([row("a.jpg")])
+    store.add([row("b.jpg")])
+    store.undo()
+
+    out = str(tmp_path / "export.csv")
+    store.export_csv(out)
+    with open(out, newline="") as f:
+        assert list(csv.reader(f)) == [pstool.CSV_HEADER, ["old.jpg", "s0", "/data/old.jpg"],
+                                       ["a.jpg", "s1", "/data/a.jpg"]]
+    store.close()
@@ -0,0 +1,53 @@
+import os
+
+import GUI_tool as pstool
+
+
+def make_state(tmp_path, **changes):
+    (tmp_path / "data" / "flight1").mkdir(parents=True, exist_ok=True)
+    (tmp_path / "out").mkdir(exist_ok=True)
+    state = {
+        "base_dir": str(tmp_path / "data"),
+        "current_folder": str(tmp_path / "data" / "flight1"),
+        "current_index": 12,
+        "output_dir": str(tmp_path / "out"),
+        "csv_file": str(tmp_path / "out" / "selections.csv"),
+        "zoom_level": 2.5,
+        "image_offset": [10, -4],
+    }
+    state.update(changes)
+    return state
+
+
+def test_state_round_trips_under_the_cache_dir(tmp_path, home):
+    path = pstool.session_state_path()
+    assert path == os.path.join(str(home), ".cache", "pstool", "session.json")
+    state = make_state(tmp_path)
+    pstool.save_session_state(path, state)
+    assert pstool.load_session_state(path) == state
+
+
+def test_each_labeler_resumes_their_own_session():
+    assert pstool.session_state_path("ana") != pstool.session_state_path("bo")
+    assert os.path.basename(pstool.session_state_path("a/b c")) == "session.a_b_c.json"
+
+
+def test_corrupt_or_stale_state_is_ignored(tmp_path):
+    path = str(tmp_path / "session.json")
+    assert pstool.load_session_state(path) is None
+
+    with open(path, "w") as f:
+        f.write('{"base_dir": "/data", "current')  # cut off mid-write
+    assert pstool.load_session_state(path) is None
+
+    pstool.save_session_state(path, ["not", "a", "dict"])
+    assert pstool.load_session_state(path) is None
+
+    pstool.save_session_state(path, make_state(tmp_path, output_dir=str(tmp_path / "gone")))
+    assert pstool.load_session_state(path) is None
+
+
+def test_a_deleted_folder_falls_back_to_the_base_dir(tmp_path):
+    path = str(tmp_path / "session.json")
+    pstool.save_session_state(path, make_state(tmp_path, current_folder=str(tmp_path / "data" / "removed")))
+    assert pstool.load_session_state(path)["current_folder"] == str(tmp_path / "data")
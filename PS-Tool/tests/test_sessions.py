@@ -0,0 +1,95 @@
+import csv
+import json
+import multiprocessing
+import os
+
+import GUI_tool as pstool
+
+
+def row(name, digest):
+    return [name, "", f"/data/{name}", f"/out/{name}", digest, None]
+
+
+def label(output_dir, labeler, events, close):
+    # One labeler process writing its shard; close=False leaves a live lease behind
+    session = pstool.LabelerSession(output_dir, labeler)
+    for batch, action, rows in events:
+        session.record(batch, action, rows)
+    if close:
+        session.close()
+
+
+def run_labelers(output_dir, labelers):
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=label, args=(output_dir, *args)) for args in labelers]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+        assert p.exitcode == 0
+
+
+def read_rows(csv_file):
+    with open(csv_file, newline="") as f:
+        return [r["filename"] for r in csv.DictReader(f)]
+
+
+def test_merge_dedupes_across_processes_and_compacts_finished_shards(tmp_path):
+    out = str(tmp_path / "out")
+    run_labelers(out, [
+        ("alice", [(1, "apply", [row("a.jpg", "h-a"), row("b.jpg", "h-b")]), (2, "apply", [row("c.jpg", "h-c")]),
+                   (2, "undo", None)], True),
+    ])
+    run_labelers(out, [
+        # Same content as alice's b.jpg under another name: the earlier selection wins
+        ("bob", [(1, "apply", [row("b-copy.jpg", "h-b"), row("d.jpg", "h-d")])], True),
+        ("carol", [(1, "apply", [row("e.jpg", "h-e")])], False),
+    ])
+    csv_file = str(tmp_path / "merged.csv")
+    messages = []
+
+    written = pstool.merge_sessions(out, csv_file, compact=True, progress=messages.append)
+
+    assert written == 4
+    assert sorted(read_rows(csv_file)) == ["a.jpg", "b.jpg", "d.jpg", "e.jpg"]
+    assert any("carol" in m and "still live" in m for m in messages)
+
+    session_dir = os.path.join(out, pstool.SESSION_DIR_NAME)
+    with open(os.path.join(session_dir, "alice.jsonl")) as f:
+        events = [json.loads(line) for line in f]
+    # The undone batch survives compaction as apply + undo, so a later redo still applies
+    assert [(e["batch"], e["action"]) for e in events] == [(1, "apply"), (2, "apply"), (2, "undo")]
+
+    # Compacted shards merge to the same result
+    again = str(tmp_path / "again.csv")
+    assert pstool.merge_sessions(out, again, progress=messages.append) == 4
+    assert sorted(read_rows(again)) == sorted(read_rows(csv_file))
+
+
+def test_live_labeler_blocks_a_second_session(tmp_path):
+    out = str(tmp_path / "out")
+    run_labelers(out, [("dave", [(1, "apply", [row("a.jpg", "h-a")])], False)])
+    try:
+        pstool.LabelerSession(out, "dave")
+    except RuntimeError as e:
+        assert "live session" in str(e)
+    else:
+        raise AssertionError("a second session for a live labeler was allowed")
+
+
+def test_claim_is_released_when_the_labeler_moves_on(tmp_path):
+    out = str(tmp_path / "out")
+    alice = pstool.LabelerSession(out, "alice")
+    bob = pstool.LabelerSession(out, "bob")
+    try:
+        assert alice.claim("/data/flight1") is None
+        assert bob.claim("/data/flight1") == "alice"
+        alice.release("/data/flight1")
+        assert bob.claim("/data/flight1") is None
+        assert alice.claim("/data/flight1") == "bob"
+        # Releasing a folder someone else holds leaves their claim alone
+        alice.release("/data/flight1")
+        assert alice.claim("/data/flight1") == "bob"
+    finally:
+        alice.close()
+        bob.close()
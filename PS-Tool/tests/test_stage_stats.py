@@ -0,0 +1,48 @@
+import json
+import threading
+
+import pytest
+
+import GUI_tool as pstool
+
+
+def test_percentiles_cover_the_last_window_of_samples():
+    pytest.importorskip("numpy")
+    stats = pstool.StageStats(window=100)
+    for ms in range(1, 201):
+        stats.record("render.full", 0.0, ms / 1000.0)
+    stats.record("image.decode", 0.0, 0.004)
+
+    count, p50, p95, p99 = stats.percentiles()["render.full"]
+    assert count == 100
+    assert p50 == pytest.approx(150.5)
+    assert p95 == pytest.approx(195.05)
+    assert p99 < 200.0001
+    assert stats.percentiles()["image.decode"] == (1, pytest.approx(4), pytest.approx(4), pytest.approx(4))
+
+
+def test_trace_export_writes_complete_events_per_thread(tmp_path):
+    stats = pstool.StageStats(trace_events=3)
+    with stats.stage("image.read"):
+        pass
+    worker = threading.Thread(target=lambda: stats.record("thumb.build", stats.origin + 0.5, stats.origin + 0.75))
+    worker.start()
+    worker.join()
+    for _ in range(2):
+        stats.record("render.preview", stats.origin + 1.0, stats.origin + 1.002)
+
+    path = str(tmp_path / "trace.json")
+    assert stats.export_trace(path) == 3  # the oldest event fell out of the ring
+    with open(path) as f:
+        events = json.load(f)["traceEvents"]
+    assert [e["name"] for e in events] == ["thumb.build", "render.preview", "render.preview"]
+    assert events[0]["cat"] == "thumb" and events[0]["ph"] == "X"
+    assert (events[0]["ts"], events[0]["dur"]) == (500000.0, 250000.0)
+    assert events[0]["tid"] != events[1]["tid"]
+
+
+def test_decode_with_stats_times_read_and_decode_separately(tmp_path, make_image):
+    stats = pstool.StageStats()
+    img, size = pstool.decode_image(make_image(tmp_path / "a.jpg"), stats=stats)
+    assert size == (320, 240) and img.mode == "RGB"
+    assert sorted(stats.samples) == ["image.decode", "image.read"]
@@ -0,0 +1,47 @@
+import io
+import os
+import time
+
+from PIL import Image
+
+import GUI_tool as pstool
+
+
+def test_make_thumbnail_fits_the_frame_in_a_square(tmp_path, make_image):
+    path = make_image(tmp_path / "a.jpg", size=(1200, 800))
+    row = pstool.make_thumbnail(path, size=192)
+    assert row[:3] == (path,) + pstool.path_stat(path)
+    assert Image.open(io.BytesIO(row[3])).size == (192, 128)
+    assert pstool.make_thumbnail(str(tmp_path / "missing.jpg")) is None
+
+
+def test_store_only_returns_thumbnails_of_unchanged_files(tmp_path, make_image):
+    store = pstool.ThumbnailStore(str(tmp_path / "thumbnails.db"))
+    paths = [make_image(tmp_path / f"{i}.jpg") for i in range(3)]
+    store.put_many([pstool.make_thumbnail(p) for p in paths[:2]])
+    assert store.missing(paths) == [paths[2]]
+
+    make_image(tmp_path / "0.jpg", size=(64, 48))  # rewritten after its thumbnail was made
+    os.utime(paths[0], ns=(1, 1))
+    assert sorted(store.get_many(paths)) == [paths[1]]
+
+    # The cache survives a restart
+    assert sorted(pstool.ThumbnailStore(store.db_path).get_many(paths)) == [paths[1]]
+
+
+def test_builder_fills_the_store_in_the_background(tmp_path, make_image):
+    store = pstool.ThumbnailStore(str(tmp_path / "thumbnails.db"))
+    paths = [make_image(tmp_path / f"{i}.jpg") for i in range(5)]
+    builder = pstool.ThumbnailBuilder(store, chunk_size=2)
+    builder.notify = True
+    builder.build(paths)
+    built = set()
+    deadline = time.monotonic() + 30
+    try:
+        while len(built) < len(paths):
+            assert time.monotonic() < deadline, "timed out"
+            built.add(builder.built.get(timeout=30))
+    finally:
+        builder.shutdown()
+        pstool.shutdown_process_pool()
+    assert store.missing(paths) == []
@@ -0,0 +1,53 @@
+import pytest
+
+import GUI_tool as pstool
+
+
+def test_viewer_fits_zooms_and_pans_without_tk(tmp_path, make_image):
+    for i in range(3):
+        make_image(tmp_path / f"{i}.jpg", size=(400, 200), color=(200, 200, 200))
+    viewer = pstool.ViewerCore(canvas_size=(200, 200))
+    assert viewer.open_folder(str(tmp_path)).images == ["0.jpg", "1.jpg", "2.jpg"]
+
+    frame = viewer.show(0)
+    assert frame.size == (200, 200)
+    # Fitted to the width, letterboxed top and bottom
+    assert frame.getpixel((100, 100))[0] > 150
+    assert frame.getpixel((100, 10)) == (0, 0, 0)
+
+    zoomed = viewer.zoom_by(2.0)
+    assert zoomed.getpixel((100, 10))[0] > 150
+    panned = viewer.pan(0, 150)
+    assert panned.getpixel((100, 10)) == (0, 0, 0)
+
+    viewer.step(5)
+    assert viewer.index == 2 and viewer.zoom == 1.0
+    assert {"view.scan", "view.fetch", "view.resize"} <= set(viewer.stats.samples)
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {"metrics": {"bench.next_image": {"p50": 10.0, "p95": 20.0},
+                            "bench.select": {"p50": 0.2, "p95": 0.4}},
+                "peak_rss_mb": 500}
+    results = {"metrics": {"bench.next_image": {"p50": 11.0, "p95": 30.0},
+                           "bench.select": {"p50": 0.5, "p95": 0.9},
+                           "bench.new_stage": {"p50": 99.0, "p95": 99.0}},
+               "peak_rss_mb": 650}
+    assert pstool.compare_benchmark(results, baseline) == [
+        ("bench.next_image", "p95", 20.0, 30.0),
+        ("peak_rss_mb", "max", 500, 650),
+    ]
+    assert pstool.compare_benchmark(results, baseline, tolerance=1.0) == []
+
+
+def test_benchmark_runs_end_to_end_on_a_small_tree(tmp_path):
+    pytest.importorskip("numpy")
+    root = str(tmp_path / "bench")
+    assert pstool.make_synthetic_tree(root, folders=2, images=3, size=(96, 64), formats=("jpg", "png")) == 6
+    assert pstool.make_synthetic_tree(root, folders=2, images=3, size=(96, 64), formats=("jpg", "png")) == 0
+
+    results = pstool.run_benchmark(root, canvas_size=(80, 60), steps=2, progress=lambda m: None)
+    metrics = results["metrics"]
+    assert metrics["bench.first_image"]["n"] == 2
+    assert metrics["bench.select"]["n"] == metrics["bench.undo"]["n"] == 4
+    assert pstool.compare_benchmark(results, results) == []